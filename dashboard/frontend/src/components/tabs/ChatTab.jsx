@@ -62,7 +62,7 @@ export const ChatTab = () => {
     setLoading(true);
 
     try {
-      const response = await fetch('http://localhost:8835/chat/ask', {
+      const response = await fetch('http://localhost:8835/chat/ask/stream', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -75,18 +75,63 @@ export const ChatTab = () => {
 
       if (!response.ok) throw new Error('Failed to get response');
 
-      const data = await response.json();
+      // The bot message is shown on the first event and filled in as the rest arrive
+      let started = false;
+      const updateBotMessage = (update) => {
+        if (!started) {
+          started = true;
+          setMessages(prev => {
+            const empty = { type: 'bot', text: '', timestamp: new Date() };
+            return [...prev, { ...empty, ...update(empty) }];
+          });
+        } else {
+          setMessages(prev => {
+            const last = prev[prev.length - 1];
+            return [...prev.slice(0, -1), { ...last, ...update(last) }];
+          });
+        }
+      };
 
-      const botMessage = {
-        type: 'bot',
-        text: data.response,
-        sql_query: data.sql_query,
-        data: data.data,
-        report: data.report,
-        timestamp: new Date()
+      const handleEvent = (event, data) => {
+        if (event === 'sql') {
+          updateBotMessage(() => ({ sql_query: data.sql_query }));
+        } else if (event === 'data') {
+          updateBotMessage(() => ({ data: data.rows }));
+        } else if (event === 'report') {
+          updateBotMessage(last => ({ report: (last.report || '') + data.text }));
+        } else if (event === 'done') {
+          updateBotMessage(() => ({
+            text: data.response,
+            sql_query: data.sql_query,
+            data: data.data,
+            report: data.report
+          }));
+        } else if (event === 'error') {
+          throw new Error(data.detail);
+        }
       };
 
-      setMessages(prev => [...prev, botMessage]);
+      // Server-sent events: "event: name\ndata: json" blocks separated by a blank line
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+          const block = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+          let event = 'message';
+          let payload = '';
+          for (const line of block.split('\n')) {
+            if (line.startsWith('event:')) event = line.slice(6).trim();
+            else if (line.startsWith('data:')) payload += line.slice(5).trim();
+          }
+          if (payload) handleEvent(event, JSON.parse(payload));
+        }
+      }
     } catch (error) {
       const errorMessage = {
         type: 'bot',
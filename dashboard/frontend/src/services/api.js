@@ -6,14 +6,27 @@
 import { API_BASE_URL } from '../config';
 
 /**
- * Fetch all interviews
+ * Fetch every page of a paginated list endpoint by following X-Next-Cursor
  */
-export const fetchInterviews = async () => {
-  const response = await fetch(`${API_BASE_URL}/interviews`);
-  if (!response.ok) throw new Error('Failed to fetch interviews');
-  return response.json();
+const fetchAllPages = async (path, errorMessage) => {
+  const rows = [];
+  let cursor = null;
+  do {
+    const url = new URL(`${API_BASE_URL}${path}`);
+    if (cursor) url.searchParams.append('cursor', cursor);
+    const response = await fetch(url);
+    if (!response.ok) throw new Error(errorMessage);
+    rows.push(...(await response.json()));
+    cursor = response.headers.get('X-Next-Cursor');
+  } while (cursor);
+  return rows;
 };
 
+/**
+ * Fetch all interviews
+ */
+export const fetchInterviews = () => fetchAllPages('/interviews', 'Failed to fetch interviews');
+
 /**
  * Fetch interview detail with persona, transcript, brands, themes
  */
@@ -26,11 +39,7 @@ export const fetchInterviewDetail = async (interviewId) => {
 /**
  * Fetch all personas
  */
-export const fetchPersonas = async () => {
-  const response = await fetch(`${API_BASE_URL}/personas`);
-  if (!response.ok) throw new Error('Failed to fetch personas');
-  return response.json();
-};
+export const fetchPersonas = () => fetchAllPages('/personas', 'Failed to fetch personas');
 
 /**
  * Fetch all segments
@@ -80,11 +89,8 @@ export const fetchThemeInsights = async (themeId) => {
 /**
  * Fetch transcript for an interview
  */
-export const fetchTranscript = async (interviewId) => {
-  const response = await fetch(`${API_BASE_URL}/transcripts/${interviewId}`);
-  if (!response.ok) throw new Error(`Failed to fetch transcript for ${interviewId}`);
-  return response.json();
-};
+export const fetchTranscript = (interviewId) =>
+  fetchAllPages(`/transcripts/${interviewId}`, `Failed to fetch transcript for ${interviewId}`);
 
 /**
  * Search transcripts
@@ -126,18 +132,22 @@ export const fetchThemeInsightsBySentiment = async () => {
   return response.json();
 };
 
+/**
+ * Fetch interviews, personas, brands and analytics summary in one request
+ */
+export const fetchDashboardBootstrap = async () => {
+  const response = await fetch(`${API_BASE_URL}/dashboard/bootstrap`);
+  if (!response.ok) throw new Error('Failed to fetch dashboard data');
+  return response.json();
+};
+
 /**
  * Transform API data to dashboard format
  */
 export const transformDataForDashboard = async () => {
   try {
     // Fetch all necessary data
-    const [interviews, personas, brands, analytics] = await Promise.all([
-      fetchInterviews(),
-      fetchPersonas(),
-      fetchBrands(),
-      fetchAnalyticsSummary()
-    ]);
+    const { interviews, personas, brands, analytics } = await fetchDashboardBootstrap();
 
     // Transform insights data - using Thai language fields
     const insightsData = personas.map(persona => ({
@@ -0,0 +1,220 @@
+"""
+Cohort analytics engine
+Holds a columnar copy of interviews, personas, interview_themes and
+interview_brands as NumPy arrays indexed by interview position. A cohort is a
+boolean mask over interviews; the analytics summary for it is a handful of
+vectorized passes (np.bincount) over those arrays instead of SQL aggregates.
+
+The copy is reloaded when the data version moves, and summaries are cached per
+cohort until then.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.database import current_data_version, execute_query, read_transaction
+
+# Same buckets as AGE_GROUP_SQL in init_database.py (persona_demographics)
+AGE_GROUP_EDGES = [25, 35, 45, 55]
+AGE_GROUP_LABELS = ["18-24", "25-34", "35-44", "45-54", "55+"]
+
+TOP_THEMES_LIMIT = 10
+
+
+class CohortFilter(NamedTuple):
+    """Cohort definition; values within a filter are OR'ed, filters are AND'ed"""
+    segment_ids: Tuple[int, ...] = ()
+    min_age: Optional[int] = None
+    max_age: Optional[int] = None
+    genders: Tuple[str, ...] = ()
+    roles: Tuple[str, ...] = ()       # substrings, case-insensitive (as /personas?role=)
+    brand_ids: Tuple[int, ...] = ()   # participant currently uses the brand
+    theme_ids: Tuple[int, ...] = ()   # interview mentions the theme
+
+    def is_empty(self) -> bool:
+        return not any(value not in ((), None) for value in self)
+
+
+def _codes(values: List, universe: List) -> np.ndarray:
+    """Position of each value in universe, -1 where it is missing"""
+    position = {value: i for i, value in enumerate(universe)}
+    return np.fromiter((position.get(value, -1) for value in values), dtype=np.int32, count=len(values))
+
+
+class CohortData:
+    """Columnar snapshot of the tables cohort summaries are computed from"""
+
+    def __init__(self):
+        with read_transaction():
+            interviews = execute_query("SELECT interview_id, segment_id FROM interviews ORDER BY interview_id", use_cache=False)
+            personas = execute_query("SELECT interview_id, age, gender, role FROM personas", use_cache=False)
+            themes = execute_query("SELECT theme_id, theme_name_th FROM themes ORDER BY theme_id", use_cache=False)
+            brands = execute_query("SELECT brand_id, brand_name FROM brands ORDER BY brand_id", use_cache=False)
+            theme_rows = execute_query("SELECT interview_id, theme_id FROM interview_themes", use_cache=False)
+            brand_rows = execute_query(
+                "SELECT DISTINCT interview_id, brand_id, currently_using = 1 AS is_using FROM interview_brands",
+                use_cache=False
+            )
+
+        interview_ids = [row["interview_id"] for row in interviews]
+        self.size = len(interview_ids)
+        self.segment_ids = np.array(
+            [-1 if row["segment_id"] is None else row["segment_id"] for row in interviews], dtype=np.int64
+        )
+
+        # Persona attributes per interview; interviews without a persona match no persona filter
+        persona_by_interview = {row["interview_id"]: row for row in personas}
+        persona_rows = [persona_by_interview.get(interview_id) for interview_id in interview_ids]
+        self.ages = np.array(
+            [np.nan if row is None or row["age"] is None else row["age"] for row in persona_rows], dtype=np.float64
+        )
+        self.age_groups = np.where(np.isnan(self.ages), -1, np.digitize(np.nan_to_num(self.ages), AGE_GROUP_EDGES))
+        self.genders = sorted({row["gender"] for row in persona_rows if row is not None and row["gender"] is not None})
+        self.gender_codes = _codes([row and row["gender"] for row in persona_rows], self.genders)
+        self.roles = sorted({row["role"] for row in persona_rows if row is not None and row["role"] is not None})
+        self.role_codes = _codes([row and row["role"] for row in persona_rows], self.roles)
+
+        self.theme_ids = [row["theme_id"] for row in themes]
+        self.theme_names = [row["theme_name_th"] for row in themes]
+        self.brand_ids = [row["brand_id"] for row in brands]
+        self.brand_names = [row["brand_name"] for row in brands]
+
+        # Relationship rows as (interview position, theme/brand position); rows for
+        # unknown interviews, themes or brands are dropped
+        theme_interviews = _codes([row["interview_id"] for row in theme_rows], interview_ids)
+        theme_positions = _codes([row["theme_id"] for row in theme_rows], self.theme_ids)
+        keep = (theme_interviews >= 0) & (theme_positions >= 0)
+        self.theme_row_interviews = theme_interviews[keep]
+        self.theme_row_themes = theme_positions[keep]
+
+        brand_interviews = _codes([row["interview_id"] for row in brand_rows], interview_ids)
+        brand_positions = _codes([row["brand_id"] for row in brand_rows], self.brand_ids)
+        using = np.array([bool(row["is_using"]) for row in brand_rows], dtype=bool)
+        keep = (brand_interviews >= 0) & (brand_positions >= 0)
+        # Distinct (interview, brand) pairs: a brand counts once per interview
+        pairs = np.unique(np.stack([brand_interviews[keep], brand_positions[keep]]), axis=1) if keep.any() \
+            else np.empty((2, 0), dtype=np.int32)
+        self.brand_row_interviews = pairs[0]
+        self.brand_row_brands = pairs[1]
+        using_pairs = np.stack([brand_interviews[keep & using], brand_positions[keep & using]])
+        self.using_interviews = using_pairs[0]
+        self.using_brands = using_pairs[1]
+
+    def mask(self, cohort: CohortFilter) -> np.ndarray:
+        """Boolean mask of the interviews in the cohort"""
+        mask = np.ones(self.size, dtype=bool)
+        if cohort.segment_ids:
+            mask &= np.isin(self.segment_ids, cohort.segment_ids)
+        if cohort.min_age is not None:
+            mask &= self.ages >= cohort.min_age  # NaN compares False
+        if cohort.max_age is not None:
+            mask &= self.ages <= cohort.max_age
+        if cohort.genders:
+            wanted = [i for i, gender in enumerate(self.genders) if gender.lower() in {g.lower() for g in cohort.genders}]
+            mask &= np.isin(self.gender_codes, wanted)
+        if cohort.roles:
+            wanted = [i for i, role in enumerate(self.roles) if any(r.lower() in role.lower() for r in cohort.roles)]
+            mask &= np.isin(self.role_codes, wanted)
+        if cohort.brand_ids:
+            brands = [i for i, brand_id in enumerate(self.brand_ids) if brand_id in cohort.brand_ids]
+            mask &= self._interviews_with(self.using_interviews, self.using_brands, brands)
+        if cohort.theme_ids:
+            themes = [i for i, theme_id in enumerate(self.theme_ids) if theme_id in cohort.theme_ids]
+            mask &= self._interviews_with(self.theme_row_interviews, self.theme_row_themes, themes)
+        return mask
+
+    def _interviews_with(self, row_interviews: np.ndarray, row_values: np.ndarray, values: List[int]) -> np.ndarray:
+        found = np.zeros(self.size, dtype=bool)
+        found[row_interviews[np.isin(row_values, values)]] = True
+        return found
+
+    def summary(self, cohort: CohortFilter) -> dict:
+        """Analytics summary (the shape of /analytics/summary) for the cohort"""
+        mask = self.mask(cohort)
+
+        age_groups = self.age_groups[mask]
+        age_counts = np.bincount(age_groups[age_groups >= 0], minlength=len(AGE_GROUP_LABELS))
+
+        theme_counts = np.bincount(
+            self.theme_row_themes[mask[self.theme_row_interviews]], minlength=len(self.theme_ids)
+        )
+        brand_counts = np.bincount(
+            self.brand_row_brands[mask[self.brand_row_interviews]], minlength=len(self.brand_ids)
+        )
+
+        # Highest count first, ties by ID (positions follow ID order)
+        top_themes = [i for i in np.lexsort((np.arange(len(theme_counts)), -theme_counts)) if theme_counts[i] > 0]
+        top_brands = [i for i in np.lexsort((np.arange(len(brand_counts)), -brand_counts)) if brand_counts[i] > 0]
+
+        segments = self.segment_ids[mask]
+        return {
+            "total_interviews": int(mask.sum()),
+            "total_segments": int(np.unique(segments[segments >= 0]).size),
+            "total_brands": int((brand_counts > 0).sum()),
+            "total_themes": int((theme_counts > 0).sum()),
+            "age_distribution": [
+                {"age_group": label, "count": int(count)}
+                for label, count in zip(AGE_GROUP_LABELS, age_counts) if count > 0
+            ],
+            "top_themes": [
+                {"theme_name_th": self.theme_names[i], "mention_count": int(theme_counts[i])}
+                for i in top_themes[:TOP_THEMES_LIMIT]
+            ],
+            "brand_mentions": [
+                {"brand_name": self.brand_names[i], "interview_count": int(brand_counts[i])}
+                for i in top_brands
+            ]
+        }
+
+
+class CohortEngine:
+    """Cohort summaries over a CohortData snapshot, cached per cohort"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._data = None
+        self._version = None
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "reloads": 0}
+
+    def _current(self) -> Tuple[CohortData, int]:
+        version = current_data_version()
+        with self._lock:
+            if self._data is not None and self._version == version:
+                return self._data, version
+        # Load outside the lock; concurrent loaders just build the same snapshot
+        data = CohortData()
+        with self._lock:
+            self._data, self._version = data, version
+            self._results.clear()
+            self._stats["reloads"] += 1
+        return data, version
+
+    def summary(self, cohort: CohortFilter) -> dict:
+        data, version = self._current()
+        with self._lock:
+            cached = self._results.get(cohort)
+            if cached is not None and cached[0] == version:
+                self._results.move_to_end(cohort)
+                self._stats["hits"] += 1
+                return cached[1]
+            self._stats["misses"] += 1
+
+        result = data.summary(cohort)
+        with self._lock:
+            if self._version == version:
+                self._results[cohort] = (version, result)
+                while len(self._results) > self.max_entries:
+                    self._results.popitem(last=False)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"cohorts_cached": len(self._results), **self._stats}
+
+
+cohort_engine = CohortEngine()
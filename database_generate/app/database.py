@@ -1,60 +1,802 @@
 """
 Database connection and utilities
+Connections are pooled and reused across requests instead of being opened per query.
+In the read-only serving profile (DB_READ_ONLY=1) pooled connections cannot write,
+and all writes go through a single writer connection per process.
 """
 
+import logging
 import sqlite3
 import os
+import threading
+import time
+from contextlib import contextmanager
 from typing import Optional
 
+from app.query_cache import QueryCache, is_cacheable, read_tables, written_tables
+from app.query_stats import QueryStats, format_plan
+
+logger = logging.getLogger("app.database")
+
 # Database path
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'interview_data.db')
 
+# Connection pool settings
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "256"))
+DB_HEALTH_CHECK_INTERVAL = float(os.getenv("DB_HEALTH_CHECK_INTERVAL", "30"))
+DB_SWAP_CHECK_INTERVAL = float(os.getenv("DB_SWAP_CHECK_INTERVAL", "1.0"))
+
+# Serving profile settings
+DB_READ_ONLY = os.getenv("DB_READ_ONLY", "0") == "1"
+DB_IMMUTABLE = os.getenv("DB_IMMUTABLE", "0") == "1"
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "65536"))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+
+# Query result cache settings
+QUERY_CACHE_ENABLED = os.getenv("QUERY_CACHE_ENABLED", "1") == "1"
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "1024"))
+QUERY_CACHE_MAX_MB = float(os.getenv("QUERY_CACHE_MAX_MB", "64"))
+QUERY_CACHE_CHECK_INTERVAL = float(os.getenv("QUERY_CACHE_CHECK_INTERVAL", "1.0"))
+
+# Query instrumentation settings
+QUERY_STATS_ENABLED = os.getenv("QUERY_STATS_ENABLED", "1") == "1"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+QUERY_STATS_SAMPLES = int(os.getenv("QUERY_STATS_SAMPLES", "1000"))
+
+
+def connection_uri(db_path: str, read_only: bool = False, immutable: bool = False) -> str:
+    """
+    Build a SQLite URI for the database file
+
+    Args:
+        db_path: Path to the database file
+        read_only: Open with mode=ro so the connection can never write
+        immutable: Also skip all locking and change detection (file must not change)
+    """
+    uri = f"file:{os.path.abspath(db_path)}"
+    if read_only:
+        uri += "?mode=ro"
+        if immutable:
+            uri += "&immutable=1"
+    return uri
+
+
+def file_identity(db_path: str) -> Optional[tuple]:
+    """
+    (device, inode) of the database file, or None if it does not exist
+
+    init_database swaps a rebuilt file in with an atomic rename, which always
+    yields a new inode. The modification time is not used: it also moves on
+    ordinary WAL checkpoints.
+    """
+    try:
+        st = os.stat(db_path)
+    except FileNotFoundError:
+        return None
+    return (st.st_dev, st.st_ino)
+
+
+def apply_pragmas(conn: sqlite3.Connection, read_only: bool = False):
+    """Apply the per-connection tuning profile"""
+    conn.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA cache_size = -{DB_CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    if read_only:
+        conn.execute("PRAGMA query_only = ON")
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of reusable SQLite connections
+
+    A thread that already holds a connection gets the same one back on nested
+    checkouts, so a route handler running several queries uses one connection.
+    Idle connections are handed out most-recently-used first, which keeps their
+    prepared statement caches warm.
+
+    The pool also watches the database file. When it has been replaced (see
+    init_database.swap_database), new checkouts wait while connections to the
+    old file are drained and closed, then open the new file; registered
+    listeners are called so caches built from the old file can be dropped.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        size: int = DB_POOL_SIZE,
+        timeout: float = DB_POOL_TIMEOUT,
+        cached_statements: int = DB_STATEMENT_CACHE_SIZE,
+        health_check_interval: float = DB_HEALTH_CHECK_INTERVAL,
+        read_only: bool = DB_READ_ONLY,
+        immutable: bool = DB_IMMUTABLE,
+        swap_check_interval: float = DB_SWAP_CHECK_INTERVAL
+    ):
+        self.db_path = db_path
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self.health_check_interval = health_check_interval
+        self.read_only = read_only
+        self.immutable = immutable
+        self.swap_check_interval = swap_check_interval
+
+        self._idle = []  # (connection, last_used) pairs, most recent last
+        self._open = 0
+        self._generation = 0  # advanced each time the pool is reopened
+        self._draining = False
+        self._cond = threading.Condition()  # reentrant, so _count() also works while it is held
+        self._local = threading.local()
+        self._file_identity = file_identity(db_path)
+        self._last_file_check = time.monotonic()
+        self._swap_lock = threading.Lock()
+        self._reopen_listeners = []
+        self._detached = set()  # open_detached() connections not closed yet
+        self._metrics = {
+            "connections_created": 0,
+            "connections_closed": 0,
+            "checkouts": 0,
+            "reentrant_checkouts": 0,
+            "waits": 0,
+            "wait_time_ms": 0.0,
+            "timeouts": 0,
+            "health_checks": 0,
+            "health_check_failures": 0,
+            "reopens": 0,
+            "detached_opened": 0,
+            "detached_interrupted": 0
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a new connection with Row factory and the tuning profile"""
+        conn = sqlite3.connect(
+            connection_uri(self.db_path, self.read_only, self.immutable),
+            uri=True,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        conn.row_factory = sqlite3.Row
+        apply_pragmas(conn, read_only=self.read_only)
+        return conn
+
+    def _count(self, key: str):
+        with self._cond:
+            self._metrics[key] += 1
+
+    def _is_healthy(self, conn: sqlite3.Connection) -> bool:
+        """Check that an idle connection still answers a trivial query"""
+        self._count("health_checks")
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            self._count("health_check_failures")
+            return False
+
+    def _close(self, conn: sqlite3.Connection):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        self._count("connections_closed")
+
+    def _acquire(self) -> tuple:
+        """
+        Take an idle connection, open a new one, or wait for a release
+
+        Returns:
+            (connection, pool generation it belongs to)
+        """
+        started = time.monotonic()
+        deadline = started + self.timeout
+        conn = None
+        last_used = None
+
+        with self._cond:
+            while True:
+                # No checkouts while reopen() drains connections to a replaced file
+                if not self._draining:
+                    if self._idle:
+                        conn, last_used = self._idle.pop()
+                        break
+                    if self._open < self.size:
+                        self._open += 1
+                        break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._metrics["timeouts"] += 1
+                    raise sqlite3.OperationalError(
+                        f"Timed out after {self.timeout}s waiting for a database connection"
+                    )
+                self._metrics["waits"] += 1
+                self._cond.wait(remaining)
+
+            generation = self._generation
+            self._metrics["checkouts"] += 1
+            self._metrics["wait_time_ms"] += (time.monotonic() - started) * 1000
+
+        # Validate connections that sat idle for a while
+        if conn is not None and time.monotonic() - last_used > self.health_check_interval:
+            if not self._is_healthy(conn):
+                self._close(conn)
+                conn = None
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._open -= 1
+                    self._cond.notify()
+                raise
+            self._count("connections_created")
+
+        return conn, generation
+
+    def _release(self, conn: sqlite3.Connection, generation: int, discard: bool = False):
+        """Return a connection to the pool, rolling back any open transaction"""
+        if not discard and conn.in_transaction:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                discard = True
+
+        with self._cond:
+            # Connections to a replaced file are closed instead of reused
+            if discard or generation != self._generation:
+                self._open -= 1
+                self._close(conn)
+                self._cond.notify_all()
+            else:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    def add_reopen_listener(self, callback):
+        """
+        Register a callable to run when the pool switches to a replaced file
+
+        Listeners run while connections are drained, before any checkout opens the
+        new file, so they must not check out a connection themselves.
+        """
+        self._reopen_listeners.append(callback)
+
+    def check_for_swap(self):
+        """
+        Reopen the pool if the database file has been replaced
+
+        Checks at most once per swap_check_interval. Does nothing on a thread that
+        holds a connection, since draining would wait for that connection.
+        """
+        if getattr(self._local, "conn", None) is not None:
+            return
+        now = time.monotonic()
+        if now - self._last_file_check < self.swap_check_interval:
+            return
+        # Another thread is already checking or reopening
+        if not self._swap_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_file_check = now
+            identity = file_identity(self.db_path)
+            if identity is None or identity == self._file_identity:
+                return
+            if not self.reopen():
+                logger.warning(
+                    "Database file replaced; some connections to the old file were still in use after %ss",
+                    self.timeout
+                )
+            self._file_identity = identity
+        finally:
+            self._swap_lock.release()
+
+    def reopen(self) -> bool:
+        """
+        Drain and close every connection so later checkouts open the file afresh
+
+        Checkouts wait while connections in use are returned, for up to the pool
+        timeout; connections returned after that are closed on release. Detached
+        connections get the same time to be closed, then their statements are
+        interrupted so their owners stop and close them. The reopen
+        listeners run before checkouts resume: if the writer kept the old file open
+        while readers opened the new one, closing it last could checkpoint and
+        delete the -wal/-shm files that by then belong to the new database.
+
+        Returns:
+            True if every connection was closed before the timeout
+        """
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            self._generation += 1
+            self._draining = True
+            try:
+                while self._idle:
+                    conn, _ = self._idle.pop()
+                    self._open -= 1
+                    self._close(conn)
+                while self._open > 0 or self._detached:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                for conn in self._detached:
+                    conn.interrupt()
+                    self._metrics["detached_interrupted"] += 1
+                drained = self._open == 0 and not self._detached
+                for callback in self._reopen_listeners:
+                    callback()
+            finally:
+                self._draining = False
+                self._metrics["reopens"] += 1
+                self._cond.notify_all()
+        return drained
+
+    def open_detached(self) -> sqlite3.Connection:
+        """
+        Open a read-only connection outside the pooled checkouts
+
+        For long reads such as streamed exports, which would otherwise keep a
+        pooled connection checked out for as long as the client takes to download.
+        The pool still tracks it, so reopen() waits for it and then interrupts it.
+        Must be closed with close_detached(); not tied to the opening thread, but
+        only one thread may use it at a time.
+        """
+        self.check_for_swap()
+        conn = sqlite3.connect(
+            connection_uri(self.db_path, read_only=True, immutable=self.immutable),
+            uri=True,
+            check_same_thread=False
+        )
+        apply_pragmas(conn, read_only=True)
+        with self._cond:
+            self._detached.add(conn)
+            self._metrics["detached_opened"] += 1
+        return conn
+
+    def close_detached(self, conn: sqlite3.Connection):
+        with self._cond:
+            self._detached.discard(conn)
+            self._cond.notify_all()
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """
+        Check out a connection for the duration of a with-block
+
+        Nested checkouts on the same thread reuse the outer connection.
+        """
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            self._count("reentrant_checkouts")
+            yield held
+            return
+
+        self.check_for_swap()
+        conn, generation = self._acquire()
+        self._local.conn = conn
+        discard = False
+        try:
+            yield conn
+        except sqlite3.DatabaseError:
+            discard = not self._is_healthy(conn)
+            raise
+        finally:
+            self._local.conn = None
+            self._release(conn, generation, discard=discard)
+
+    def close_all(self):
+        """Close every idle connection (connections in use are closed on release)"""
+        with self._cond:
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._open -= 1
+                self._close(conn)
+
+    def stats(self) -> dict:
+        """Current pool usage and lifetime counters"""
+        with self._cond:
+            idle = len(self._idle)
+            open_connections = self._open
+            detached = len(self._detached)
+            generation = self._generation
+            metrics = dict(self._metrics)
+        return {
+            "size": self.size,
+            "generation": generation,
+            "read_only": self.read_only,
+            "immutable": self.immutable,
+            "open": open_connections,
+            "idle": idle,
+            "in_use": open_connections - idle,
+            "detached": detached,
+            "statement_cache_size": self.cached_statements,
+            **metrics
+        }
+
+
+class DatabaseWriter:
+    """
+    Single read-write connection that serializes every write in this process
+
+    Keeping one writer per process means pooled readers can stay read-only,
+    and SQLite's WAL locking coordinates the writers of separate worker processes.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn = None
+        self._lock = threading.Lock()
+        self._trigger_targets = None
+        self._writes = 0
+        self._lock_wait_ms = 0.0
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the connection on first use (and again after close())"""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            apply_pragmas(self._conn)
+        return self._conn
+
+    def execute(self, query: str, params: tuple = ()):
+        """
+        Run one write statement and commit it
+
+        Returns:
+            (last row ID, number of rows changed)
+        """
+        started = time.monotonic()
+        with self._lock:
+            self._lock_wait_ms += (time.monotonic() - started) * 1000
+            conn = self._connection()
+            try:
+                cursor = conn.execute(query, params)
+                last_id, rowcount = cursor.lastrowid, cursor.rowcount
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            self._writes += 1
+            return last_id, rowcount
+
+    def tables_affected(self, tables) -> set:
+        """
+        The given tables plus every table their triggers write to
+
+        Writes to interview_themes also change theme_sentiment_stats, for example,
+        so cached results read from either must be invalidated.
+        """
+        with self._lock:
+            if self._trigger_targets is None:
+                self._trigger_targets = {}
+                rows = self._connection().execute(
+                    "SELECT tbl_name, sql FROM sqlite_master WHERE type = 'trigger'"
+                ).fetchall()
+                for table, sql in rows:
+                    body = sql[sql.upper().index("BEGIN"):]
+                    self._trigger_targets.setdefault(table.lower(), set()).update(written_tables(body))
+            targets = self._trigger_targets
+
+        affected = set(tables)
+        pending = list(affected)
+        while pending:
+            for target in targets.get(pending.pop(), ()):
+                if target not in affected:
+                    affected.add(target)
+                    pending.append(target)
+        return affected
+
+    def explain(self, query: str, params: tuple = ()) -> list:
+        """EXPLAIN QUERY PLAN for a write statement"""
+        with self._lock:
+            return format_plan(self._connection().execute("EXPLAIN QUERY PLAN " + query, params).fetchall())
+
+    def data_version(self) -> int:
+        """
+        PRAGMA data_version on the writer connection
+
+        The value only changes when another connection (another worker process
+        or an import script) commits, never for this connection's own writes.
+        """
+        with self._lock:
+            return self._connection().execute("PRAGMA data_version").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._trigger_targets = None
+
+    def stats(self) -> dict:
+        return {
+            "open": self._conn is not None,
+            "writes": self._writes,
+            "lock_wait_ms": self._lock_wait_ms
+        }
+
+
+class DataVersion:
+    """
+    Counter that moves whenever the data served by this process may have changed
+
+    Writes through execute_insert and database file swaps bump it directly.
+    Commits by other processes are picked up by polling `change_detector`
+    (PRAGMA data_version) at most once per check_interval, the same bound the
+    query cache works with. Lets callers tell whether something derived from the
+    data earlier, such as an HTTP ETag, is still current.
+    """
+
+    def __init__(self, change_detector=None, check_interval: float = 1.0):
+        self.change_detector = change_detector
+        self.check_interval = check_interval
+        self._version = 0
+        self._lock = threading.Lock()
+        self._last_marker = None
+        self._last_check = 0.0
+
+    def bump(self):
+        with self._lock:
+            self._version += 1
+
+    def current(self) -> int:
+        if self.change_detector is not None:
+            now = time.monotonic()
+            if now - self._last_check >= self.check_interval and self._lock.acquire(blocking=False):
+                try:
+                    self._last_check = now
+                    try:
+                        marker = self.change_detector()
+                    except Exception:
+                        marker = None
+                    if marker != self._last_marker:
+                        if self._last_marker is not None:
+                            self._version += 1
+                        self._last_marker = marker
+                finally:
+                    self._lock.release()
+        return self._version
+
+
+# Shared pool, writer and result cache used by all routes
+pool = ConnectionPool(DB_PATH)
+writer = DatabaseWriter(DB_PATH)
+query_cache = QueryCache(
+    max_entries=QUERY_CACHE_MAX_ENTRIES,
+    max_bytes=int(QUERY_CACHE_MAX_MB * 1024 * 1024),
+    change_detector=None if DB_IMMUTABLE else writer.data_version,
+    check_interval=QUERY_CACHE_CHECK_INTERVAL
+) if QUERY_CACHE_ENABLED else None
+
+data_version = DataVersion(
+    change_detector=None if DB_IMMUTABLE else writer.data_version,
+    check_interval=QUERY_CACHE_CHECK_INTERVAL
+)
+
+# After init_database swaps in a rebuilt file: reconnect the writer, drop cached results
+pool.add_reopen_listener(writer.close)
+pool.add_reopen_listener(data_version.bump)
+if query_cache is not None:
+    pool.add_reopen_listener(query_cache.clear)
+
+query_stats = QueryStats(
+    slow_threshold_ms=SLOW_QUERY_MS,
+    sample_size=QUERY_STATS_SAMPLES
+) if QUERY_STATS_ENABLED else None
+
+
+def configure_database() -> dict:
+    """
+    Prepare the database file for serving (run once at startup)
+
+    Switches the file to WAL journaling so readers in any number of worker
+    processes never block on, or are blocked by, the writer. WAL mode is stored
+    in the file itself, so this is a no-op after the first start.
+
+    Returns:
+        The serving profile in effect
+    """
+    journal_mode = None
+    if os.path.exists(DB_PATH) and not DB_IMMUTABLE:
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            conn.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}")
+            journal_mode = conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+        except sqlite3.OperationalError as e:
+            logger.warning("Could not enable WAL mode: %s", e)
+        finally:
+            conn.close()
+
+    return {
+        "journal_mode": journal_mode,
+        "read_only": pool.read_only,
+        "immutable": pool.immutable,
+        "mmap_size": DB_MMAP_SIZE,
+        "cache_size_kb": DB_CACHE_SIZE_KB
+    }
+
+
 def get_db():
-    """Get database connection with Row factory"""
+    """Get a standalone database connection with Row factory (not pooled)"""
     conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
     return conn
 
-def execute_query(query: str, params: tuple = (), fetch_one: bool = False):
+
+@contextmanager
+def read_connection():
+    """
+    A standalone read-only connection (see ConnectionPool.open_detached), closed on exit
+
+    A hot swap waits for it like for pooled connections, then interrupts it.
+    """
+    conn = pool.open_detached()
+    try:
+        yield conn
+    finally:
+        pool.close_detached(conn)
+
+
+def get_connection():
+    """
+    Check out a pooled connection
+
+    Use as a context manager around a group of queries so they share one connection:
+
+        with get_connection():
+            a = execute_query(...)
+            b = execute_query(...)
+    """
+    return pool.connection()
+
+
+@contextmanager
+def read_transaction():
+    """
+    Run a group of reads on one pooled connection inside one read transaction
+
+    Every query in the block sees the same snapshot of the database, even if
+    another connection commits in between. Pass use_cache=False to execute_query
+    inside the block, since cached results may come from an earlier snapshot.
+    """
+    with pool.connection() as conn:
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        finally:
+            # Nothing to commit; this only ends the snapshot
+            conn.rollback()
+
+
+def _copy_result(result):
+    """Shallow-copy cached rows so callers can't modify the cache"""
+    if result is None:
+        return None
+    if isinstance(result, dict):
+        return dict(result)
+    return [dict(row) for row in result]
+
+
+def execute_query(query: str, params: tuple = (), fetch_one: bool = False, use_cache: bool = True):
     """
     Execute a query and return results
-    
+
+    Repeated SELECTs are answered from the query cache until a table they read changes
+    or the database file is replaced.
+
     Args:
         query: SQL query string
         params: Query parameters
         fetch_one: If True, return single row; otherwise return all rows
-    
+        use_cache: Set False to always read from SQLite
+
     Returns:
         Single row dict or list of row dicts
     """
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute(query, params)
-    
-    if fetch_one:
-        row = cursor.fetchone()
-        conn.close()
-        return dict(row) if row else None
-    else:
-        rows = cursor.fetchall()
-        conn.close()
-        return [dict(row) for row in rows]
+    pool.check_for_swap()
+    cacheable = use_cache and query_cache is not None and is_cacheable(query)
+    if cacheable:
+        key = QueryCache.make_key(query, params, fetch_one)
+        hit, cached = query_cache.get(key)
+        if hit:
+            if query_stats is not None:
+                query_stats.record_cache_hit(query)
+            return _copy_result(cached)
+        versions = query_cache.snapshot(read_tables(query))
+    elif query_cache is not None:
+        query_cache.record_uncacheable()
+
+    with pool.connection() as conn:
+        started = time.perf_counter()
+        cursor = conn.execute(query, params)
+
+        if fetch_one:
+            row = cursor.fetchone()
+            cursor.close()
+            result = dict(row) if row else None
+        else:
+            rows = cursor.fetchall()
+            result = [dict(row) for row in rows]
+
+        if query_stats is not None:
+            duration_ms = (time.perf_counter() - started) * 1000
+            row_count = (1 if result else 0) if fetch_one else len(result)
+            plan = None
+            if query_stats.is_slow(duration_ms) and query_stats.needs_plan(query):
+                plan = format_plan(conn.execute("EXPLAIN QUERY PLAN " + query, params).fetchall())
+            query_stats.record(query, duration_ms, row_count, kind="read", plan=plan)
+
+    if cacheable:
+        query_cache.put(key, result, versions)
+        return _copy_result(result)
+    return result
+
 
 def execute_insert(query: str, params: tuple = ()):
     """
     Execute an insert/update/delete query
-    
+
     Args:
         query: SQL query string
         params: Query parameters
-    
+
     Returns:
         Last row ID
     """
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute(query, params)
-    last_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    return last_id
+    try:
+        started = time.perf_counter()
+        last_id, rowcount = writer.execute(query, params)
+
+        if query_stats is not None:
+            duration_ms = (time.perf_counter() - started) * 1000
+            plan = None
+            if query_stats.is_slow(duration_ms) and query_stats.needs_plan(query):
+                plan = writer.explain(query, params)
+            query_stats.record(query, duration_ms, max(rowcount, 0), kind="write", plan=plan)
+
+        return last_id
+    finally:
+        data_version.bump()
+        if query_cache is not None:
+            tables = written_tables(query)
+            if tables:
+                query_cache.invalidate_tables(writer.tables_affected(tables))
+            else:
+                query_cache.clear()
+
+
+def current_data_version() -> int:
+    """Data version of the database currently being served (see DataVersion)"""
+    pool.check_for_swap()
+    return data_version.current()
+
+
+def close_connections():
+    """Close pooled readers and the writer (called on shutdown)"""
+    pool.close_all()
+    writer.close()
+
+
+def get_pool_stats() -> dict:
+    """Connection pool and writer metrics for health reporting"""
+    return {**pool.stats(), "writer": writer.stats()}
+
+
+def get_query_stats(limit: int = 20, sort_by: str = "total_ms") -> Optional[dict]:
+    """Per-statement timing report, or None when instrumentation is disabled"""
+    return query_stats.report(limit, sort_by) if query_stats is not None else None
+
+
+def get_cache_stats() -> Optional[dict]:
+    """Query cache hit/miss counters and size, or None when disabled"""
+    return query_cache.stats() if query_cache is not None else None
@@ -0,0 +1,75 @@
+"""
+Sparse fieldsets
+`fields=a,b,c` on a GET route limits the returned model fields. The names are
+validated against the route's Pydantic model and become the column list of the
+SELECT, so columns nobody asked for are not read, copied or encoded.
+"""
+
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple, Type
+
+from fastapi import HTTPException
+from pydantic import BaseModel, create_model
+
+
+def parse_fields(fields: Optional[str], model: Type[BaseModel]) -> Optional[List[str]]:
+    """
+    Validate a comma-separated field list against a model
+
+    Returns:
+        Requested field names in model order, or None for all fields
+    """
+    if fields is None:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    if not requested:
+        return None
+    unknown = sorted(requested - set(model.model_fields))
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown field(s): {', '.join(unknown)}. Choose from: {', '.join(model.model_fields)}"
+        )
+    return [name for name in model.model_fields if name in requested]
+
+
+def select_columns(fields: Optional[List[str]], alias: Optional[str] = None, required: Sequence[str] = ()) -> str:
+    """
+    SELECT column list for the requested fields
+
+    Args:
+        fields: Result of parse_fields
+        alias: Table alias to qualify the columns with
+        required: Columns the query needs in its result even when not requested
+            (e.g. pagination keys); remove them afterwards with trim_columns
+    """
+    prefix = f"{alias}." if alias else ""
+    if fields is None:
+        return f"{prefix}*"
+    columns = list(fields) + [column for column in required if column not in fields]
+    return ", ".join(prefix + column for column in columns)
+
+
+def trim_columns(rows: List[dict], fields: Optional[List[str]], extra: Sequence[str] = ()) -> List[dict]:
+    """Drop columns that select_columns added only because they were required"""
+    if fields is None or not rows:
+        return rows
+    keep = set(fields) | set(extra)
+    if keep.issuperset(rows[0]):
+        return rows
+    return [{key: value for key, value in row.items() if key in keep} for row in rows]
+
+
+@lru_cache(maxsize=None)
+def _projected_model(model: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    return create_model(
+        f"{model.__name__}Fields",
+        **{name: (model.model_fields[name].annotation, model.model_fields[name]) for name in fields}
+    )
+
+
+def fields_model(model: Type[BaseModel], fields: Optional[List[str]]) -> Type[BaseModel]:
+    """Model with only the requested fields, for validating projected rows"""
+    if fields is None:
+        return model
+    return _projected_model(model, tuple(fields))
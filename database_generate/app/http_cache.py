@@ -0,0 +1,265 @@
+"""
+HTTP conditional requests and compression
+GET responses get a strong ETag and are compressed (brotli when installed,
+otherwise gzip) above a size threshold. The ETag of every response is
+remembered together with the data version it was computed at, so a request whose
+If-None-Match still matches is answered with 304 before the route runs.
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from fastapi import Response
+from starlette.concurrency import run_in_threadpool
+
+from app.database import current_data_version
+from app.serialization import dumps
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is used instead
+    brotli = None
+
+HTTP_CACHE_ENABLED = os.getenv("HTTP_CACHE_ENABLED", "1") == "1"
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", "0"))
+HTTP_CACHE_MAX_ENTRIES = int(os.getenv("HTTP_CACHE_MAX_ENTRIES", "4096"))
+HTTP_COMPRESSION_MIN_BYTES = int(os.getenv("HTTP_COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+
+# Responses that are not a function of the database contents get no ETag:
+# live metrics, and answers generated by the language model
+UNCACHED_PREFIXES = ("/health", "/debug", "/chat", "/insights")
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript")
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> str:
+    """Best content coding the client accepts: br, gzip or identity"""
+    if not accept_encoding:
+        return "identity"
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip().lower())
+    if brotli is not None and ("br" in accepted or "*" in accepted):
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return "identity"
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    # mtime=0 keeps the output, and so the ETag, identical for identical bodies
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def make_etag(body: bytes, encoding: str) -> str:
+    """Strong ETag for the body; each content coding is a separate representation"""
+    digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+    return f'"{digest}"' if encoding == "identity" else f'"{digest}-{encoding}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as If-None-Match requires
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+class ETagRegistry:
+    """LRU map of request -> (ETag, data version it was computed at)"""
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"not_modified_early": 0, "not_modified": 0, "compressed": 0}
+
+    def get(self, key: tuple, version: int) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: tuple, etag: str, version: int):
+        with self._lock:
+            self._entries[key] = (etag, version)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def count(self, stat: str):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "brotli": brotli is not None, **self._stats}
+
+
+etags = ETagRegistry(max_entries=HTTP_CACHE_MAX_ENTRIES)
+
+
+class HTTPCacheMiddleware:
+    """
+    ETag / If-None-Match and response compression for GET requests
+
+    Responses are buffered to hash and compress them, so only responses that
+    declare a Content-Length are handled; streamed responses pass through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        conditional = HTTP_CACHE_ENABLED and not path.startswith(UNCACHED_PREFIXES)
+        encoding = negotiate_encoding(_header(scope, b"accept-encoding"))
+        if_none_match = _header(scope, b"if-none-match")
+        key = (path, scope["query_string"], encoding)
+        # Taken before the route runs: a change while it runs makes the ETag stale.
+        # May poll SQLite or wait for a file swap to drain, so off the event loop.
+        version = await run_in_threadpool(current_data_version) if conditional else None
+
+        if conditional and if_none_match:
+            known = etags.get(key, version)
+            if known is not None and etag_matches(if_none_match, known):
+                etags.count("not_modified_early")
+                await self._send_not_modified(send, known)
+                return
+
+        start = None
+        chunks = []
+
+        async def buffered_send(message):
+            nonlocal start
+            if start is None:
+                headers = dict(message.get("headers", []))
+                if message["type"] != "http.response.start" or b"content-length" not in headers:
+                    start = False
+                    await send(message)
+                else:
+                    start = message
+                return
+            if start is False:
+                await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            await self._finish(send, start, b"".join(chunks), key, version, encoding, if_none_match)
+
+        await self.app(scope, receive, buffered_send)
+
+    async def _finish(self, send, start, body, key, version, encoding, if_none_match):
+        preset_etag = dict(start["headers"]).get(b"etag")
+        headers = [(name, value) for name, value in start["headers"] if name not in (b"content-length", b"etag")]
+        content_type = dict(start["headers"]).get(b"content-type", b"").decode("latin-1")
+        compressible = content_type.startswith(COMPRESSIBLE_TYPES) and not any(
+            name == b"content-encoding" for name, _ in headers
+        )
+
+        if compressible:
+            headers.append((b"vary", b"Accept-Encoding"))
+        if compressible and encoding != "identity" and len(body) >= HTTP_COMPRESSION_MIN_BYTES:
+            body = compress(body, encoding)
+            headers.append((b"content-encoding", encoding.encode()))
+            etags.count("compressed")
+        else:
+            encoding = "identity"
+
+        if version is not None and start["status"] == 200:
+            # Routes serving prebuilt bodies (ResponseSnapshot) already know their ETag
+            etag = preset_etag.decode("latin-1") if preset_etag else make_etag(body, encoding)
+            etags.put(key, etag, version)
+            headers.append((b"etag", etag.encode()))
+            if not any(name == b"cache-control" for name, _ in headers):
+                headers.append((b"cache-control", f"public, max-age={HTTP_CACHE_MAX_AGE}, must-revalidate".encode()))
+            if if_none_match and etag_matches(if_none_match, etag):
+                etags.count("not_modified")
+                await self._send_not_modified(send, etag)
+                return
+
+        headers.append((b"content-length", str(len(body)).encode()))
+        await send({"type": "http.response.start", "status": start["status"], "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    @staticmethod
+    async def _send_not_modified(send, etag: str):
+        headers = [
+            (b"etag", etag.encode()),
+            (b"cache-control", f"public, max-age={HTTP_CACHE_MAX_AGE}, must-revalidate".encode()),
+            (b"vary", b"Accept-Encoding")
+        ]
+        await send({"type": "http.response.start", "status": 304, "headers": headers})
+        await send({"type": "http.response.body", "body": b""})
+
+
+class ResponseSnapshot:
+    """
+    JSON response prebuilt once per data version
+
+    The body is encoded and compressed in every supported content coding when
+    the data version moves; until then a request only picks the stored bytes
+    for its Accept-Encoding.
+    """
+
+    def __init__(self, build: Callable[[], object]):
+        self.build = build
+        self._version = None
+        self._encoded = {}  # content coding -> (body, ETag)
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def refresh(self):
+        """Rebuild the snapshot if the data has changed since it was built"""
+        version = current_data_version()
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            body = dumps(self.build())
+            bodies = {"identity": body, "gzip": compress(body, "gzip")}
+            if brotli is not None:
+                bodies["br"] = compress(body, "br")
+            self._encoded = {encoding: (encoded, make_etag(encoded, encoding)) for encoding, encoded in bodies.items()}
+            self._version = version
+            self.builds += 1
+
+    def response(self, accept_encoding: Optional[str]) -> Response:
+        self.refresh()
+        encoding = negotiate_encoding(accept_encoding)
+        body, etag = self._encoded[encoding]
+        headers = {
+            "ETag": etag,
+            "Cache-Control": f"public, max-age={HTTP_CACHE_MAX_AGE}, must-revalidate",
+            "Vary": "Accept-Encoding"
+        }
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type="application/json", headers=headers)
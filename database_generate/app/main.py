@@ -3,19 +3,61 @@ Main FastAPI Application
 Modular structure with separate route modules
 """
 
-from fastapi import FastAPI
+import asyncio
+import sqlite3
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.database import configure_database, close_connections, get_pool_stats, get_cache_stats
+from app.query_stats import current_route
+from app.http_cache import HTTPCacheMiddleware, etags
+from app.cohorts import cohort_engine
+from app.persona_facets import persona_facets
+from app.pivot import pivot_engine
+from app.services.sql_cache import sql_cache
+from app.services.semantic_cache import semantic_cache
+from app.services.llm_client import llm
+
 # Import route modules
-from app.routes import segments, interviews, personas, brands, themes, transcripts, analytics, chat, insights
+from app.routes import segments, interviews, personas, brands, themes, transcripts, analytics, chat, insights, debug, dashboard, export
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Apply the database serving profile on startup and release connections on shutdown"""
+    configure_database()
+    # Build the dashboard snapshot before the first page load asks for it
+    try:
+        dashboard.bootstrap_snapshot.refresh()
+    except sqlite3.Error as e:
+        print(f"Dashboard snapshot not built at startup: {e}")
+    # Generate SQL for the suggested questions in the background; the API round
+    # trips would otherwise hold up startup for several seconds each
+    prewarm = asyncio.create_task(chat.prewarm_sql_cache())
+    yield
+    prewarm.cancel()
+    await llm.close()
+    close_connections()
+    sql_cache.close()
+
+async def track_route(request: Request):
+    """Tag queries run while serving this request with its route template"""
+    route = request.scope.get("route")
+    path = getattr(route, "path", request.url.path)
+    current_route.set(f"{request.method} {path}")
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Interview Data API",
     description="API for Dishwashing Liquid Market Research Interview Data",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan,
+    dependencies=[Depends(track_route)]
 )
 
+# ETags, 304 responses and compression (inside CORS, so 304s carry CORS headers too)
+app.add_middleware(HTTPCacheMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -23,6 +65,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Pagination and search totals for browser clients
+    expose_headers=["X-Total-Count", "X-Next-Cursor"],
 )
 
 # Include routers
@@ -33,8 +77,11 @@ app.include_router(brands.router)
 app.include_router(themes.router)
 app.include_router(transcripts.router)
 app.include_router(analytics.router)
+app.include_router(dashboard.router)
+app.include_router(export.router)
 app.include_router(chat.router)
 app.include_router(insights.router)
+app.include_router(debug.router)
 
 @app.get("/")
 def read_root():
@@ -50,15 +97,33 @@ def read_root():
             "brands": "/brands",
             "themes": "/themes",
             "transcripts": "/transcripts/{interview_id}",
+            "search_personas": "/personas/search?role={role}&age_group={age_group}",
             "search_transcripts": "/transcripts/search/text?q={query}",
-            "analytics": "/analytics/summary"
+            "analytics": "/analytics/summary",
+            "pivot": "/analytics/pivot?rows={dimensions}&cols={dimensions}&measure={measure}",
+            "dashboard_bootstrap": "/dashboard/bootstrap",
+            "export": "/export/{table}?format=ndjson|csv|parquet",
+            "query_stats": "/debug/queries"
         }
     }
 
 @app.get("/health")
 def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "version": "2.0.0"}
+    return {
+        "status": "healthy",
+        "version": "2.0.0",
+        "database_pool": get_pool_stats(),
+        "query_cache": get_cache_stats(),
+        "http_cache": etags.stats(),
+        "cohorts": cohort_engine.stats(),
+        "persona_facets": persona_facets.stats(),
+        "pivot": pivot_engine.stats(),
+        "sql_cache": sql_cache.stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "sql_sandbox": chat.sql_sandbox.stats(),
+        "llm": llm.stats()
+    }
 
 if __name__ == "__main__":
     import uvicorn
@@ -3,7 +3,7 @@ Pydantic Models for API
 """
 
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 class Segment(BaseModel):
     segment_id: int
@@ -113,3 +113,9 @@ class PurchaseBehavior(BaseModel):
     online_vs_offline: Optional[str] = None
     notes: Optional[str] = None
     created_at: Optional[str] = None
+
+class DashboardBootstrap(BaseModel):
+    interviews: List[Interview]
+    personas: List[Persona]
+    brands: List[Brand]
+    analytics: dict
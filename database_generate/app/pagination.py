@@ -0,0 +1,119 @@
+"""
+Keyset (cursor) pagination
+Each page continues after the sort key of the previous page's last row, e.g.
+turn_number >= ? AND (turn_number > ? OR transcript_id > ?), which SQLite
+answers with an index seek. Unlike OFFSET, the cost of a page does not depend
+on how deep into the result it is.
+"""
+
+import base64
+import json
+from typing import List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+
+from app.database import execute_query
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(values: Sequence) -> str:
+    """Opaque cursor holding the sort key of the last row on a page"""
+    return base64.urlsafe_b64encode(json.dumps(list(values), separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, key_count: int) -> list:
+    """Sort key values from a cursor made by encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != key_count or any(v is None for v in values):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def keyset_condition(keys: Sequence[Tuple[str, str, bool]]) -> str:
+    """
+    WHERE condition selecting rows after a cursor, one ? per key column
+
+    Written as `k1 <= ? AND (k1 < ? OR <rest>)` rather than a bare OR so the
+    bound on the leading column becomes an index range seek. The leading
+    column's value is therefore bound twice (see keyset_params).
+    """
+    (expression, _, descending), rest = keys[0], keys[1:]
+    strict = "<" if descending else ">"
+    if not rest:
+        return f"{expression} {strict} ?"
+    return f"{expression} {strict}= ? AND ({expression} {strict} ? OR {keyset_condition(rest)})"
+
+
+def keyset_params(values: Sequence) -> list:
+    """Parameters for keyset_condition from the cursor values"""
+    if len(values) == 1:
+        return [values[0]]
+    return [values[0], values[0]] + keyset_params(values[1:])
+
+
+def paginate(
+    select: str,
+    from_where: str,
+    params: Sequence,
+    keys: Sequence[Tuple[str, str, bool]],
+    limit: int,
+    cursor: Optional[str] = None
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Fetch one page of a query ordered by a unique sort key
+
+    Args:
+        select: SELECT clause
+        from_where: FROM ... WHERE ... clause (without ORDER BY)
+        params: Parameters for from_where
+        keys: (SQL expression, result column, descending) per sort column. Together
+            they must be unique (end with the primary key) and must not be NULL.
+        limit: Page size
+        cursor: Cursor from the previous page, or None for the first page
+
+    Returns:
+        (rows, cursor for the next page or None on the last page)
+    """
+    params = list(params)
+
+    query = f"{select} {from_where}"
+    if cursor is not None:
+        query += f" AND ({keyset_condition(keys)})"
+        params.extend(keyset_params(decode_cursor(cursor, len(keys))))
+
+    order_by = ", ".join(expression + (" DESC" if descending else "") for expression, _, descending in keys)
+    query += f" ORDER BY {order_by} LIMIT ?"
+    # One extra row tells whether there is a next page
+    params.append(limit + 1)
+
+    rows = execute_query(query, tuple(params))
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor([last[column] for _, column, _ in keys])
+
+
+def count_total(from_where: str, params: Sequence) -> int:
+    """
+    Total rows for a paginated query
+
+    The count is served by the query cache after the first page, until one of
+    the tables it reads changes, so paging does not re-count on every request.
+    """
+    return execute_query(f"SELECT COUNT(*) AS total {from_where}", tuple(params), fetch_one=True)["total"]
+
+
+def page_headers(total: int, next_cursor: Optional[str]) -> dict:
+    """X-Total-Count and, unless this is the last page, X-Next-Cursor"""
+    headers = {"X-Total-Count": str(total)}
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = next_cursor
+    return headers
@@ -0,0 +1,170 @@
+"""
+Faceted persona search
+Every facet dimension (role, age group, gender, environment, usage pattern,
+segment) is dictionary-encoded into a NumPy code array over personas in
+interview ID order, with a precomputed bitmap per value (an inverted index:
+value -> personas having it). A search ORs the bitmaps of the selected values of
+each dimension and counts, in one pass, how many selected dimensions each persona
+fails. A persona matches when it fails none; it counts towards the facet of a
+dimension when it fails no *other* dimension, so selecting a role still shows how
+many personas every other role would give. Each facet is then one np.bincount.
+
+The index is rebuilt when the data version moves, and results are cached per
+search until then.
+"""
+
+import bisect
+import threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+from app.cohorts import AGE_GROUP_EDGES, AGE_GROUP_LABELS, _codes
+from app.database import current_data_version, execute_query, read_transaction
+
+FACET_DIMENSIONS = ("role", "age_group", "gender", "environment", "usage_pattern", "segment_id")
+
+
+class FacetSearch(NamedTuple):
+    """Selected values per dimension; values within a dimension are OR'ed, dimensions AND'ed"""
+    role: Tuple[str, ...] = ()
+    age_group: Tuple[str, ...] = ()
+    gender: Tuple[str, ...] = ()
+    environment: Tuple[str, ...] = ()
+    usage_pattern: Tuple[str, ...] = ()
+    segment_id: Tuple[int, ...] = ()
+
+
+class FacetResult(NamedTuple):
+    matches: np.ndarray   # positions of matching personas, in interview ID order
+    facets: Dict[str, List[dict]]
+
+
+class PersonaFacetIndex:
+    """Dictionary-encoded facet columns and per-value bitmaps of all personas"""
+
+    def __init__(self):
+        with read_transaction():
+            rows = execute_query(
+                """
+                SELECT p.interview_id, p.role, p.age, p.gender, p.environment, p.usage_pattern, i.segment_id
+                FROM personas p
+                LEFT JOIN interviews i ON p.interview_id = i.interview_id
+                ORDER BY p.interview_id
+                """,
+                use_cache=False
+            )
+
+        self.size = len(rows)
+        # Sorted as SQLite sorts TEXT (code point order), for cursors
+        self.interview_ids = [row["interview_id"] for row in rows]
+
+        ages = [row["age"] for row in rows]
+        age_groups = [
+            None if age is None else AGE_GROUP_LABELS[bisect.bisect_right(AGE_GROUP_EDGES, age)] for age in ages
+        ]
+        columns = {
+            "role": [row["role"] for row in rows],
+            "age_group": age_groups,
+            "gender": [row["gender"] for row in rows],
+            "environment": [row["environment"] for row in rows],
+            "usage_pattern": [row["usage_pattern"] for row in rows],
+            "segment_id": [row["segment_id"] for row in rows]
+        }
+
+        self.values = {}   # dimension -> distinct values, code order
+        self.codes = {}    # dimension -> code per persona, -1 for NULL
+        self.bitmaps = {}  # dimension -> {value: boolean array of personas with it}
+        for dimension, column in columns.items():
+            if dimension == "age_group":
+                values = list(AGE_GROUP_LABELS)
+            else:
+                values = sorted({value for value in column if value is not None})
+            codes = _codes(column, values)
+            self.values[dimension] = values
+            self.codes[dimension] = codes
+            self.bitmaps[dimension] = {value: codes == i for i, value in enumerate(values)}
+
+    def search(self, search: FacetSearch) -> FacetResult:
+        fails = np.zeros(self.size, dtype=np.uint8)
+        failed = {}
+        for dimension, selected in zip(FACET_DIMENSIONS, search):
+            if not selected:
+                continue
+            hit = np.zeros(self.size, dtype=bool)
+            for value in selected:
+                bitmap = self.bitmaps[dimension].get(value)
+                if bitmap is not None:
+                    hit |= bitmap
+            failed[dimension] = ~hit
+            fails += failed[dimension]
+
+        matching = fails == 0
+        facets = {}
+        for dimension in FACET_DIMENSIONS:
+            # Personas passing every selected dimension except this one
+            codes = self.codes[dimension]
+            if failed:
+                codes = codes[(fails == failed[dimension]) if dimension in failed else matching]
+            counts = np.bincount(codes[codes >= 0], minlength=len(self.values[dimension]))
+            facets[dimension] = [
+                {"value": value, "count": int(count)}
+                for value, count in zip(self.values[dimension], counts)
+            ]
+        return FacetResult(np.flatnonzero(matching), facets)
+
+    def page(self, matches: np.ndarray, after: str, limit: int) -> List[str]:
+        """Interview IDs of up to limit matches after the interview ID `after` (None: from the start)"""
+        start = 0 if after is None else int(np.searchsorted(matches, bisect.bisect_right(self.interview_ids, after)))
+        return [self.interview_ids[position] for position in matches[start:start + limit]]
+
+
+class PersonaFacetEngine:
+    """Faceted searches over a PersonaFacetIndex, cached per search"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._index = None
+        self._version = None
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "reloads": 0}
+
+    def _current(self) -> Tuple[PersonaFacetIndex, int]:
+        version = current_data_version()
+        with self._lock:
+            if self._index is not None and self._version == version:
+                return self._index, version
+        # Build outside the lock; concurrent builders just build the same index
+        index = PersonaFacetIndex()
+        with self._lock:
+            self._index, self._version = index, version
+            self._results.clear()
+            self._stats["reloads"] += 1
+        return index, version
+
+    def search(self, search: FacetSearch) -> Tuple[PersonaFacetIndex, FacetResult]:
+        index, version = self._current()
+        with self._lock:
+            cached = self._results.get(search)
+            if cached is not None and cached[0] == version:
+                self._results.move_to_end(search)
+                self._stats["hits"] += 1
+                return index, cached[1]
+            self._stats["misses"] += 1
+
+        result = index.search(search)
+        with self._lock:
+            if self._version == version:
+                self._results[search] = (version, result)
+                while len(self._results) > self.max_entries:
+                    self._results.popitem(last=False)
+        return index, result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"searches_cached": len(self._results), **self._stats}
+
+
+persona_facets = PersonaFacetEngine()
@@ -0,0 +1,344 @@
+"""
+Pivot cube
+Three fact tables are held as dictionary-encoded NumPy columns: theme mentions
+(interview_themes), brand usage (interview_brands) and brand perceptions
+(brand_perceptions). Each row also carries the dimensions of its interview
+(segment and the persona's age group, gender and role). A pivot picks the first
+fact table having every requested dimension and measure, combines the codes of
+those dimensions into one integer cell key and aggregates with np.unique and
+np.bincount; no SQL runs per request.
+
+The cube is rebuilt when the data version moves, and pivots are cached until then.
+"""
+
+import bisect
+import threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.cohorts import AGE_GROUP_EDGES, AGE_GROUP_LABELS, _codes
+from app.database import current_data_version, execute_query, read_transaction
+
+INTERVIEW_DIMENSIONS = ("segment", "age_group", "gender", "role")
+
+# Fact table -> its own dimensions and its measures besides count and interviews,
+# in the order a pivot looks for a table that has everything it asks for
+FACTS = {
+    "themes": {
+        "dimensions": ("theme", "theme_category", "sentiment", "importance_level"),
+        "measures": ("avg_confidence",)
+    },
+    "brands": {
+        "dimensions": ("brand", "currently_using", "awareness_level", "purchase_frequency"),
+        "measures": ("avg_satisfaction",)
+    },
+    "perceptions": {
+        "dimensions": ("brand", "perception_category", "sentiment"),
+        "measures": ()
+    }
+}
+
+COMMON_MEASURES = ("count", "interviews")
+
+MAX_PIVOT_DIMENSIONS = 4
+
+# Largest cell space (product of dimension sizes) aggregated with dense bincounts
+DENSE_CELLS = 1 << 22
+
+
+class PivotQuery(NamedTuple):
+    rows: Tuple[str, ...]
+    cols: Tuple[str, ...] = ()
+    measure: str = "count"
+    fact: Optional[str] = None
+
+
+def resolve_fact(query: PivotQuery) -> Optional[str]:
+    """First fact table with every dimension and the measure of the query"""
+    for fact, spec in FACTS.items():
+        if query.fact is not None and fact != query.fact:
+            continue
+        dimensions = set(INTERVIEW_DIMENSIONS) | set(spec["dimensions"])
+        measures = set(COMMON_MEASURES) | set(spec["measures"])
+        if dimensions.issuperset(query.rows + query.cols) and query.measure in measures:
+            return fact
+    return None
+
+
+class Dimension(NamedTuple):
+    labels: List           # label per code
+    codes: np.ndarray      # code per fact row
+
+
+def _encode(values: Sequence, labels: Optional[List] = None) -> Dimension:
+    """Dictionary-encode values; NULL becomes a final None label if present"""
+    if labels is None:
+        labels = sorted({value for value in values if value is not None})
+    codes = _codes(values, labels)
+    if (codes < 0).any():
+        codes[codes < 0] = len(labels)
+        labels = labels + [None]
+    return Dimension(labels, codes)
+
+
+class FactTable:
+    """One fact table: encoded dimensions, measure columns and interview codes"""
+
+    def __init__(self, size: int, interviews: np.ndarray, interview_count: int,
+                 dimensions: Dict[str, Dimension], measures: Dict[str, np.ndarray]):
+        self.size = size
+        self.interviews = interviews            # interview position per row, -1 if unknown
+        self.interview_count = interview_count
+        self.dimensions = dimensions
+        self.measures = measures                # float64, NaN for NULL
+
+    def aggregate(self, dimensions: Sequence[str], measure: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Aggregate the measure per combination of the dimensions
+
+        Returns:
+            Cell keys present (row-major over the dimensions' codes) and their values
+        """
+        key = np.zeros(self.size, dtype=np.int64)
+        space = 1
+        for name in dimensions:
+            dimension = self.dimensions[name]
+            key = key * len(dimension.labels) + dimension.codes
+            space *= len(dimension.labels)
+
+        # Group rows by cell: directly by key when the cell space is small enough
+        # to bincount over, otherwise by the rank of the key among those present
+        if space <= DENSE_CELLS:
+            groups, group_count = key, space
+        else:
+            sparse_cells, groups = np.unique(key, return_inverse=True)
+            group_count = len(sparse_cells)
+        rows_per_group = np.bincount(groups, minlength=group_count)
+
+        if measure == "count":
+            values = rows_per_group.astype(np.float64)
+        elif measure == "interviews":
+            known = self.interviews >= 0
+            pairs = groups[known] * self.interview_count + self.interviews[known]
+            if group_count * self.interview_count <= DENSE_CELLS:
+                seen = np.zeros(group_count * self.interview_count, dtype=bool)
+                seen[pairs] = True
+                values = seen.reshape(group_count, self.interview_count).sum(axis=1).astype(np.float64)
+            else:
+                values = np.bincount(np.unique(pairs) // self.interview_count, minlength=group_count).astype(np.float64)
+        else:
+            column = self.measures[measure]
+            present = ~np.isnan(column)
+            sums = np.bincount(groups[present], weights=column[present], minlength=group_count)
+            counts = np.bincount(groups[present], minlength=group_count)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                values = sums / counts  # NaN where no row has the measure
+
+        if space <= DENSE_CELLS:
+            cells = np.flatnonzero(rows_per_group)
+            return cells, values[cells]
+        return sparse_cells, values
+
+
+class PivotCube:
+    """Fact tables of the cube, loaded from one snapshot"""
+
+    def __init__(self):
+        with read_transaction():
+            interviews = execute_query(
+                """
+                SELECT i.interview_id, s.segment_name_th, p.age, p.gender, p.role
+                FROM interviews i
+                LEFT JOIN segments s ON i.segment_id = s.segment_id
+                LEFT JOIN personas p ON i.interview_id = p.interview_id
+                ORDER BY i.interview_id
+                """,
+                use_cache=False
+            )
+            segments = execute_query("SELECT segment_name_th FROM segments ORDER BY segment_id", use_cache=False)
+            themes = execute_query("SELECT theme_id, theme_name_th FROM themes ORDER BY theme_id", use_cache=False)
+            brands = execute_query("SELECT brand_id, brand_name FROM brands ORDER BY brand_id", use_cache=False)
+            theme_rows = execute_query(
+                "SELECT interview_id, theme_id, theme_category, sentiment, importance_level, confidence FROM interview_themes",
+                use_cache=False
+            )
+            brand_rows = execute_query(
+                """
+                SELECT interview_id, brand_id, currently_using, awareness_level, purchase_frequency, satisfaction_score
+                FROM interview_brands
+                """,
+                use_cache=False
+            )
+            perception_rows = execute_query(
+                "SELECT interview_id, brand_id, perception_category, sentiment FROM brand_perceptions",
+                use_cache=False
+            )
+
+        interview_ids = [row["interview_id"] for row in interviews]
+        # Interview-level dimensions, by interview position
+        self._interview_dimensions = {
+            "segment": _encode(
+                [row["segment_name_th"] for row in interviews],
+                list(dict.fromkeys(row["segment_name_th"] for row in segments))
+            ),
+            "age_group": _encode(
+                [None if row["age"] is None else AGE_GROUP_LABELS[bisect.bisect_right(AGE_GROUP_EDGES, row["age"])]
+                 for row in interviews],
+                list(AGE_GROUP_LABELS)
+            ),
+            "gender": _encode([row["gender"] for row in interviews]),
+            "role": _encode([row["role"] for row in interviews])
+        }
+        theme_names = {row["theme_id"]: row["theme_name_th"] for row in themes}
+        brand_names = {row["brand_id"]: row["brand_name"] for row in brands}
+
+        self.facts = {
+            "themes": self._fact(theme_rows, interview_ids, {
+                "theme": _encode([theme_names.get(row["theme_id"]) for row in theme_rows],
+                                 list(dict.fromkeys(theme_names.values()))),
+                "theme_category": _encode([row["theme_category"] for row in theme_rows]),
+                "sentiment": _encode([row["sentiment"] for row in theme_rows]),
+                "importance_level": _encode([row["importance_level"] for row in theme_rows])
+            }, {"avg_confidence": [row["confidence"] for row in theme_rows]}),
+            "brands": self._fact(brand_rows, interview_ids, {
+                "brand": _encode([brand_names.get(row["brand_id"]) for row in brand_rows],
+                                 list(dict.fromkeys(brand_names.values()))),
+                "currently_using": _encode([row["currently_using"] for row in brand_rows]),
+                "awareness_level": _encode([row["awareness_level"] for row in brand_rows]),
+                "purchase_frequency": _encode([row["purchase_frequency"] for row in brand_rows])
+            }, {"avg_satisfaction": [row["satisfaction_score"] for row in brand_rows]}),
+            "perceptions": self._fact(perception_rows, interview_ids, {
+                "brand": _encode([brand_names.get(row["brand_id"]) for row in perception_rows],
+                                 list(dict.fromkeys(brand_names.values()))),
+                "perception_category": _encode([row["perception_category"] for row in perception_rows]),
+                "sentiment": _encode([row["sentiment"] for row in perception_rows])
+            }, {})
+        }
+
+    def _fact(self, rows: List[dict], interview_ids: List[str], dimensions: Dict[str, Dimension],
+              measures: Dict[str, list]) -> FactTable:
+        positions = _codes([row["interview_id"] for row in rows], interview_ids)
+        # Interview dimensions through the row's interview; rows of unknown interviews get NULL
+        for name, interview_dimension in self._interview_dimensions.items():
+            null_code = interview_dimension.labels.index(None) if None in interview_dimension.labels else -1
+            codes = np.where(positions >= 0, interview_dimension.codes[positions], null_code)
+            labels = interview_dimension.labels
+            if (codes < 0).any():
+                codes[codes < 0] = len(labels)
+                labels = labels + [None]
+            dimensions[name] = Dimension(labels, codes)
+        return FactTable(
+            len(rows),
+            positions,
+            len(interview_ids),
+            dimensions,
+            {name: np.array([np.nan if value is None else value for value in column], dtype=np.float64)
+             for name, column in measures.items()}
+        )
+
+    def pivot(self, query: PivotQuery, fact: str) -> dict:
+        table = self.facts[fact]
+        row_sizes = [len(table.dimensions[name].labels) for name in query.rows]
+        col_sizes = [len(table.dimensions[name].labels) for name in query.cols]
+        col_span = int(np.prod(col_sizes)) if col_sizes else 1
+
+        cells, values = table.aggregate(query.rows + query.cols, query.measure)
+        row_keys, row_index = np.unique(cells // col_span, return_inverse=True)
+        col_keys, col_index = np.unique(cells % col_span, return_inverse=True)
+        matrix = np.full((len(row_keys), len(col_keys)), 0.0 if query.measure in COMMON_MEASURES else np.nan)
+        matrix[row_index, col_index] = values
+
+        row_totals = self._totals(table, query.rows, query.measure, row_keys)
+        col_totals = self._totals(table, query.cols, query.measure, col_keys)
+        grand_total = _json_values(table.aggregate((), query.measure)[1], query.measure)
+
+        return {
+            "fact": fact,
+            "measure": query.measure,
+            "rows": list(query.rows),
+            "cols": list(query.cols),
+            "row_headers": self._headers(table, query.rows, row_sizes, row_keys),
+            "col_headers": self._headers(table, query.cols, col_sizes, col_keys),
+            "values": _json_values(matrix, query.measure),
+            "row_totals": _json_values(row_totals, query.measure),
+            "col_totals": _json_values(col_totals, query.measure),
+            "grand_total": grand_total[0] if grand_total else (0 if query.measure in COMMON_MEASURES else None)
+        }
+
+    @staticmethod
+    def _totals(table: FactTable, dimensions: Tuple[str, ...], measure: str, keys: np.ndarray) -> np.ndarray:
+        """Measure over each header combination, computed (not summed) so distinct counts and averages hold"""
+        cells, values = table.aggregate(dimensions, measure)
+        return values[np.searchsorted(cells, keys)]
+
+    @staticmethod
+    def _headers(table: FactTable, dimensions: Tuple[str, ...], sizes: List[int], keys: np.ndarray) -> List[list]:
+        """Label tuple (one label per dimension) for each header key"""
+        if not dimensions:
+            return [[] for _ in keys]
+        codes = np.unravel_index(keys, sizes)
+        labels = [table.dimensions[name].labels for name in dimensions]
+        return [
+            [labels[d][int(codes[d][i])] for d in range(len(dimensions))]
+            for i in range(len(keys))
+        ]
+
+
+def _json_values(array: np.ndarray, measure: str) -> list:
+    """Counts as integers, averages as floats with NaN (no data) as null"""
+    if measure in COMMON_MEASURES:
+        return array.astype(np.int64).tolist()
+    return np.where(np.isnan(array), None, array.round(6)).tolist()
+
+
+class PivotEngine:
+    """Pivots over a PivotCube snapshot, cached per query"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._cube = None
+        self._version = None
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "reloads": 0}
+
+    def _current(self) -> Tuple[PivotCube, int]:
+        version = current_data_version()
+        with self._lock:
+            if self._cube is not None and self._version == version:
+                return self._cube, version
+        # Build outside the lock; concurrent builders just build the same cube
+        cube = PivotCube()
+        with self._lock:
+            self._cube, self._version = cube, version
+            self._results.clear()
+            self._stats["reloads"] += 1
+        return cube, version
+
+    def pivot(self, query: PivotQuery, fact: str) -> dict:
+        cube, version = self._current()
+        key = (query, fact)
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None and cached[0] == version:
+                self._results.move_to_end(key)
+                self._stats["hits"] += 1
+                return cached[1]
+            self._stats["misses"] += 1
+
+        result = cube.pivot(query, fact)
+        with self._lock:
+            if self._version == version:
+                self._results[key] = (version, result)
+                while len(self._results) > self.max_entries:
+                    self._results.popitem(last=False)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"pivots_cached": len(self._results), **self._stats}
+
+
+pivot_engine = PivotEngine()
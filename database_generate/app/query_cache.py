@@ -0,0 +1,258 @@
+"""
+Query result cache
+Caches execute_query results keyed on normalized SQL plus parameters.
+Each entry remembers the tables it read and is only invalidated when one of
+those tables changes.
+"""
+
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Iterable, Optional
+
+_WHITESPACE = re.compile(r"\s+")
+_TOKEN = re.compile(
+    r"""\s*(?:('(?:[^']|'')*')"""                                    # string literal
+    r"""|("(?:[^"]|"")*"|\[[^\]]*\]|`[^`]*`)"""                      # quoted name
+    r"|((?:[A-Za-z_][A-Za-z0-9_]*\s*\.\s*)?[A-Za-z_][A-Za-z0-9_]*)"  # [schema.]name
+    r"|(\S))"
+)
+# Keywords ending a FROM clause
+_FROM_END = frozenset(["WHERE", "GROUP", "HAVING", "WINDOW", "ORDER", "LIMIT", "UNION", "EXCEPT", "INTERSECT"])
+# "DO UPDATE SET" in an upsert is not a table name
+_WRITE_TABLES = re.compile(
+    r"\b(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+(?!SET\b)([A-Za-z_][A-Za-z0-9_]*)",
+    re.IGNORECASE
+)
+# Results of these depend on more than table contents
+_NONDETERMINISTIC = re.compile(r"\b(?:random|randomblob|changes|last_insert_rowid)\s*\(|'now'|\bCURRENT_(?:DATE|TIME|TIMESTAMP)\b", re.IGNORECASE)
+
+
+def normalize_sql(query: str) -> str:
+    """Collapse whitespace so formatting differences share one cache entry"""
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+@lru_cache(maxsize=1024)
+def read_tables(query: str) -> Optional[frozenset]:
+    """
+    Tables named in FROM clauses: after FROM, after JOIN and after each comma
+    of a FROM list ("FROM a, b"), subqueries included
+
+    Returns None when a table is named in a way not parsed here (a quoted name,
+    for one), as the tables read, and so the result's validity, are then unknown.
+    """
+    tables = set()
+    in_from = [False]      # per parenthesis level
+    expect_table = False
+    for literal, quoted, name, symbol in _TOKEN.findall(query):
+        if literal:
+            continue
+        if expect_table:
+            expect_table = False
+            if name:
+                tables.add(name.rsplit(".", 1)[-1].strip().lower())
+                continue
+            if symbol != "(":
+                return None
+        if name:
+            keyword = name.upper()
+            if keyword == "FROM":
+                in_from[-1] = expect_table = True
+            elif keyword == "JOIN":
+                expect_table = in_from[-1]
+            elif keyword in _FROM_END:
+                in_from[-1] = False
+        elif symbol == "(":
+            in_from.append(False)
+        elif symbol == ")":
+            if len(in_from) > 1:
+                in_from.pop()
+        elif symbol == ",":
+            expect_table = in_from[-1]
+    return frozenset(tables)
+
+
+def written_tables(query: str) -> frozenset:
+    """Tables modified by an INSERT/UPDATE/DELETE/REPLACE statement"""
+    return frozenset(name.lower() for name in _WRITE_TABLES.findall(query))
+
+
+def is_cacheable(query: str) -> bool:
+    """Only plain SELECT/WITH queries with deterministic results, reading known tables, are cached"""
+    head = query.lstrip()[:6].upper()
+    if not (head.startswith("SELECT") or head.startswith("WITH")):
+        return False
+    return not _NONDETERMINISTIC.search(query) and read_tables(query) is not None
+
+
+def estimate_size(value) -> int:
+    """Approximate memory footprint of a cached result in bytes"""
+    if value is None:
+        return 16
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items())
+    return sys.getsizeof(value) + sum(estimate_size(row) for row in value)
+
+
+class QueryCache:
+    """
+    LRU cache of query results bounded by entry count and total bytes
+
+    Every table has a version counter. An entry stores the versions of the
+    tables it read when the query ran; a lookup only hits while all of them are
+    unchanged. Writes in this process bump the counters of the tables they touch.
+    Changes made by other processes are picked up through `change_detector`,
+    a callable returning a value (e.g. PRAGMA data_version) that differs after
+    any outside commit; since it cannot tell which tables changed, every entry is
+    dropped when it moves.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        change_detector: Optional[Callable[[], object]] = None,
+        check_interval: float = 1.0
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.change_detector = change_detector
+        self.check_interval = check_interval
+
+        self._entries = OrderedDict()  # key -> (result, table_versions, size)
+        self._table_versions = {}
+        self._epoch = 0  # advanced by clear() so in-flight results are discarded
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._check_lock = threading.Lock()
+        self._last_marker = None
+        self._last_check = 0.0
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "stale": 0,
+            "evictions": 0,
+            "invalidations": 0,
+            "uncacheable": 0
+        }
+
+    @staticmethod
+    def make_key(query: str, params, fetch_one: bool) -> tuple:
+        if isinstance(params, dict):
+            params = sorted(params.items())
+        return (normalize_sql(query), tuple(params), fetch_one)
+
+    def _check_external_changes(self):
+        """Poll the change detector, flushing everything if the database changed"""
+        if self.change_detector is None:
+            return
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        # Another thread is already polling
+        if not self._check_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_check = now
+            try:
+                marker = self.change_detector()
+            except Exception:
+                marker = None
+            if marker != self._last_marker:
+                if self._last_marker is not None:
+                    self.clear()
+                self._last_marker = marker
+        finally:
+            self._check_lock.release()
+
+    def snapshot(self, tables: Iterable[str]) -> tuple:
+        """Current versions of the given tables, taken before a query runs"""
+        with self._lock:
+            return self._epoch, tuple((t, self._table_versions.get(t, 0)) for t in sorted(tables))
+
+    def _is_current(self, versions: tuple) -> bool:
+        epoch, table_versions = versions
+        return epoch == self._epoch and all(self._table_versions.get(t, 0) == v for t, v in table_versions)
+
+    def get(self, key: tuple):
+        """
+        Look up a cached result
+
+        Returns:
+            (True, result) on a hit, (False, None) on a miss
+        """
+        self._check_external_changes()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return False, None
+
+            result, versions, size = entry
+            if not self._is_current(versions):
+                del self._entries[key]
+                self._bytes -= size
+                self._stats["stale"] += 1
+                self._stats["misses"] += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return True, result
+
+    def put(self, key: tuple, result, versions: tuple):
+        """Store a result along with the table versions it was read at"""
+        size = estimate_size(result)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            # Drop results computed before a concurrent write to their tables
+            if not self._is_current(versions):
+                return
+
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (result, versions, size)
+            self._bytes += size
+
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._stats["evictions"] += 1
+
+    def invalidate_tables(self, tables: Iterable[str]):
+        """Mark tables as changed; entries that read them become stale"""
+        with self._lock:
+            for table in tables:
+                self._table_versions[table] = self._table_versions.get(table, 0) + 1
+            self._stats["invalidations"] += 1
+
+    def clear(self):
+        """Drop every entry, including results still being computed"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._epoch += 1
+            self._stats["invalidations"] += 1
+
+    def record_uncacheable(self):
+        with self._lock:
+            self._stats["uncacheable"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+                **self._stats
+            }
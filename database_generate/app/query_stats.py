@@ -0,0 +1,175 @@
+"""
+Per-query instrumentation
+Records wall time, row counts and calling route for every statement run through
+app.database, and keeps the EXPLAIN QUERY PLAN of statements that run slowly.
+"""
+
+import logging
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import List, Optional
+
+from app.query_cache import normalize_sql
+
+logger = logging.getLogger("app.queries")
+
+# Route template ("GET /interviews/{interview_id}") of the request being served
+current_route: ContextVar[Optional[str]] = ContextVar("current_route", default=None)
+
+
+def format_plan(rows) -> List[str]:
+    """Render EXPLAIN QUERY PLAN rows (id, parent, notused, detail) as an indented tree"""
+    depth = {0: -1}
+    lines = []
+    for row in rows:
+        node_id, parent, detail = row[0], row[1], row[3]
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
+class _StatementStats:
+    __slots__ = ("sql", "kind", "calls", "cache_hits", "total_ms", "max_ms", "rows",
+                 "slow_calls", "samples", "routes", "plan", "last_slow_ms")
+
+    def __init__(self, sql: str, kind: str, sample_size: int):
+        self.sql = sql
+        self.kind = kind
+        self.calls = 0
+        self.cache_hits = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.slow_calls = 0
+        self.samples = deque(maxlen=sample_size)
+        self.routes = Counter()
+        self.plan = None
+        self.last_slow_ms = None
+
+
+def _percentile(values, fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+class QueryStats:
+    """
+    Aggregated timings per distinct statement
+
+    Statements are keyed on whitespace-normalized SQL, so the same inline query
+    from a route is aggregated regardless of its parameters. Durations are kept
+    in a bounded window per statement for percentile estimates.
+    """
+
+    def __init__(self, slow_threshold_ms: float = 100.0, sample_size: int = 1000, max_statements: int = 1000):
+        self.slow_threshold_ms = slow_threshold_ms
+        self.sample_size = sample_size
+        self.max_statements = max_statements
+        self._statements = {}
+        self._lock = threading.Lock()
+        self._started = time.time()
+
+    def _entry(self, sql: str, kind: str) -> _StatementStats:
+        key = normalize_sql(sql)
+        entry = self._statements.get(key)
+        if entry is None:
+            if len(self._statements) >= self.max_statements:
+                # Forget the least-used statement to stay bounded (e.g. ad-hoc chat SQL)
+                least_used = min(self._statements, key=lambda k: self._statements[k].calls)
+                del self._statements[least_used]
+            entry = _StatementStats(key, kind, self.sample_size)
+            self._statements[key] = entry
+        return entry
+
+    def is_slow(self, duration_ms: float) -> bool:
+        return duration_ms >= self.slow_threshold_ms
+
+    def needs_plan(self, sql: str) -> bool:
+        """Whether a slow statement still has no captured plan"""
+        with self._lock:
+            entry = self._statements.get(normalize_sql(sql))
+            return entry is None or entry.plan is None
+
+    def record(self, sql: str, duration_ms: float, rows: int, kind: str = "read", plan: Optional[List[str]] = None):
+        """Record one execution of a statement against SQLite"""
+        route = current_route.get()
+        with self._lock:
+            entry = self._entry(sql, kind)
+            entry.calls += 1
+            entry.total_ms += duration_ms
+            entry.max_ms = max(entry.max_ms, duration_ms)
+            entry.rows += rows
+            entry.samples.append(duration_ms)
+            entry.routes[route or "-"] += 1
+            if self.is_slow(duration_ms):
+                entry.slow_calls += 1
+                entry.last_slow_ms = duration_ms
+                if plan is not None:
+                    entry.plan = plan
+
+        if self.is_slow(duration_ms):
+            logger.warning(
+                "Slow query (%.1f ms, %d rows, route %s): %s",
+                duration_ms, rows, route or "-", normalize_sql(sql)[:500]
+            )
+
+    def record_cache_hit(self, sql: str):
+        """Count a lookup answered by the query cache (no SQLite work)"""
+        route = current_route.get()
+        with self._lock:
+            entry = self._entry(sql, "read")
+            entry.cache_hits += 1
+            entry.routes[route or "-"] += 1
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+            self._started = time.time()
+
+    def report(self, limit: int = 20, sort_by: str = "total_ms") -> dict:
+        """
+        Top-N statements with their aggregates
+
+        Args:
+            limit: Number of statements to return
+            sort_by: total_ms, p95_ms, max_ms, calls or slow_calls
+        """
+        with self._lock:
+            statements = []
+            all_samples = []
+            for entry in self._statements.values():
+                samples = list(entry.samples)
+                all_samples.extend(samples)
+                statements.append({
+                    "sql": entry.sql,
+                    "kind": entry.kind,
+                    "calls": entry.calls,
+                    "cache_hits": entry.cache_hits,
+                    "total_ms": round(entry.total_ms, 3),
+                    "avg_ms": round(entry.total_ms / entry.calls, 3) if entry.calls else None,
+                    "p95_ms": round(_percentile(samples, 0.95), 3) if samples else None,
+                    "max_ms": round(entry.max_ms, 3),
+                    "rows": entry.rows,
+                    "avg_rows": round(entry.rows / entry.calls, 1) if entry.calls else None,
+                    "slow_calls": entry.slow_calls,
+                    "routes": dict(entry.routes.most_common(5)),
+                    "query_plan": entry.plan
+                })
+            since = self._started
+
+        statements.sort(key=lambda s: s.get(sort_by) or 0, reverse=True)
+        return {
+            "since": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(since)),
+            "slow_threshold_ms": self.slow_threshold_ms,
+            "distinct_statements": len(statements),
+            "total_calls": sum(s["calls"] for s in statements),
+            "total_cache_hits": sum(s["cache_hits"] for s in statements),
+            "total_ms": round(sum(s["total_ms"] for s in statements), 3),
+            "p95_ms": round(_percentile(all_samples, 0.95), 3) if all_samples else None,
+            "statements": statements[:limit]
+        }
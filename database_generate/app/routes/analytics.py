@@ -2,71 +2,145 @@
 Analytics API Routes
 """
 
-from fastapi import APIRouter
-from app.database import execute_query
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Optional
+from app.database import execute_query, get_connection
+from app.cohorts import CohortFilter, cohort_engine
+from app.pivot import COMMON_MEASURES, FACTS, INTERVIEW_DIMENSIONS, MAX_PIVOT_DIMENSIONS, PivotQuery, pivot_engine, resolve_fact
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
+def _values(values: Optional[list]) -> tuple:
+    """Repeated query parameter as a sorted tuple, so equal cohorts share a cache entry"""
+    return tuple(sorted(set(values))) if values else ()
+
 @router.get("/summary")
-def get_analytics_summary():
-    """Get overall analytics summary"""
-    
-    # Total counts
-    total_interviews = execute_query(
-        "SELECT COUNT(*) as total_interviews FROM interviews",
-        fetch_one=True
-    )['total_interviews']
-    
-    total_segments = execute_query(
-        "SELECT COUNT(*) as total_segments FROM segments",
-        fetch_one=True
-    )['total_segments']
-    
-    total_brands = execute_query(
-        "SELECT COUNT(*) as total_brands FROM brands",
-        fetch_one=True
-    )['total_brands']
+def get_analytics_summary(
+    segment_id: Optional[List[int]] = Query(None, description="Segment ID (repeat for several)"),
+    min_age: Optional[int] = Query(None, description="Minimum age"),
+    max_age: Optional[int] = Query(None, description="Maximum age"),
+    gender: Optional[List[str]] = Query(None, description="Gender (repeat for several)"),
+    role: Optional[List[str]] = Query(None, description="Role contains (repeat for several)"),
+    brand_id: Optional[List[int]] = Query(None, description="Participant currently uses brand (repeat for several)"),
+    theme_id: Optional[List[int]] = Query(None, description="Interview mentions theme (repeat for several)")
+):
+    """
+    Get the analytics summary, for all interviews or for a cohort
     
-    total_themes = execute_query(
-        "SELECT COUNT(*) as total_themes FROM themes",
-        fetch_one=True
-    )['total_themes']
+    With any filter the summary covers only the matching interviews: several values
+    of one filter match any of them, different filters must all match. For a cohort,
+    total_segments, total_brands and total_themes count those present in the cohort.
+    """
+    cohort = CohortFilter(
+        segment_ids=_values(segment_id),
+        min_age=min_age,
+        max_age=max_age,
+        genders=_values(gender),
+        roles=_values(role),
+        brand_ids=_values(brand_id),
+        theme_ids=_values(theme_id)
+    )
+    if not cohort.is_empty():
+        return cohort_engine.summary(cohort)
+    return overall_summary()
+
+def _dimensions(value: Optional[str]) -> tuple:
+    return tuple(name.strip() for name in value.split(",") if name.strip()) if value else ()
+
+@router.get("/pivot")
+def get_pivot(
+    rows: str = Query(..., description="Comma-separated row dimensions, e.g. segment"),
+    cols: Optional[str] = Query(None, description="Comma-separated column dimensions, e.g. theme,sentiment"),
+    measure: str = Query("count", description="count, interviews, avg_confidence or avg_satisfaction"),
+    fact: Optional[str] = Query(None, description="themes, brands or perceptions (default: first that has the dimensions)")
+):
+    """
+    Cross-tabulate a measure by row and column dimensions
     
-    # Age distribution
-    age_distribution = execute_query("""
-        SELECT 
-            CASE 
-                WHEN age < 25 THEN '18-24'
-                WHEN age < 35 THEN '25-34'
-                WHEN age < 45 THEN '35-44'
-                WHEN age < 55 THEN '45-54'
-                ELSE '55+'
-            END as age_group,
-            COUNT(*) as count
-        FROM personas
-        WHERE age IS NOT NULL
-        GROUP BY age_group
-        ORDER BY age_group
-    """)
+    Dimensions of every fact table: segment, age_group, gender, role. themes
+    (interview_themes) adds theme, theme_category, sentiment, importance_level;
+    brands (interview_brands) adds brand, currently_using, awareness_level,
+    purchase_frequency; perceptions (brand_perceptions) adds brand,
+    perception_category, sentiment. count counts fact rows and interviews counts
+    distinct interviews; avg_confidence (themes) and avg_satisfaction (brands)
+    average over rows that have a value. Totals are computed over the same rows,
+    so for interviews and averages they are not the sum of the cells.
+    """
+    query = PivotQuery(_dimensions(rows), _dimensions(cols), measure, fact)
+    known = set(INTERVIEW_DIMENSIONS).union(*(spec["dimensions"] for spec in FACTS.values()))
+    unknown = sorted(set(query.rows + query.cols) - known)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown dimension(s): {', '.join(unknown)}. Choose from: {', '.join(sorted(known))}"
+        )
+    dimensions = query.rows + query.cols
+    if not query.rows or len(set(dimensions)) != len(dimensions) or len(dimensions) > MAX_PIVOT_DIMENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Give 1 to {MAX_PIVOT_DIMENSIONS} distinct dimensions in rows and cols, at least one in rows"
+        )
+    measures = set(COMMON_MEASURES).union(*(spec["measures"] for spec in FACTS.values()))
+    if measure not in measures:
+        raise HTTPException(status_code=400, detail=f"Unknown measure: {measure}. Choose from: {', '.join(sorted(measures))}")
+    if fact is not None and fact not in FACTS:
+        raise HTTPException(status_code=400, detail=f"Unknown fact: {fact}. Choose from: {', '.join(FACTS)}")
     
-    # Top themes
-    top_themes = execute_query("""
-        SELECT t.theme_name_th, COUNT(*) as mention_count
-        FROM interview_themes it
-        JOIN themes t ON it.theme_id = t.theme_id
-        GROUP BY t.theme_id
-        ORDER BY mention_count DESC
-        LIMIT 10
-    """)
+    resolved = resolve_fact(query)
+    if resolved is None:
+        raise HTTPException(status_code=400, detail="No fact table has all of these dimensions and this measure")
+    return pivot_engine.pivot(query, resolved)
+
+def overall_summary() -> dict:
+    """Analytics summary of the whole dataset, from the summary tables"""
     
-    # Brand mentions
-    brand_mentions = execute_query("""
-        SELECT b.brand_name, COUNT(DISTINCT ib.interview_id) as interview_count
-        FROM interview_brands ib
-        JOIN brands b ON ib.brand_id = b.brand_id
-        GROUP BY b.brand_id
-        ORDER BY interview_count DESC
-    """)
+    with get_connection():
+        # Total counts
+        total_interviews = execute_query(
+            "SELECT COUNT(*) as total_interviews FROM interviews",
+            fetch_one=True
+        )['total_interviews']
+        
+        total_segments = execute_query(
+            "SELECT COUNT(*) as total_segments FROM segments",
+            fetch_one=True
+        )['total_segments']
+        
+        total_brands = execute_query(
+            "SELECT COUNT(*) as total_brands FROM brands",
+            fetch_one=True
+        )['total_brands']
+        
+        total_themes = execute_query(
+            "SELECT COUNT(*) as total_themes FROM themes",
+            fetch_one=True
+        )['total_themes']
+        
+        # Age distribution (materialized in persona_demographics)
+        age_distribution = execute_query("""
+            SELECT bucket as age_group, persona_count as count
+            FROM persona_demographics
+            WHERE dimension = 'age_group'
+            ORDER BY age_group
+        """)
+        
+        # Top themes (materialized in theme_sentiment_stats)
+        top_themes = execute_query("""
+            SELECT t.theme_name_th, SUM(s.mention_count) as mention_count
+            FROM theme_sentiment_stats s
+            JOIN themes t ON s.theme_id = t.theme_id
+            GROUP BY t.theme_id
+            ORDER BY mention_count DESC, t.theme_id
+            LIMIT 10
+        """)
+        
+        # Brand mentions (materialized in brand_stats)
+        brand_mentions = execute_query("""
+            SELECT b.brand_name, s.interview_count
+            FROM brand_stats s
+            JOIN brands b ON s.brand_id = b.brand_id
+            ORDER BY s.interview_count DESC, b.brand_id
+        """)
     
     return {
         "total_interviews": total_interviews,
@@ -2,55 +2,83 @@
 Brands API Routes
 """
 
-from fastapi import APIRouter, HTTPException
-from typing import List
-from app.models import Brand
-from app.database import execute_query
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Optional
+from app.models import Brand, BrandPerception
+from app.database import execute_query, get_connection
+from app.serialization import rows_response
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, count_total
+from app.fields import parse_fields, select_columns, trim_columns, fields_model
 
 router = APIRouter(prefix="/brands", tags=["Brands"])
 
 @router.get("", response_model=List[Brand])
-def get_brands():
+def get_brands(
+    fields: Optional[str] = Query(None, description="Comma-separated brand fields to return (default: all)")
+):
     """Get all brands"""
-    query = "SELECT * FROM brands ORDER BY brand_name"
-    return execute_query(query)
+    fields = parse_fields(fields, Brand)
+    query = f"SELECT {select_columns(fields)} FROM brands ORDER BY brand_name"
+    return rows_response(execute_query(query), fields_model(Brand, fields))
 
 @router.get("/{brand_id}")
-def get_brand_detail(brand_id: int):
-    """Get brand details with perceptions and mentions"""
-    
-    # Get brand
-    brand_query = "SELECT * FROM brands WHERE brand_id = ?"
-    brand = execute_query(brand_query, (brand_id,), fetch_one=True)
-    
-    if not brand:
-        raise HTTPException(status_code=404, detail="Brand not found")
-    
-    # Get perceptions
-    perceptions_query = """
-        SELECT bp.*, i.interview_id, p.role
-        FROM brand_perceptions bp
-        JOIN interviews i ON bp.interview_id = i.interview_id
-        JOIN personas p ON i.interview_id = p.interview_id
-        WHERE bp.brand_id = ?
-        ORDER BY bp.created_at DESC
+def get_brand_detail(
+    brand_id: int,
+    fields: Optional[str] = Query(None, description="Comma-separated perception fields to return (default: all)"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum perceptions per page"),
+    cursor: Optional[str] = Query(None, description="perceptions_next_cursor of the previous page")
+):
     """
-    perceptions = execute_query(perceptions_query, (brand_id,))
+    Get brand details with perceptions and mentions
     
-    # Get mention statistics
-    stats_query = """
-        SELECT 
-            COUNT(DISTINCT interview_id) as total_mentions,
-            AVG(mentioned_count) as avg_mentions_per_interview,
-            SUM(CASE WHEN currently_using = 1 THEN 1 ELSE 0 END) as currently_using_count,
-            SUM(CASE WHEN has_used_before = 1 THEN 1 ELSE 0 END) as has_used_count
-        FROM interview_brands
-        WHERE brand_id = ?
+    Perceptions are paginated, newest first; perceptions_total is the number of
+    perceptions and perceptions_next_cursor fetches the next page (null on the last).
+    Perceptions always include the interview's role alongside the requested fields.
     """
-    stats = execute_query(stats_query, (brand_id,), fetch_one=True)
+    fields = parse_fields(fields, BrandPerception)
+    
+    with get_connection():
+        # Get brand
+        brand_query = "SELECT * FROM brands WHERE brand_id = ?"
+        brand = execute_query(brand_query, (brand_id,), fetch_one=True)
+        
+        if not brand:
+            raise HTTPException(status_code=404, detail="Brand not found")
+        
+        # Get perceptions
+        perceptions_from = """
+            FROM brand_perceptions bp
+            JOIN interviews i ON bp.interview_id = i.interview_id
+            JOIN personas p ON i.interview_id = p.interview_id
+            WHERE bp.brand_id = ?
+        """
+        perceptions, next_cursor = paginate(
+            f"SELECT {select_columns(fields, 'bp', required=['created_at', 'id'])}, i.interview_id, p.role",
+            perceptions_from,
+            (brand_id,),
+            [("bp.created_at", "created_at", True), ("bp.id", "id", False)],
+            limit,
+            cursor
+        )
+        perceptions = trim_columns(perceptions, fields, extra=["interview_id", "role"])
+        perceptions_total = count_total(perceptions_from, (brand_id,))
+        
+        # Get mention statistics
+        stats_query = """
+            SELECT 
+                COUNT(DISTINCT interview_id) as total_mentions,
+                AVG(mentioned_count) as avg_mentions_per_interview,
+                SUM(CASE WHEN currently_using = 1 THEN 1 ELSE 0 END) as currently_using_count,
+                SUM(CASE WHEN has_used_before = 1 THEN 1 ELSE 0 END) as has_used_count
+            FROM interview_brands
+            WHERE brand_id = ?
+        """
+        stats = execute_query(stats_query, (brand_id,), fetch_one=True)
     
     return {
         "brand": brand,
         "perceptions": perceptions,
+        "perceptions_total": perceptions_total,
+        "perceptions_next_cursor": next_cursor,
         "statistics": stats
     }
@@ -4,11 +4,20 @@ Allows users to ask questions about the interview data using natural language
 """
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
-from app.database import execute_query
-from app.services.openai_service import generate_sql_with_openai, is_openai_configured, generate_report_from_results
-import json
+from starlette.concurrency import run_in_threadpool
+from typing import AsyncIterator, List, Optional, Tuple
+from app.database import current_data_version
+from app.serialization import dumps
+from app.sql_sandbox import (
+    SQLSandbox, SQLSandboxError, SQL_SANDBOX_MAX_ROWS, SQL_SANDBOX_MAX_VM_STEPS, SQL_SANDBOX_TIME_LIMIT
+)
+from app.services.openai_service import (
+    generate_sql_cached, is_openai_configured, generate_report_from_results, stream_report_from_results
+)
+from app.services.semantic_cache import SEMANTIC_CACHE_ENABLED, SemanticMatch, semantic_cache
+from app.services.sql_cache import SQL_CACHE_ENABLED
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
@@ -22,6 +31,22 @@ class ChatResponse(BaseModel):
     data: Optional[List[dict]] = None
     table_info: Optional[dict] = None
     report: Optional[str] = None
+    truncated: bool = False
+    matched_question: Optional[str] = None  # earlier question whose answer was reused
+
+# Sample questions for GET /chat/suggestions; their SQL is generated at startup
+QUERY_SUGGESTIONS = [
+    "มีกี่คนที่สัมภาษณ์?",
+    "อายุเฉลี่ยของผู้ให้สัมภาษณ์คือเท่าไร?",
+    "แสดงการกระจายตัวของอายุ",
+    "มีอาชีพอะไรบ้าง?",
+    "Theme ไหนที่ได้รับความนิยมมากที่สุด?",
+    "Theme ที่มี sentiment เป็น positive มากที่สุด",
+    "Theme ที่มี sentiment เป็น negative มากที่สุด",
+    "แบรนด์ไหนที่ผู้ใช้พูดถึงมากที่สุด?",
+    "แสดงการกระจายตัวของเพศ",
+    "แสดงการกระจายตัวของ sentiment"
+]
 
 # Available tables and their descriptions
 AVAILABLE_TABLES = {
@@ -63,6 +88,9 @@ AVAILABLE_TABLES = {
     }
 }
 
+# Runs the SQL answering chat questions: reads of these tables only, within a budget
+sql_sandbox = SQLSandbox(AVAILABLE_TABLES, SQL_SANDBOX_MAX_ROWS, SQL_SANDBOX_MAX_VM_STEPS, SQL_SANDBOX_TIME_LIMIT)
+
 def get_table_schema(table_name: str) -> str:
     """Get schema information for a table"""
     if table_name not in AVAILABLE_TABLES:
@@ -184,12 +212,97 @@ def generate_sql_from_question(question: str, selected_tables: List[str] = None)
     # Default: show available tables
     return None
 
+async def resolve_sql(question: str, selected_tables: Optional[List[str]]) -> Tuple[Optional[str], bool]:
+    """
+    SQL for the question: from OpenAI if configured, else (or on failure) rule-based
+    
+    Returns:
+        (sql_query or None when the question is not understood, whether AI generated it)
+    """
+    if is_openai_configured():
+        result = await generate_sql_cached(question, selected_tables)
+        if result["success"]:
+            return result["sql_query"], True
+        print(f"OpenAI error: {result['error']}, falling back to rule-based")
+    
+    # Fallback to rule-based approach if OpenAI not available or failed
+    return generate_sql_from_question(question, selected_tables), False
+
+def unknown_question_text() -> str:
+    ai_status = "🤖 AI-Powered" if is_openai_configured() else "📋 Rule-Based"
+    return (
+        f"{ai_status}\n\nฉันไม่เข้าใจคำถามของคุณ กรุณาลองถามใหม่ เช่น:\n"
+        f"- มีกี่คนที่สัมภาษณ์?\n"
+        f"- อายุเฉลี่ยของผู้ให้สัมภาษณ์คือเท่าไร?\n"
+        f"- Theme ไหนที่ได้รับความนิยมมากที่สุด?\n"
+        f"- แบรนด์ไหนที่ผู้ใช้พูดถึงมากที่สุด?\n"
+        f"- แสดงการกระจายตัวของอายุ\n"
+        f"- Theme ที่มี sentiment เป็น positive มากที่สุด"
+    )
+
+def format_response_text(
+    result: List[dict], sql_query: str, using_ai: bool, ai_report: Optional[str], truncated: bool = False
+) -> str:
+    """Chat answer for a non-empty result, around the AI report when there is one"""
+    ai_indicator = "🤖 AI" if using_ai else "📋 Rule"
+    more = "+" if truncated else ""
+    
+    # If we have AI report, use it as the main response
+    if ai_report:
+        return f"[{ai_indicator}] {ai_report}\n\n---\n\nข้อมูลดิบ: พบ {len(result)}{more} รายการ"
+    
+    # Fallback to simple formatting
+    response_text = f"[{ai_indicator}] ฉันพบข้อมูล {len(result)}{more} รายการ:\n\n"
+    
+    # Format based on query type
+    if "COUNT(*)" in sql_query.upper():
+        count_value = result[0].get('total_interviews') or result[0].get('total_personas') or \
+                     result[0].get('total_themes') or result[0].get('total_brands') or \
+                     result[0].get('count') or result[0].get('COUNT(*)')
+        response_text = f"[{ai_indicator}] จำนวนทั้งหมด: {count_value}"
+    elif "AVG(age)" in sql_query.upper():
+        avg_age = round(result[0].get('average_age', 0), 1)
+        response_text = f"[{ai_indicator}] อายุเฉลี่ย: {avg_age} ปี"
+    else:
+        # Show top results
+        for i, row in enumerate(result[:10], 1):
+            row_text = ", ".join([f"{k}: {v}" for k, v in row.items()])
+            response_text += f"{i}. {row_text}\n"
+        
+        if len(result) > 10:
+            response_text += f"\n... และอีก {len(result) - 10}{more} รายการ"
+    return response_text
+
+NO_RESULTS_TEXT = "ไม่พบข้อมูลที่ตรงกับคำถามของคุณ"
+
+def find_similar_answer(question: str, selected_tables: Optional[List[str]]) -> Tuple[Optional[SemanticMatch], Optional[int]]:
+    """
+    Answer of a near-duplicate of the question answered before, from the semantic cache
+    
+    Returns:
+        (match or None, data version the answer would be stored under; None when not caching)
+    """
+    if not SEMANTIC_CACHE_ENABLED or not is_openai_configured():
+        return None, None
+    data_version = current_data_version()
+    return semantic_cache.get(question, selected_tables, data_version), data_version
+
+async def remember_answer(question: str, selected_tables: Optional[List[str]], response: ChatResponse,
+                          using_ai: bool, data_version: Optional[int]):
+    # Only complete AI answers: a rule-based fallback or a missing report would be served for good
+    if data_version is None or not using_ai or (response.data and not response.report):
+        return
+    await run_in_threadpool(semantic_cache.put, question, selected_tables, response.model_dump(), data_version)
+
 @router.post("/ask", response_model=ChatResponse)
-def chat_with_database(chat_message: ChatMessage):
+async def chat_with_database(chat_message: ChatMessage):
     """
     Chat with the database using natural language
     Returns relevant data based on the question
     Uses OpenAI GPT if configured, otherwise falls back to rule-based approach
+    
+    Runs on the event loop: OpenAI calls are awaited and the query runs in the
+    threadpool, so no thread is held while waiting for the model.
     """
     try:
         question = chat_message.message.strip()
@@ -198,99 +311,144 @@ def chat_with_database(chat_message: ChatMessage):
         if not question:
             raise HTTPException(status_code=400, detail="Message cannot be empty")
         
-        # Try OpenAI first if configured
-        sql_query = None
-        using_ai = False
-        #print("question()", question, is_openai_configured())
-        #print("is_openai_configured()", question, is_openai_configured())
-        if is_openai_configured():
-            result = generate_sql_with_openai(question, selected_tables)
-            if result["success"]:
-                sql_query = result["sql_query"]
-                using_ai = True
-            else:
-                print(f"OpenAI error: {result['error']}, falling back to rule-based")
-        
-        # Fallback to rule-based approach if OpenAI not available or failed
-        if not sql_query:
-            sql_query = generate_sql_from_question(question, selected_tables)
-        
+        # A rewording of a question answered before gets the same answer without the model
+        match, data_version = await run_in_threadpool(find_similar_answer, question, selected_tables)
+        if match is not None:
+            return ChatResponse(**{**match.answer, "matched_question": match.question})
         
+        sql_query, using_ai = await resolve_sql(question, selected_tables)
         
         if not sql_query:
             # Return available tables and suggestions
-            ai_status = "🤖 AI-Powered" if is_openai_configured() else "📋 Rule-Based"
             return ChatResponse(
-                response=f"{ai_status}\n\nฉันไม่เข้าใจคำถามของคุณ กรุณาลองถามใหม่ เช่น:\n"
-                        f"- มีกี่คนที่สัมภาษณ์?\n"
-                        f"- อายุเฉลี่ยของผู้ให้สัมภาษณ์คือเท่าไร?\n"
-                        f"- Theme ไหนที่ได้รับความนิยมมากที่สุด?\n"
-                        f"- แบรนด์ไหนที่ผู้ใช้พูดถึงมากที่สุด?\n"
-                        f"- แสดงการกระจายตัวของอายุ\n"
-                        f"- Theme ที่มี sentiment เป็น positive มากที่สุด",
+                response=unknown_question_text(),
                 sql_query=None,
                 data=None,
                 table_info=AVAILABLE_TABLES
             )
         
-        # Execute the query
-        result = execute_query(sql_query)
+        # Execute the query in the sandbox, which stops fetching at SQL_SANDBOX_MAX_ROWS
+        executed = await run_in_threadpool(sql_sandbox.execute, sql_query)
+        result = executed.rows
         
         # Generate AI report if OpenAI is configured and we have results
         ai_report = None
-        if is_openai_configured() and isinstance(result, list) and len(result) > 0:
-            report_result = generate_report_from_results(question, sql_query, result)
+        if is_openai_configured() and len(result) > 0:
+            report_result = await generate_report_from_results(
+                question, sql_query, result, truncated=executed.truncated
+            )
             if report_result["success"]:
                 ai_report = report_result["report"]
         
         # Format response
-        if isinstance(result, list) and len(result) > 0:
-            ai_indicator = "🤖 AI" if using_ai else "📋 Rule"
-            
-            # If we have AI report, use it as the main response
-            if ai_report:
-                response_text = f"[{ai_indicator}] {ai_report}\n\n---\n\nข้อมูลดิบ: พบ {len(result)} รายการ"
-            else:
-                # Fallback to simple formatting
-                response_text = f"[{ai_indicator}] ฉันพบข้อมูล {len(result)} รายการ:\n\n"
-                
-                # Format based on query type
-                if "COUNT(*)" in sql_query.upper():
-                    count_value = result[0].get('total_interviews') or result[0].get('total_personas') or \
-                                 result[0].get('total_themes') or result[0].get('total_brands') or \
-                                 result[0].get('count') or result[0].get('COUNT(*)')
-                    response_text = f"[{ai_indicator}] จำนวนทั้งหมด: {count_value}"
-                elif "AVG(age)" in sql_query.upper():
-                    avg_age = round(result[0].get('average_age', 0), 1)
-                    response_text = f"[{ai_indicator}] อายุเฉลี่ย: {avg_age} ปี"
-                else:
-                    # Show top results
-                    for i, row in enumerate(result[:10], 1):
-                        row_text = ", ".join([f"{k}: {v}" for k, v in row.items()])
-                        response_text += f"{i}. {row_text}\n"
-                    
-                    if len(result) > 10:
-                        response_text += f"\n... และอีก {len(result) - 10} รายการ"
-            
-            return ChatResponse(
-                response=response_text,
+        if len(result) > 0:
+            response = ChatResponse(
+                response=format_response_text(result, sql_query, using_ai, ai_report, executed.truncated),
                 sql_query=sql_query,
-                data=result[:50],  # Limit to 50 rows for performance
+                data=result,
                 table_info=None,
-                report=ai_report
+                report=ai_report,
+                truncated=executed.truncated
             )
         else:
-            return ChatResponse(
-                response="ไม่พบข้อมูลที่ตรงกับคำถามของคุณ",
+            response = ChatResponse(
+                response=NO_RESULTS_TEXT,
                 sql_query=sql_query,
                 data=[],
                 table_info=None,
                 report=None
             )
+        await remember_answer(question, selected_tables, response, using_ai, data_version)
+        return response
             
+    except HTTPException:
+        raise
+    except SQLSandboxError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing question: {str(e)}")
 
+def sse_event(event: str, data) -> bytes:
+    """One server-sent event with a JSON payload"""
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+async def stream_chat_events(question: str, selected_tables: Optional[List[str]]) -> AsyncIterator[bytes]:
+    try:
+        match, data_version = await run_in_threadpool(find_similar_answer, question, selected_tables)
+        if match is not None:
+            answer = {**match.answer, "matched_question": match.question}
+            yield sse_event("sql", {"sql_query": answer["sql_query"], "ai": True})
+            yield sse_event("data", {"rows": answer["data"], "truncated": answer["truncated"]})
+            if answer["report"]:
+                yield sse_event("report", {"text": answer["report"]})
+            yield sse_event("done", answer)
+            return
+        
+        sql_query, using_ai = await resolve_sql(question, selected_tables)
+        if not sql_query:
+            yield sse_event("done", ChatResponse(
+                response=unknown_question_text(), table_info=AVAILABLE_TABLES
+            ).model_dump())
+            return
+        yield sse_event("sql", {"sql_query": sql_query, "ai": using_ai})
+        
+        executed = await run_in_threadpool(sql_sandbox.execute, sql_query)
+        result = executed.rows
+        yield sse_event("data", {"rows": result, "truncated": executed.truncated})
+        if not result:
+            response = ChatResponse(response=NO_RESULTS_TEXT, sql_query=sql_query, data=[])
+            await remember_answer(question, selected_tables, response, using_ai, data_version)
+            yield sse_event("done", response.model_dump())
+            return
+        
+        ai_report = None
+        if is_openai_configured():
+            parts = []
+            try:
+                async for text in stream_report_from_results(
+                    question, sql_query, result, truncated=executed.truncated
+                ):
+                    parts.append(text)
+                    yield sse_event("report", {"text": text})
+                ai_report = "".join(parts).strip() or None
+            except Exception as e:
+                # Tokens already sent stay on the client; done carries the plain answer
+                print(f"OpenAI report stream error: {e}")
+        
+        response = ChatResponse(
+            response=format_response_text(result, sql_query, using_ai, ai_report, executed.truncated),
+            sql_query=sql_query,
+            data=result,
+            report=ai_report,
+            truncated=executed.truncated
+        )
+        await remember_answer(question, selected_tables, response, using_ai, data_version)
+        yield sse_event("done", response.model_dump())
+    except SQLSandboxError as e:
+        yield sse_event("error", {"detail": str(e)})
+    except Exception as e:
+        yield sse_event("error", {"detail": f"Error processing question: {str(e)}"})
+
+@router.post("/ask/stream")
+async def chat_with_database_stream(chat_message: ChatMessage):
+    """
+    Same answer as /chat/ask as server-sent events, sent as soon as each part is ready
+    
+    Events, in order: `sql` {sql_query, ai} once the SQL is generated, `data`
+    {rows, truncated} once it has run, `report` {text} for each piece of the AI report
+    as the model writes it, then `done` with the /chat/ask response. An answer
+    reused from the semantic cache sends the whole report as one `report`. A
+    question that is not understood sends only `done`; a failure sends `error` {detail}.
+    """
+    question = chat_message.message.strip()
+    if not question:
+        raise HTTPException(status_code=400, detail="Message cannot be empty")
+    return StreamingResponse(
+        stream_chat_events(question, chat_message.selected_tables),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/tables")
 def get_available_tables():
     """Get list of available tables and their schemas"""
@@ -303,18 +461,7 @@ def get_available_tables():
 def get_query_suggestions():
     """Get sample questions users can ask"""
     return {
-        "suggestions": [
-            "มีกี่คนที่สัมภาษณ์?",
-            "อายุเฉลี่ยของผู้ให้สัมภาษณ์คือเท่าไร?",
-            "แสดงการกระจายตัวของอายุ",
-            "มีอาชีพอะไรบ้าง?",
-            "Theme ไหนที่ได้รับความนิยมมากที่สุด?",
-            "Theme ที่มี sentiment เป็น positive มากที่สุด",
-            "Theme ที่มี sentiment เป็น negative มากที่สุด",
-            "แบรนด์ไหนที่ผู้ใช้พูดถึงมากที่สุด?",
-            "แสดงการกระจายตัวของเพศ",
-            "แสดงการกระจายตัวของ sentiment"
-        ],
+        "suggestions": QUERY_SUGGESTIONS,
         "categories": {
             "general": ["มีกี่คนที่สัมภาษณ์?", "อายุเฉลี่ยของผู้ให้สัมภาษณ์คือเท่าไร?"],
             "demographics": ["แสดงการกระจายตัวของอายุ", "มีอาชีพอะไรบ้าง?", "แสดงการกระจายตัวของเพศ"],
@@ -322,3 +469,21 @@ def get_query_suggestions():
             "brands": ["แบรนด์ไหนที่ผู้ใช้พูดถึงมากที่สุด?"]
         }
     }
+
+async def prewarm_sql_cache() -> int:
+    """
+    Generate and cache SQL for every suggested question not cached yet
+    
+    Returns:
+        Number of suggestions whose SQL is cached afterwards
+    """
+    if not SQL_CACHE_ENABLED or not is_openai_configured():
+        return 0
+    cached = 0
+    for question in QUERY_SUGGESTIONS:
+        result = await generate_sql_cached(question)
+        if result["success"]:
+            cached += 1
+        else:
+            print(f"SQL cache prewarm failed for {question!r}: {result['error']}")
+    return cached
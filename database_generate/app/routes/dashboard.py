@@ -0,0 +1,34 @@
+"""
+Dashboard API Routes
+"""
+
+from fastapi import APIRouter, Request
+from app.models import DashboardBootstrap
+from app.database import execute_query, read_transaction
+from app.http_cache import ResponseSnapshot
+from app.routes.analytics import overall_summary
+
+router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
+
+def build_bootstrap() -> dict:
+    """Everything the dashboard loads on first paint, read from one snapshot"""
+    with read_transaction():
+        return {
+            "interviews": execute_query("SELECT * FROM interviews ORDER BY interview_id"),
+            "personas": execute_query("SELECT * FROM personas ORDER BY interview_id"),
+            "brands": execute_query("SELECT * FROM brands ORDER BY brand_name"),
+            "analytics": overall_summary()
+        }
+
+bootstrap_snapshot = ResponseSnapshot(build_bootstrap)
+
+@router.get("/bootstrap", response_model=DashboardBootstrap)
+def get_dashboard_bootstrap(request: Request):
+    """
+    Get interviews, personas, brands and the analytics summary in one response
+
+    Same content as GET /interviews, /personas, /brands (all pages) and
+    /analytics/summary. The response is encoded and compressed once per database
+    change and served from memory until the next one.
+    """
+    return bootstrap_snapshot.response(request.headers.get("accept-encoding"))
@@ -0,0 +1,22 @@
+"""
+Debug API Routes
+Query instrumentation for finding slow statements and full scans
+"""
+
+from fastapi import APIRouter, HTTPException, Query
+from app.database import get_query_stats
+
+router = APIRouter(prefix="/debug", tags=["Debug"])
+
+@router.get("/queries")
+def get_queries(
+    limit: int = Query(20, ge=1, le=500, description="Number of statements to return"),
+    sort_by: str = Query("total_ms", pattern="^(total_ms|p95_ms|max_ms|calls|slow_calls)$", description="Sort key")
+):
+    """Get per-statement timings (top-N by total time by default) with captured query plans"""
+    report = get_query_stats(limit, sort_by)
+    
+    if report is None:
+        raise HTTPException(status_code=404, detail="Query instrumentation is disabled (QUERY_STATS_ENABLED=0)")
+    
+    return report
@@ -0,0 +1,238 @@
+"""
+Export API Routes
+Streams whole tables (or filtered column subsets) as NDJSON, CSV or Parquet.
+Rows are read with fetchmany in batches of EXPORT_BATCH_SIZE and each batch is
+encoded and sent before the next is read, so memory use does not grow with the
+size of the table.
+"""
+
+import csv
+import io
+import logging
+import os
+import time
+from typing import Iterator, List, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from app.database import execute_query, read_connection
+from app.routes.chat import AVAILABLE_TABLES
+from app.serialization import dumps
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # optional; only needed for format=parquet
+    pyarrow = None
+
+router = APIRouter(prefix="/export", tags=["Export"])
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+# Longest an export may keep its connection (and so a replaced database file) open
+EXPORT_MAX_SECONDS = float(os.getenv("EXPORT_MAX_SECONDS", "600"))
+
+logger = logging.getLogger("app.export")
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet")
+}
+
+# where=column:operator:value
+WHERE_OPERATORS = {
+    "eq": "=",
+    "ne": "!=",
+    "lt": "<",
+    "lte": "<=",
+    "gt": ">",
+    "gte": ">=",
+    "like": "LIKE",
+    "in": "IN",
+    "null": "IS NULL",
+    "notnull": "IS NOT NULL"
+}
+
+def table_columns(table: str) -> List[Tuple[str, str]]:
+    """(name, declared type) of each column of the table"""
+    return [(row["name"], row["type"]) for row in execute_query(f"PRAGMA table_info({table})")]
+
+def parse_columns(columns: Optional[str], available: List[str]) -> List[str]:
+    if not columns:
+        return available
+    requested = [name.strip() for name in columns.split(",") if name.strip()]
+    unknown = sorted(set(requested) - set(available))
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown column(s): {', '.join(unknown)}. Choose from: {', '.join(available)}"
+        )
+    return list(dict.fromkeys(requested))
+
+def parse_where(where: List[str], available: List[str]) -> Tuple[str, list]:
+    """
+    Turn where=column:operator:value filters into a parameterized WHERE clause
+
+    Operators are those in WHERE_OPERATORS; `in` takes comma-separated values and
+    `null` / `notnull` take no value. All filters must match.
+    """
+    conditions = []
+    params = []
+    for condition in where:
+        column, _, rest = condition.partition(":")
+        operator, _, value = rest.partition(":")
+        if column not in available:
+            raise HTTPException(status_code=400, detail=f"Unknown column in where: {column}")
+        if operator not in WHERE_OPERATORS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown operator in where: {operator}. Choose from: {', '.join(WHERE_OPERATORS)}"
+            )
+        sql = WHERE_OPERATORS[operator]
+        if operator in ("null", "notnull"):
+            conditions.append(f'"{column}" {sql}')
+        elif operator == "in":
+            values = value.split(",")
+            conditions.append(f'"{column}" IN ({", ".join("?" for _ in values)})')
+            params.extend(values)
+        else:
+            conditions.append(f'"{column}" {sql} ?')
+            params.append(value)
+    return (" WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+def fetch_batches(query: str, params: list) -> Iterator[list]:
+    """
+    Yield the query's rows in fetchmany batches
+
+    Uses a detached connection rather than a pooled checkout: the generator is
+    resumed on whichever threadpool thread serves the next chunk, and may be paused
+    for as long as the client takes to read. The single statement reads one
+    snapshot. An export running past EXPORT_MAX_SECONDS, or interrupted by a hot
+    swap of the database, fails rather than ending early, so the client sees an
+    incomplete download instead of a silently truncated file.
+    """
+    deadline = time.monotonic() + EXPORT_MAX_SECONDS
+    with read_connection() as conn:
+        cursor = conn.execute(query, params)
+        while True:
+            if time.monotonic() > deadline:
+                logger.warning("Export stopped after %ss: %s", EXPORT_MAX_SECONDS, query)
+                raise TimeoutError(f"Export exceeded EXPORT_MAX_SECONDS ({EXPORT_MAX_SECONDS}s)")
+            rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+            if not rows:
+                break
+            yield rows
+
+def encode_ndjson(columns: List[str], batches: Iterator[list]) -> Iterator[bytes]:
+    for rows in batches:
+        yield b"".join(dumps(dict(zip(columns, row))) + b"\n" for row in rows)
+
+def encode_csv(columns: List[str], batches: Iterator[list]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+class _ChunkSink:
+    """Write-only file object collecting what ParquetWriter writes between batches"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def _arrow_type(declared: str):
+    """Arrow type for a declared SQLite column type (by SQLite's affinity rules)"""
+    declared = declared.upper()
+    if "INT" in declared:
+        return pyarrow.int64()
+    if "REAL" in declared or "FLOA" in declared or "DOUB" in declared:
+        return pyarrow.float64()
+    return pyarrow.string()
+
+def encode_parquet(columns: List[str], types: List[str], batches: Iterator[list]) -> Iterator[bytes]:
+    """One Parquet row group per batch, sent as soon as it is written"""
+    schema = pyarrow.schema([(name, _arrow_type(declared)) for name, declared in zip(columns, types)])
+    sink = _ChunkSink()
+    with pyarrow.parquet.ParquetWriter(sink, schema) as parquet_writer:
+        for rows in batches:
+            arrays = [
+                pyarrow.array([row[i] for row in rows], type=field.type)
+                for i, field in enumerate(schema)
+            ]
+            parquet_writer.write_table(pyarrow.Table.from_arrays(arrays, schema=schema))
+            yield sink.take()
+    yield sink.take()
+
+@router.get("/{table}")
+def export_table(
+    table: str,
+    format: str = Query("ndjson", pattern="^(ndjson|csv|parquet)$", description="ndjson, csv or parquet"),
+    columns: Optional[str] = Query(None, description="Comma-separated columns (default: all)"),
+    where: List[str] = Query([], description="Filter column:operator:value, e.g. confidence:gte:0.8 (repeatable)"),
+    limit: Optional[int] = Query(None, ge=1, description="Maximum rows")
+):
+    """
+    Stream a table as NDJSON, CSV or Parquet
+
+    Tables are those in AVAILABLE_TABLES. Operators for where are eq, ne, lt,
+    lte, gt, gte, like, in (comma-separated values), null and notnull.
+    """
+    if table not in AVAILABLE_TABLES:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown table: {table}. Choose from: {', '.join(AVAILABLE_TABLES)}"
+        )
+    if format == "parquet" and pyarrow is None:
+        raise HTTPException(status_code=400, detail="Parquet export needs the pyarrow package")
+
+    declared_types = dict(table_columns(table))
+    selected = parse_columns(columns, list(declared_types))
+    where_sql, params = parse_where(where, list(declared_types))
+
+    column_list = ", ".join(f'"{name}"' for name in selected)
+    query = f"SELECT {column_list} FROM {table}{where_sql}"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    batches = fetch_batches(query, params)
+    if format == "ndjson":
+        body = encode_ndjson(selected, batches)
+    elif format == "csv":
+        body = encode_csv(selected, batches)
+    else:
+        body = encode_parquet(selected, [declared_types[name] for name in selected], batches)
+
+    media_type, extension = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{table}.{extension}"'}
+    )
@@ -4,15 +4,17 @@ Generate executive summary and insights from interview data using AI
 """
 
 from fastapi import APIRouter, HTTPException
-from app.database import execute_query
+from starlette.concurrency import run_in_threadpool
+from app.database import execute_query, get_connection
 from app.services.openai_service import is_openai_configured
-from openai import OpenAI
+from app.services.llm_client import llm
 import os
 
 router = APIRouter(prefix="/insights", tags=["Insights"])
 
-api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=api_key)
+# Per-call time limits, in seconds
+EXECUTIVE_SUMMARY_TIMEOUT = float(os.getenv("OPENAI_SUMMARY_TIMEOUT", "120"))
+THEME_INSIGHTS_TIMEOUT = float(os.getenv("OPENAI_THEME_INSIGHTS_TIMEOUT", "60"))
 
 def extract_key_findings(summary_text: str) -> list:
     """
@@ -89,43 +91,26 @@ def extract_key_findings(summary_text: str) -> list:
     
     return findings[:3]  # Return max 3 findings
 
-@router.get("/executive-summary")
-def get_executive_summary():
-    """
-    Generate comprehensive executive summary with AI-powered insights
-    Analyzes all interview data and provides strategic recommendations
-    """
-    
-    if not is_openai_configured():
-        # Return fallback summary if OpenAI not configured
-        return {
-            "success": False,
-            "summary": "OpenAI API not configured. Please set OPENAI_API_KEY in .env file.",
-            "key_findings": [],
-            "recommendations": []
-        }
-    
-    try:
-        # Gather comprehensive data from database
-        
+def gather_executive_summary_data() -> tuple:
+    """Themes, brands, demographics and quotes the executive summary is written from"""
+    with get_connection():
         # 1. Top themes by sentiment
         top_positive_themes = execute_query("""
-            SELECT t.theme_name_th, COUNT(*) as count
-            FROM interview_themes it
-            JOIN themes t ON it.theme_id = t.theme_id
-            WHERE it.sentiment = 'Positive'
-            GROUP BY t.theme_id
-            ORDER BY count DESC
+            SELECT t.theme_name_th, s.mention_count as count
+            FROM theme_sentiment_stats s
+            JOIN themes t ON s.theme_id = t.theme_id
+            WHERE s.sentiment = 'Positive'
+            ORDER BY count DESC, t.theme_id
             LIMIT 5
         """)
         
         top_negative_themes = execute_query("""
-            SELECT t.theme_name_th, COUNT(*) as count
-            FROM interview_themes it
-            JOIN themes t ON it.theme_id = t.theme_id
-            WHERE it.sentiment IN ('Negative', 'Mixed')
+            SELECT t.theme_name_th, SUM(s.mention_count) as count
+            FROM theme_sentiment_stats s
+            JOIN themes t ON s.theme_id = t.theme_id
+            WHERE s.sentiment IN ('Negative', 'Mixed')
             GROUP BY t.theme_id
-            ORDER BY count DESC
+            ORDER BY count DESC, t.theme_id
             LIMIT 5
         """)
         
@@ -133,24 +118,24 @@ def get_executive_summary():
         brand_data = execute_query("""
             SELECT 
                 b.brand_name,
-                COUNT(DISTINCT ib.interview_id) as user_count,
-                AVG(ib.satisfaction_score) as avg_satisfaction,
-                SUM(CASE WHEN ib.currently_using = 1 THEN 1 ELSE 0 END) as current_users
-            FROM interview_brands ib
-            JOIN brands b ON ib.brand_id = b.brand_id
-            GROUP BY b.brand_id
-            ORDER BY user_count DESC
+                s.interview_count as user_count,
+                s.satisfaction_sum / NULLIF(s.satisfaction_count, 0) as avg_satisfaction,
+                s.current_users
+            FROM brand_stats s
+            JOIN brands b ON s.brand_id = b.brand_id
+            ORDER BY user_count DESC, b.brand_id
             LIMIT 5
         """)
         
-        # 3. Demographics summary
+        # 3. Demographics summary (one row per gender in persona_demographics)
         demographics = execute_query("""
             SELECT 
-                COUNT(*) as total_interviews,
-                AVG(age) as avg_age,
-                COUNT(CASE WHEN gender = 'Female' THEN 1 END) as female_count,
-                COUNT(CASE WHEN gender = 'Male' THEN 1 END) as male_count
-            FROM personas
+                IFNULL(SUM(persona_count), 0) as total_interviews,
+                SUM(age_sum) * 1.0 / NULLIF(SUM(age_count), 0) as avg_age,
+                IFNULL(SUM(CASE WHEN bucket = 'Female' THEN persona_count END), 0) as female_count,
+                IFNULL(SUM(CASE WHEN bucket = 'Male' THEN persona_count END), 0) as male_count
+            FROM persona_demographics
+            WHERE dimension = 'gender'
         """)[0]
         
         # 4. Key quotes for context
@@ -168,6 +153,29 @@ def get_executive_summary():
             ORDER BY it.confidence DESC
             LIMIT 10
         """)
+    
+    return top_positive_themes, top_negative_themes, brand_data, demographics, key_quotes
+
+@router.get("/executive-summary")
+async def get_executive_summary():
+    """
+    Generate comprehensive executive summary with AI-powered insights
+    Analyzes all interview data and provides strategic recommendations
+    """
+    
+    if not is_openai_configured():
+        # Return fallback summary if OpenAI not configured
+        return {
+            "success": False,
+            "summary": "OpenAI API not configured. Please set OPENAI_API_KEY in .env file.",
+            "key_findings": [],
+            "recommendations": []
+        }
+    
+    try:
+        # Gather comprehensive data from database (blocking reads, so in the threadpool)
+        top_positive_themes, top_negative_themes, brand_data, demographics, key_quotes = \
+            await run_in_threadpool(gather_executive_summary_data)
         
         # Prepare context for AI with null safety
         avg_age = demographics.get('avg_age')
@@ -253,7 +261,8 @@ def get_executive_summary():
             {"role": "user", "content": f"{context}\n\n{prompt}"}
         ]
         
-        response = client.chat.completions.create(
+        response = await llm.chat_completion(
+            timeout=EXECUTIVE_SUMMARY_TIMEOUT,
             model=os.getenv("OPENAI_MODEL", "gpt-4o"),
             messages=messages,
             temperature=0.4,
@@ -285,41 +294,65 @@ def get_executive_summary():
             "data_context": None
         }
 
-@router.get("/theme-sentiment-insights")
-def get_theme_sentiment_insights():
-    """
-    Generate AI insights for top positive and negative themes with sample quotes
-    """
-    try:
-        # Get top positive themes with quotes
+def gather_theme_quotes() -> tuple:
+    """Top positive and negative/mixed themes with their quotes"""
+    with get_connection():
+        # Get top positive themes with quotes (ranked from theme_sentiment_stats,
+        # quotes gathered only for the themes returned)
         positive_themes = execute_query("""
+            WITH top_themes AS (
+                SELECT s.theme_id, t.theme_name_th, t.theme_name_en, s.quoted_count as mention_count
+                FROM theme_sentiment_stats s
+                JOIN themes t ON s.theme_id = t.theme_id
+                WHERE s.sentiment = 'Positive' AND s.quoted_count > 0
+                ORDER BY mention_count DESC, s.theme_id
+                LIMIT 3
+            )
             SELECT 
-                t.theme_name_th,
-                t.theme_name_en,
-                COUNT(*) as mention_count,
-                GROUP_CONCAT(it.quote_sample, ' | ') as sample_quotes
-            FROM interview_themes it
-            JOIN themes t ON it.theme_id = t.theme_id
-            WHERE it.sentiment = 'Positive' AND it.quote_sample IS NOT NULL AND it.quote_sample != ''
-            GROUP BY t.theme_id
-            ORDER BY mention_count DESC
-            LIMIT 3
+                tt.theme_name_th,
+                tt.theme_name_en,
+                tt.mention_count,
+                (SELECT GROUP_CONCAT(it.quote_sample, ' | ')
+                 FROM interview_themes it
+                 WHERE it.theme_id = tt.theme_id AND it.sentiment = 'Positive'
+                 AND it.quote_sample IS NOT NULL AND it.quote_sample != '') as sample_quotes
+            FROM top_themes tt
+            ORDER BY tt.mention_count DESC, tt.theme_id
         """)
         
         # Get top negative/mixed themes with quotes
         negative_themes = execute_query("""
+            WITH top_themes AS (
+                SELECT s.theme_id, t.theme_name_th, t.theme_name_en, SUM(s.quoted_count) as mention_count
+                FROM theme_sentiment_stats s
+                JOIN themes t ON s.theme_id = t.theme_id
+                WHERE s.sentiment IN ('Negative', 'Mixed')
+                GROUP BY s.theme_id
+                HAVING mention_count > 0
+                ORDER BY mention_count DESC, s.theme_id
+                LIMIT 3
+            )
             SELECT 
-                t.theme_name_th,
-                t.theme_name_en,
-                COUNT(*) as mention_count,
-                GROUP_CONCAT(it.quote_sample, ' | ') as sample_quotes
-            FROM interview_themes it
-            JOIN themes t ON it.theme_id = t.theme_id
-            WHERE it.sentiment IN ('Negative', 'Mixed') AND it.quote_sample IS NOT NULL AND it.quote_sample != ''
-            GROUP BY t.theme_id
-            ORDER BY mention_count DESC
-            LIMIT 3
+                tt.theme_name_th,
+                tt.theme_name_en,
+                tt.mention_count,
+                (SELECT GROUP_CONCAT(it.quote_sample, ' | ')
+                 FROM interview_themes it
+                 WHERE it.theme_id = tt.theme_id AND it.sentiment IN ('Negative', 'Mixed')
+                 AND it.quote_sample IS NOT NULL AND it.quote_sample != '') as sample_quotes
+            FROM top_themes tt
+            ORDER BY tt.mention_count DESC, tt.theme_id
         """)
+    
+    return positive_themes, negative_themes
+
+@router.get("/theme-sentiment-insights")
+async def get_theme_sentiment_insights():
+    """
+    Generate AI insights for top positive and negative themes with sample quotes
+    """
+    try:
+        positive_themes, negative_themes = await run_in_threadpool(gather_theme_quotes)
         
         # Prepare context for AI
         positive_context = ""
@@ -371,7 +404,8 @@ TOP CONCERNS (Mixed/Negative):
             {"role": "user", "content": prompt}
         ]
         
-        response = client.chat.completions.create(
+        response = await llm.chat_completion(
+            timeout=THEME_INSIGHTS_TIMEOUT,
             model=os.getenv("OPENAI_MODEL", "gpt-4o"),
             messages=messages,
             temperature=0.3,
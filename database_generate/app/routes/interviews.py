@@ -3,84 +3,199 @@ Interviews API Routes
 """
 
 from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from app.models import Interview
-from app.database import execute_query
+from app.database import execute_query, read_transaction
+from app.serialization import rows_response
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, count_total, page_headers
+from app.fields import parse_fields, select_columns, trim_columns, fields_model
 
 router = APIRouter(prefix="/interviews", tags=["Interviews"])
 
 @router.get("", response_model=List[Interview])
 def get_interviews(
     segment_id: Optional[int] = Query(None, description="Filter by segment ID"),
-    status: Optional[str] = Query(None, description="Filter by status")
+    status: Optional[str] = Query(None, description="Filter by status"),
+    fields: Optional[str] = Query(None, description="Comma-separated interview fields to return (default: all)"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum interviews per page"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page")
 ):
-    """Get all interviews with optional filters"""
-    query = "SELECT * FROM interviews WHERE 1=1"
+    """
+    Get interviews with optional filters, ordered by interview ID
+    
+    The total is returned in the X-Total-Count header and, when there are more
+    pages, the cursor for the next one in X-Next-Cursor.
+    """
+    fields = parse_fields(fields, Interview)
+    from_where = "FROM interviews WHERE 1=1"
     params = []
     
     if segment_id is not None:
-        query += " AND segment_id = ?"
+        from_where += " AND segment_id = ?"
         params.append(segment_id)
     
     if status:
-        query += " AND status = ?"
+        from_where += " AND status = ?"
         params.append(status)
     
-    query += " ORDER BY interview_id"
-    
-    return execute_query(query, tuple(params))
+    select = f"SELECT {select_columns(fields, required=['interview_id'])}"
+    rows, next_cursor = paginate(select, from_where, params, [("interview_id", "interview_id", False)], limit, cursor)
+    return rows_response(
+        trim_columns(rows, fields),
+        fields_model(Interview, fields),
+        page_headers(count_total(from_where, params), next_cursor)
+    )
 
-@router.get("/{interview_id}")
-def get_interview_detail(interview_id: str):
-    """Get complete interview details including persona and transcript"""
+# Sections of an interview detail that can be requested with include=
+INTERVIEW_SECTIONS = ("persona", "segment", "transcript", "brands", "themes")
+MAX_BATCH_SIZE = 100
+
+class InterviewBatchRequest(BaseModel):
+    interview_ids: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+    include: Optional[List[str]] = None
+
+def parse_include(include: Optional[List[str]]) -> List[str]:
+    """Validate requested sections; None means all of them"""
+    if include is None:
+        return list(INTERVIEW_SECTIONS)
+    sections = [section.strip() for section in include if section.strip()]
+    unknown = sorted(set(sections) - set(INTERVIEW_SECTIONS))
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown include section(s): {', '.join(unknown)}. Choose from: {', '.join(INTERVIEW_SECTIONS)}"
+        )
+    return [section for section in INTERVIEW_SECTIONS if section in sections]
+
+def _in_clause(values) -> str:
+    return ",".join("?" for _ in values)
+
+def _group_by_interview(rows: List[dict], key: str = "interview_id", keep_key: bool = True) -> dict:
+    grouped = {}
+    for row in rows:
+        interview_id = row[key] if keep_key else row.pop(key)
+        grouped.setdefault(interview_id, []).append(row)
+    return grouped
+
+def load_interviews(interview_ids: List[str], sections: List[str]) -> dict:
+    """
+    Load interview details for many interviews at once
     
-    # Get interview
-    interview_query = "SELECT * FROM interviews WHERE interview_id = ?"
-    interview = execute_query(interview_query, (interview_id,), fetch_one=True)
+    Runs one set-based query per requested section, all on one connection
+    inside one read transaction, so every section comes from the same snapshot.
     
-    if not interview:
-        raise HTTPException(status_code=404, detail="Interview not found")
+    Args:
+        interview_ids: Interviews to load (duplicates are ignored)
+        sections: Subset of INTERVIEW_SECTIONS to include
     
-    # Get persona
-    persona_query = "SELECT * FROM personas WHERE interview_id = ?"
-    persona = execute_query(persona_query, (interview_id,), fetch_one=True)
+    Returns:
+        Detail dict per interview ID that exists
+    """
+    ids = list(dict.fromkeys(interview_ids))
     
-    # Get segment
-    segment_query = "SELECT * FROM segments WHERE segment_id = ?"
-    segment = execute_query(segment_query, (interview['segment_id'],), fetch_one=True)
+    with read_transaction():
+        interviews = execute_query(
+            f"SELECT * FROM interviews WHERE interview_id IN ({_in_clause(ids)})",
+            tuple(ids), use_cache=False
+        )
+        if not interviews:
+            return {}
+        
+        found = [interview['interview_id'] for interview in interviews]
+        details = {interview['interview_id']: {"interview": interview} for interview in interviews}
+        
+        if "persona" in sections:
+            personas = execute_query(
+                f"SELECT * FROM personas WHERE interview_id IN ({_in_clause(found)})",
+                tuple(found), use_cache=False
+            )
+            by_interview = {persona['interview_id']: persona for persona in personas}
+            for interview_id, detail in details.items():
+                detail["persona"] = by_interview.get(interview_id)
+        
+        if "segment" in sections:
+            segment_ids = list({detail["interview"]['segment_id'] for detail in details.values()} - {None})
+            segments = execute_query(
+                f"SELECT * FROM segments WHERE segment_id IN ({_in_clause(segment_ids)})",
+                tuple(segment_ids), use_cache=False
+            ) if segment_ids else []
+            by_segment = {segment['segment_id']: segment for segment in segments}
+            for detail in details.values():
+                detail["segment"] = by_segment.get(detail["interview"]['segment_id'])
+        
+        if "transcript" in sections:
+            transcript_query = f"""
+                SELECT * FROM transcript_lines 
+                WHERE interview_id IN ({_in_clause(found)}) 
+                ORDER BY interview_id, turn_number
+            """
+            lines = _group_by_interview(execute_query(transcript_query, tuple(found), use_cache=False))
+            for interview_id, detail in details.items():
+                detail["transcript"] = lines.get(interview_id, [])
+        
+        if "brands" in sections:
+            brands_query = f"""
+                SELECT b.*, ib.mentioned_count, ib.currently_using, ib.awareness_level, ib.interview_id as mention_interview_id
+                FROM brands b
+                JOIN interview_brands ib ON b.brand_id = ib.brand_id
+                WHERE ib.interview_id IN ({_in_clause(found)})
+                ORDER BY ib.interview_id, ib.id
+            """
+            brands = _group_by_interview(
+                execute_query(brands_query, tuple(found), use_cache=False),
+                key="mention_interview_id", keep_key=False
+            )
+            for interview_id, detail in details.items():
+                detail["brands"] = brands.get(interview_id, [])
+        
+        if "themes" in sections:
+            themes_query = f"""
+                SELECT t.*, it.sentiment, it.quote_sample, it.confidence, it.interview_id as mention_interview_id
+                FROM themes t
+                JOIN interview_themes it ON t.theme_id = it.theme_id
+                WHERE it.interview_id IN ({_in_clause(found)})
+                ORDER BY it.interview_id, it.confidence DESC, it.id
+            """
+            themes = _group_by_interview(
+                execute_query(themes_query, tuple(found), use_cache=False),
+                key="mention_interview_id", keep_key=False
+            )
+            for interview_id, detail in details.items():
+                detail["themes"] = themes.get(interview_id, [])
     
-    # Get transcript
-    transcript_query = """
-        SELECT * FROM transcript_lines 
-        WHERE interview_id = ? 
-        ORDER BY turn_number
-    """
-    transcript = execute_query(transcript_query, (interview_id,))
+    return details
+
+@router.get("/{interview_id}")
+def get_interview_detail(
+    interview_id: str,
+    include: Optional[str] = Query(
+        None,
+        description="Comma-separated sections to include (persona, segment, transcript, brands, themes); all by default"
+    )
+):
+    """Get complete interview details including persona and transcript"""
+    sections = parse_include(include.split(",") if include is not None else None)
+    detail = load_interviews([interview_id], sections).get(interview_id)
     
-    # Get brands mentioned
-    brands_query = """
-        SELECT b.*, ib.mentioned_count, ib.currently_using, ib.awareness_level
-        FROM brands b
-        JOIN interview_brands ib ON b.brand_id = ib.brand_id
-        WHERE ib.interview_id = ?
+    if not detail:
+        raise HTTPException(status_code=404, detail="Interview not found")
+    
+    return detail
+
+@router.post("/batch")
+def get_interviews_batch(request: InterviewBatchRequest):
     """
-    brands = execute_query(brands_query, (interview_id,))
+    Get details for many interviews in one request
     
-    # Get themes
-    themes_query = """
-        SELECT t.*, it.sentiment, it.quote_sample, it.confidence
-        FROM themes t
-        JOIN interview_themes it ON t.theme_id = it.theme_id
-        WHERE it.interview_id = ?
-        ORDER BY it.confidence DESC
+    Each requested section is fetched with one query for all interviews.
+    Interviews are returned in request order; unknown IDs are listed in not_found.
     """
-    themes = execute_query(themes_query, (interview_id,))
+    sections = parse_include(request.include)
+    details = load_interviews(request.interview_ids, sections)
+    requested = list(dict.fromkeys(request.interview_ids))
     
     return {
-        "interview": interview,
-        "persona": persona,
-        "segment": segment,
-        "transcript": transcript,
-        "brands": brands,
-        "themes": themes
+        "interviews": [details[interview_id] for interview_id in requested if interview_id in details],
+        "not_found": [interview_id for interview_id in requested if interview_id not in details]
     }
@@ -6,6 +6,10 @@ from fastapi import APIRouter, Query
 from typing import List, Optional
 from app.models import Persona
 from app.database import execute_query
+from app.serialization import FastJSONResponse, rows_response
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, count_total, page_headers, encode_cursor, decode_cursor
+from app.persona_facets import FacetSearch, persona_facets
+from app.fields import parse_fields, select_columns, trim_columns, fields_model
 
 router = APIRouter(prefix="/personas", tags=["Personas"])
 
@@ -13,24 +17,91 @@ router = APIRouter(prefix="/personas", tags=["Personas"])
 def get_personas(
     role: Optional[str] = Query(None, description="Filter by role"),
     min_age: Optional[int] = Query(None, description="Minimum age"),
-    max_age: Optional[int] = Query(None, description="Maximum age")
+    max_age: Optional[int] = Query(None, description="Maximum age"),
+    fields: Optional[str] = Query(None, description="Comma-separated persona fields to return (default: all)"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum personas per page"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page")
 ):
-    """Get all personas with optional filters"""
-    query = "SELECT * FROM personas WHERE 1=1"
+    """
+    Get personas with optional filters, ordered by interview ID
+    
+    The total is returned in the X-Total-Count header and, when there are more
+    pages, the cursor for the next one in X-Next-Cursor.
+    """
+    fields = parse_fields(fields, Persona)
+    from_where = "FROM personas WHERE 1=1"
     params = []
     
     if role:
-        query += " AND role LIKE ?"
+        from_where += " AND role LIKE ?"
         params.append(f"%{role}%")
     
     if min_age is not None:
-        query += " AND age >= ?"
+        from_where += " AND age >= ?"
         params.append(min_age)
     
     if max_age is not None:
-        query += " AND age <= ?"
+        from_where += " AND age <= ?"
         params.append(max_age)
     
-    query += " ORDER BY interview_id"
+    select = f"SELECT {select_columns(fields, required=['interview_id'])}"
+    rows, next_cursor = paginate(select, from_where, params, [("interview_id", "interview_id", False)], limit, cursor)
+    return rows_response(
+        trim_columns(rows, fields),
+        fields_model(Persona, fields),
+        page_headers(count_total(from_where, params), next_cursor)
+    )
+
+def _values(values: Optional[List]) -> tuple:
+    return tuple(sorted(set(values))) if values else ()
+
+@router.get("/search")
+def search_personas(
+    role: Optional[List[str]] = Query(None, description="Role (repeat for several)"),
+    age_group: Optional[List[str]] = Query(None, description="Age group: 18-24, 25-34, 35-44, 45-54, 55+ (repeat for several)"),
+    gender: Optional[List[str]] = Query(None, description="Gender (repeat for several)"),
+    environment: Optional[List[str]] = Query(None, description="Environment (repeat for several)"),
+    usage_pattern: Optional[List[str]] = Query(None, description="Usage pattern (repeat for several)"),
+    segment_id: Optional[List[int]] = Query(None, description="Segment ID (repeat for several)"),
+    fields: Optional[str] = Query(None, description="Comma-separated persona fields to return (default: all)"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum personas per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page")
+):
+    """
+    Faceted persona search, ordered by interview ID
+    
+    Filters match values exactly (as listed in the facets); several values of one
+    filter match any of them, different filters must all match. facets holds, for
+    every dimension, the number of personas each value would give with the other
+    filters applied. total is the number of matching personas and next_cursor
+    fetches the next page (null on the last).
+    """
+    fields = parse_fields(fields, Persona)
+    search = FacetSearch(
+        role=_values(role),
+        age_group=_values(age_group),
+        gender=_values(gender),
+        environment=_values(environment),
+        usage_pattern=_values(usage_pattern),
+        segment_id=_values(segment_id)
+    )
+    index, result = persona_facets.search(search)
+    after = decode_cursor(cursor, 1)[0] if cursor else None
+    interview_ids = index.page(result.matches, after, limit + 1)
+    next_cursor = encode_cursor(interview_ids[limit - 1:limit]) if len(interview_ids) > limit else None
+    interview_ids = interview_ids[:limit]
+    
+    personas = []
+    if interview_ids:
+        placeholders = ", ".join("?" for _ in interview_ids)
+        personas = execute_query(
+            f"SELECT {select_columns(fields)} FROM personas WHERE interview_id IN ({placeholders}) ORDER BY interview_id",
+            tuple(interview_ids)
+        )
     
-    return execute_query(query, tuple(params))
+    return FastJSONResponse({
+        "total": len(result.matches),
+        "facets": result.facets,
+        "personas": personas,
+        "next_cursor": next_cursor
+    })
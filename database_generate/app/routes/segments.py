@@ -2,26 +2,37 @@
 Segments API Routes
 """
 
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Optional
 from app.models import Segment
 from app.database import execute_query
+from app.serialization import FastJSONResponse, rows_response
+from app.fields import parse_fields, select_columns, fields_model
 
 router = APIRouter(prefix="/segments", tags=["Segments"])
 
 @router.get("", response_model=List[Segment])
-def get_segments():
+def get_segments(
+    fields: Optional[str] = Query(None, description="Comma-separated segment fields to return (default: all)")
+):
     """Get all segments"""
-    query = "SELECT * FROM segments ORDER BY segment_id"
-    return execute_query(query)
+    fields = parse_fields(fields, Segment)
+    query = f"SELECT {select_columns(fields)} FROM segments ORDER BY segment_id"
+    return rows_response(execute_query(query), fields_model(Segment, fields))
 
 @router.get("/{segment_id}", response_model=Segment)
-def get_segment(segment_id: int):
+def get_segment(
+    segment_id: int,
+    fields: Optional[str] = Query(None, description="Comma-separated segment fields to return (default: all)")
+):
     """Get segment by ID"""
-    query = "SELECT * FROM segments WHERE segment_id = ?"
+    fields = parse_fields(fields, Segment)
+    query = f"SELECT {select_columns(fields)} FROM segments WHERE segment_id = ?"
     result = execute_query(query, (segment_id,), fetch_one=True)
     
     if not result:
         raise HTTPException(status_code=404, detail="Segment not found")
     
-    return result
+    if fields is None:
+        return result
+    return FastJSONResponse(fields_model(Segment, fields).model_validate(result).model_dump(mode="json"))
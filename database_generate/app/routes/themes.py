@@ -2,137 +2,192 @@
 Themes API Routes
 """
 
-from fastapi import APIRouter, HTTPException
-from typing import List
-from app.models import Theme
-from app.database import execute_query
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Optional
+from app.models import Theme, InterviewTheme
+from app.database import execute_query, get_connection
+from app.serialization import rows_response
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, count_total
+from app.fields import parse_fields, select_columns, trim_columns, fields_model
 
 router = APIRouter(prefix="/themes", tags=["Themes"])
 
 @router.get("", response_model=List[Theme])
-def get_themes():
+def get_themes(
+    fields: Optional[str] = Query(None, description="Comma-separated theme fields to return (default: all)")
+):
     """Get all themes"""
-    query = "SELECT * FROM themes ORDER BY theme_id"
-    return execute_query(query)
+    fields = parse_fields(fields, Theme)
+    query = f"SELECT {select_columns(fields)} FROM themes ORDER BY theme_id"
+    return rows_response(execute_query(query), fields_model(Theme, fields))
 
 @router.get("/{theme_id}")
-def get_theme_insights(theme_id: int):
-    """Get theme with related insights from interviews"""
-    
-    # Get theme
-    theme_query = "SELECT * FROM themes WHERE theme_id = ?"
-    theme = execute_query(theme_query, (theme_id,), fetch_one=True)
-    
-    if not theme:
-        raise HTTPException(status_code=404, detail="Theme not found")
-    
-    # Get insights
-    insights_query = """
-        SELECT it.*, i.interview_id, p.role, p.age, s.segment_name_th
-        FROM interview_themes it
-        JOIN interviews i ON it.interview_id = i.interview_id
-        JOIN personas p ON i.interview_id = p.interview_id
-        JOIN segments s ON i.segment_id = s.segment_id
-        WHERE it.theme_id = ?
-        ORDER BY it.confidence DESC
+def get_theme_insights(
+    theme_id: int,
+    fields: Optional[str] = Query(None, description="Comma-separated insight fields to return (default: all)"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum insights per page"),
+    cursor: Optional[str] = Query(None, description="insights_next_cursor of the previous page")
+):
     """
-    insights = execute_query(insights_query, (theme_id,))
+    Get theme with related insights from interviews
     
-    # Get sentiment distribution
-    sentiment_query = """
-        SELECT 
-            sentiment,
-            COUNT(*) as count,
-            AVG(confidence) as avg_confidence
-        FROM interview_themes
-        WHERE theme_id = ?
-        GROUP BY sentiment
+    Insights are paginated, highest confidence first; insights_total is the number
+    of insights and insights_next_cursor fetches the next page (null on the last).
+    Insights always include the interview's role, age and segment alongside the
+    requested fields.
     """
-    sentiment_dist = execute_query(sentiment_query, (theme_id,))
+    fields = parse_fields(fields, InterviewTheme)
+    
+    with get_connection():
+        # Get theme
+        theme_query = "SELECT * FROM themes WHERE theme_id = ?"
+        theme = execute_query(theme_query, (theme_id,), fetch_one=True)
+        
+        if not theme:
+            raise HTTPException(status_code=404, detail="Theme not found")
+        
+        # Get insights
+        insights_from = """
+            FROM interview_themes it
+            JOIN interviews i ON it.interview_id = i.interview_id
+            JOIN personas p ON i.interview_id = p.interview_id
+            JOIN segments s ON i.segment_id = s.segment_id
+            WHERE it.theme_id = ?
+        """
+        insights, next_cursor = paginate(
+            f"SELECT {select_columns(fields, 'it', required=['confidence', 'id'])}, "
+            "i.interview_id, p.role, p.age, s.segment_name_th",
+            insights_from,
+            (theme_id,),
+            [("it.confidence", "confidence", True), ("it.id", "id", False)],
+            limit,
+            cursor
+        )
+        insights = trim_columns(insights, fields, extra=["interview_id", "role", "age", "segment_name_th"])
+        insights_total = count_total(insights_from, (theme_id,))
+        
+        # Get sentiment distribution
+        sentiment_query = """
+            SELECT 
+                sentiment,
+                COUNT(*) as count,
+                AVG(confidence) as avg_confidence
+            FROM interview_themes
+            WHERE theme_id = ?
+            GROUP BY sentiment
+        """
+        sentiment_dist = execute_query(sentiment_query, (theme_id,))
     
     return {
         "theme": theme,
         "insights": insights,
+        "insights_total": insights_total,
+        "insights_next_cursor": next_cursor,
         "sentiment_distribution": sentiment_dist
     }
 
 @router.get("/table/all")
-def get_themes_table():
-    """Get all themes with count and 3 example quotes from different users"""
-    
-    # Get all themes with mention count
-    themes_query = """
-        SELECT 
-            t.theme_id,
-            t.theme_name_th,
-            t.theme_name_en,
-            COUNT(DISTINCT it.interview_id) as mention_count
-        FROM themes t
-        LEFT JOIN interview_themes it ON t.theme_id = it.theme_id
-        GROUP BY t.theme_id
-        ORDER BY mention_count DESC, t.theme_id
-    """
-    themes = execute_query(themes_query)
+def get_themes_table(
+    k: int = Query(3, ge=1, le=20, description="Example quotes per theme, each from a different interview")
+):
+    """Get all themes with count and k example quotes from different users"""
     
-    # For each theme, get 3 example quotes from different users
-    result = []
-    for theme in themes:
+    with get_connection():
+        # Get all themes with mention count
+        themes_query = """
+            SELECT 
+                t.theme_id,
+                t.theme_name_th,
+                t.theme_name_en,
+                COUNT(DISTINCT it.interview_id) as mention_count
+            FROM themes t
+            LEFT JOIN interview_themes it ON t.theme_id = it.theme_id
+            GROUP BY t.theme_id
+            ORDER BY mention_count DESC, t.theme_id
+        """
+        themes = execute_query(themes_query)
+        
+        # Top-k example quotes for every theme in one query. Each recursive step
+        # takes the theme's next most confident quote from an interview not yet
+        # chosen, walking the (theme_id, confidence) index, so the cost grows with
+        # themes x k rather than with the size of interview_themes.
         examples_query = """
+            WITH RECURSIVE picks(theme_id, pick_rank, id, chosen_interviews) AS (
+                SELECT theme_id, 0, NULL, ',' FROM themes
+                UNION ALL
+                SELECT p.theme_id, p.pick_rank + 1, next_quote.id, p.chosen_interviews || next_quote.interview_id || ','
+                FROM picks p
+                JOIN interview_themes next_quote ON next_quote.id = (
+                    SELECT it.id
+                    FROM interview_themes it
+                    WHERE it.theme_id = p.theme_id
+                    AND it.quote_sample IS NOT NULL AND it.quote_sample != ''
+                    AND instr(p.chosen_interviews, ',' || it.interview_id || ',') = 0
+                    AND EXISTS (SELECT 1 FROM personas WHERE interview_id = it.interview_id)
+                    ORDER BY it.confidence DESC, it.id
+                    LIMIT 1
+                )
+                WHERE p.pick_rank < ?
+            )
             SELECT 
+                p.theme_id,
                 it.interview_id,
                 it.quote_sample,
-                p.role
-            FROM interview_themes it
-            JOIN personas p ON it.interview_id = p.interview_id
-            WHERE it.theme_id = ? AND it.quote_sample IS NOT NULL AND it.quote_sample != ''
-            ORDER BY it.confidence DESC
-            LIMIT 3
+                pe.role
+            FROM picks p
+            JOIN interview_themes it ON it.id = p.id
+            JOIN personas pe ON it.interview_id = pe.interview_id
+            ORDER BY p.theme_id, p.pick_rank
         """
-        examples = execute_query(examples_query, (theme['theme_id'],))
-        
-        result.append({
+        examples_by_theme = {}
+        for example in execute_query(examples_query, (k,)):
+            theme_id = example.pop('theme_id')
+            examples_by_theme.setdefault(theme_id, []).append(example)
+    
+    return [
+        {
             "theme_id": theme['theme_id'],
             "theme_name_th": theme['theme_name_th'],
             "theme_name_en": theme['theme_name_en'],
             "mention_count": theme['mention_count'],
-            "examples": examples
-        })
-    
-    return result
+            "examples": examples_by_theme.get(theme['theme_id'], [])
+        }
+        for theme in themes
+    ]
 
 @router.get("/insights/sentiment")
 def get_theme_insights_by_sentiment():
     """Get top positive themes and top negative/mixed themes"""
     
-    # Top positive themes
-    positive_query = """
-        SELECT 
-            t.theme_name_th,
-            t.theme_name_en,
-            COUNT(*) as mention_count
-        FROM interview_themes it
-        JOIN themes t ON it.theme_id = t.theme_id
-        WHERE it.sentiment = 'Positive'
-        GROUP BY t.theme_id
-        ORDER BY mention_count DESC
-        LIMIT 3
-    """
-    positive_themes = execute_query(positive_query)
-    
-    # Top negative/mixed themes
-    negative_query = """
-        SELECT 
-            t.theme_name_th,
-            t.theme_name_en,
-            COUNT(*) as mention_count
-        FROM interview_themes it
-        JOIN themes t ON it.theme_id = t.theme_id
-        WHERE it.sentiment IN ('Negative', 'Mixed')
-        GROUP BY t.theme_id
-        ORDER BY mention_count DESC
-        LIMIT 3
-    """
-    negative_themes = execute_query(negative_query)
+    with get_connection():
+        # Top positive themes (materialized in theme_sentiment_stats)
+        positive_query = """
+            SELECT 
+                t.theme_name_th,
+                t.theme_name_en,
+                s.mention_count
+            FROM theme_sentiment_stats s
+            JOIN themes t ON s.theme_id = t.theme_id
+            WHERE s.sentiment = 'Positive'
+            ORDER BY s.mention_count DESC, t.theme_id
+            LIMIT 3
+        """
+        positive_themes = execute_query(positive_query)
+        
+        # Top negative/mixed themes
+        negative_query = """
+            SELECT 
+                t.theme_name_th,
+                t.theme_name_en,
+                SUM(s.mention_count) as mention_count
+            FROM theme_sentiment_stats s
+            JOIN themes t ON s.theme_id = t.theme_id
+            WHERE s.sentiment IN ('Negative', 'Mixed')
+            GROUP BY t.theme_id
+            ORDER BY mention_count DESC, t.theme_id
+            LIMIT 3
+        """
+        negative_themes = execute_query(negative_query)
     
     return {
         "positive": positive_themes,
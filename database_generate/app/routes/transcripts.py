@@ -2,47 +2,164 @@
 Transcripts API Routes
 """
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Response
 from typing import List, Optional
 from app.models import TranscriptLine
-from app.database import execute_query
+from app.database import execute_query, get_connection
+from app.serialization import rows_response
+from app.pagination import MAX_PAGE_SIZE, paginate, count_total, page_headers
+from app.fields import parse_fields, select_columns, trim_columns, fields_model
 
 router = APIRouter(prefix="/transcripts", tags=["Transcripts"])
 
+# Transcript lines are small; a page normally holds a whole interview
+TRANSCRIPT_PAGE_SIZE = 500
+MAX_TRANSCRIPT_PAGE_SIZE = 5 * MAX_PAGE_SIZE
+
 @router.get("/{interview_id}", response_model=List[TranscriptLine])
-def get_transcript(interview_id: str):
-    """Get transcript for an interview"""
-    query = """
-        SELECT * FROM transcript_lines 
-        WHERE interview_id = ? 
-        ORDER BY turn_number
+def get_transcript(
+    interview_id: str,
+    fields: Optional[str] = Query(None, description="Comma-separated transcript line fields to return (default: all)"),
+    limit: int = Query(TRANSCRIPT_PAGE_SIZE, ge=1, le=MAX_TRANSCRIPT_PAGE_SIZE, description="Maximum lines per page"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page")
+):
+    """
+    Get transcript for an interview, ordered by turn number
+    
+    The total is returned in the X-Total-Count header and, when there are more
+    pages, the cursor for the next one in X-Next-Cursor.
     """
-    result = execute_query(query, (interview_id,))
+    fields = parse_fields(fields, TranscriptLine)
+    from_where = "FROM transcript_lines WHERE interview_id = ?"
+    params = [interview_id]
+    keys = [("turn_number", "turn_number", False), ("transcript_id", "transcript_id", False)]
     
-    if not result:
+    select = f"SELECT {select_columns(fields, required=['turn_number', 'transcript_id'])}"
+    result, next_cursor = paginate(select, from_where, params, keys, limit, cursor)
+    
+    if not result and cursor is None:
         raise HTTPException(status_code=404, detail="Transcript not found")
     
-    return result
+    return rows_response(
+        trim_columns(result, fields),
+        fields_model(TranscriptLine, fields),
+        page_headers(count_total(from_where, params), next_cursor)
+    )
+
+# Trigram full-text search needs at least 3 characters per term
+MIN_FTS_TERM_LENGTH = 3
+SNIPPET_CONTEXT = 40
+
+def build_match_query(q: str) -> Optional[str]:
+    """
+    Turn a search string into an FTS5 MATCH expression (all terms required)
+    
+    Returns None when a term is too short for the trigram index.
+    """
+    terms = q.split()
+    if not terms or any(len(term) < MIN_FTS_TERM_LENGTH for term in terms):
+        return None
+    return " AND ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+def has_search_index() -> bool:
+    """Check whether the database was built with the transcript FTS table"""
+    result = execute_query(
+        "SELECT 1 AS found FROM sqlite_master WHERE type = 'table' AND name = 'transcript_lines_fts'",
+        fetch_one=True
+    )
+    return result is not None
+
+def like_snippet(text: str, q: str) -> Optional[str]:
+    """Highlighted excerpt around the first match, for the substring fallback"""
+    if not text:
+        return None
+    position = text.lower().find(q.lower())
+    if position < 0:
+        return None
+    start = max(0, position - SNIPPET_CONTEXT)
+    end = min(len(text), position + len(q) + SNIPPET_CONTEXT)
+    return (
+        ("…" if start > 0 else "")
+        + text[start:position]
+        + "<mark>" + text[position:position + len(q)] + "</mark>"
+        + text[position + len(q):end]
+        + ("…" if end < len(text) else "")
+    )
 
 @router.get("/search/text")
 def search_transcripts(
-    q: str = Query(..., description="Search query"),
-    interview_id: Optional[str] = Query(None, description="Filter by interview ID")
+    response: Response,
+    q: str = Query(..., min_length=1, description="Search query"),
+    interview_id: Optional[str] = Query(None, description="Filter by interview ID"),
+    fields: Optional[str] = Query(None, description="Comma-separated transcript line fields to return (default: all)"),
+    limit: int = Query(100, ge=1, le=500, description="Maximum results per page"),
+    offset: int = Query(0, ge=0, description="Number of results to skip")
 ):
-    """Search transcripts by text content"""
-    query = """
-        SELECT tl.*, i.interview_id, p.role
-        FROM transcript_lines tl
-        JOIN interviews i ON tl.interview_id = i.interview_id
-        JOIN personas p ON i.interview_id = p.interview_id
-        WHERE tl.text LIKE ?
     """
-    params = [f"%{q}%"]
+    Search transcripts by text content
     
-    if interview_id:
-        query += " AND tl.interview_id = ?"
-        params.append(interview_id)
+    Uses the FTS5 trigram index with bm25 ranking and highlighted snippets
+    (`<mark>...</mark>`). Terms shorter than 3 characters fall back to a substring scan.
+    The total number of matches is returned in the X-Total-Count header.
+    Results always include interview_id, role, snippet and rank alongside the
+    requested fields.
+    """
+    fields = parse_fields(fields, TranscriptLine)
+    match_query = build_match_query(q)
     
-    query += " ORDER BY tl.interview_id, tl.turn_number LIMIT 100"
+    with get_connection():
+        if match_query is not None and has_search_index():
+            from_clause = """
+                FROM transcript_lines_fts
+                JOIN transcript_lines tl ON tl.transcript_id = transcript_lines_fts.rowid
+                JOIN interviews i ON tl.interview_id = i.interview_id
+                JOIN personas p ON i.interview_id = p.interview_id
+                WHERE transcript_lines_fts MATCH ?
+            """
+            params = [match_query]
+            
+            if interview_id:
+                from_clause += " AND tl.interview_id = ?"
+                params.append(interview_id)
+            
+            query = f"""
+                SELECT {select_columns(fields, 'tl')}, i.interview_id, p.role,
+                    snippet(transcript_lines_fts, 0, '<mark>', '</mark>', '…', 64) as snippet,
+                    bm25(transcript_lines_fts) as rank
+                {from_clause}
+                ORDER BY rank, tl.interview_id, tl.turn_number
+                LIMIT ? OFFSET ?
+            """
+            results = execute_query(query, tuple(params + [limit, offset]))
+        else:
+            from_clause = """
+                FROM transcript_lines tl
+                JOIN interviews i ON tl.interview_id = i.interview_id
+                JOIN personas p ON i.interview_id = p.interview_id
+                WHERE tl.text LIKE ?
+            """
+            params = [f"%{q}%"]
+            
+            if interview_id:
+                from_clause += " AND tl.interview_id = ?"
+                params.append(interview_id)
+            
+            query = f"""
+                SELECT {select_columns(fields, 'tl', required=['text'])}, i.interview_id, p.role
+                {from_clause}
+                ORDER BY tl.interview_id, tl.turn_number
+                LIMIT ? OFFSET ?
+            """
+            results = execute_query(query, tuple(params + [limit, offset]))
+            for row in results:
+                row["snippet"] = like_snippet(row.get("text"), q)
+                row["rank"] = None
+        
+        # Skip the count query when the whole result fits in this page
+        if offset == 0 and len(results) < limit:
+            total = len(results)
+        else:
+            total = execute_query(f"SELECT COUNT(*) as total {from_clause}", tuple(params), fetch_one=True)["total"]
     
-    return execute_query(query, tuple(params))
+    response.headers["X-Total-Count"] = str(total)
+    return trim_columns(results, fields, extra=["interview_id", "role", "snippet", "rank"])
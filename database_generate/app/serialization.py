@@ -0,0 +1,91 @@
+"""
+Fast JSON responses for list endpoints
+Rows from execute_query are already plain dicts of JSON-ready values. Declaring
+response_model makes FastAPI validate every row into a Pydantic object and dump
+it back to a dict before encoding. Here the row shape is checked against the
+model once, after which rows are encoded directly with orjson.
+"""
+
+import json
+import threading
+from typing import List, Optional, Type
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from app.database import pool
+
+try:
+    import orjson
+except ImportError:  # optional; falls back to the standard library encoder
+    orjson = None
+
+
+def dumps(content) -> bytes:
+    """Encode JSON with orjson when it is installed, otherwise as JSONResponse does"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when it is installed"""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def _matches_model(model: Type[BaseModel], row: dict) -> bool:
+    """Whether validating the row through the model would return it unchanged"""
+    dumped = model.model_validate(row).model_dump(mode="json")
+    return all(type(dumped[key]) is type(value) and dumped[key] == value for key, value in row.items())
+
+
+class RowContract:
+    """
+    Row shapes verified against response models
+
+    A shape (model plus the column names of a result) is verified the first time
+    it is seen: the columns must be exactly the model's fields and every row of
+    that result must pass validation without being altered. Verified shapes are
+    encoded directly from then on. Values already have the column types declared
+    in the schema (init_database coerces them on import), so one verified result
+    stands for the rest.
+    """
+
+    def __init__(self):
+        self._verdicts = {}
+        self._lock = threading.Lock()
+
+    def verify(self, model: Type[BaseModel], rows: List[dict]) -> bool:
+        if not rows:
+            return True
+        key = (model, tuple(rows[0]))
+        verdict = self._verdicts.get(key)
+        if verdict is None:
+            verdict = set(key[1]) == set(model.model_fields) and all(_matches_model(model, row) for row in rows)
+            with self._lock:
+                self._verdicts[key] = verdict
+        return verdict
+
+    def clear(self):
+        with self._lock:
+            self._verdicts.clear()
+
+
+row_contract = RowContract()
+
+# A rebuilt database may have a different schema
+pool.add_reopen_listener(row_contract.clear)
+
+
+def rows_response(rows: List[dict], model: Type[BaseModel], headers: Optional[dict] = None) -> FastJSONResponse:
+    """
+    Encode query rows as a JSON array of `model` objects
+
+    Rows whose shape has not passed RowContract are validated through the model
+    as FastAPI's response_model would.
+    """
+    if not row_contract.verify(model, rows):
+        rows = [model.model_validate(row).model_dump(mode="json") for row in rows]
+    return FastJSONResponse(rows, headers=headers)
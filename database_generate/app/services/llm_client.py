@@ -0,0 +1,138 @@
+"""
+Shared async OpenAI client
+One AsyncOpenAI client per process, on an httpx connection pool sized for the
+API, replaces the blocking clients created per module. Calls are awaited on the
+event loop instead of holding a threadpool thread for seconds each, and a
+semaphore caps how many are in flight: beyond LLM_MAX_CONCURRENCY requests wait
+up to LLM_QUEUE_TIMEOUT for a slot and then fail fast, so a burst of LLM
+requests cannot take over the resources the SQLite routes need.
+"""
+
+import asyncio
+import os
+import time
+from typing import AsyncIterator, Optional
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "10"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "16"))
+LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "60"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
+
+class LLMBusyError(Exception):
+    """No LLM call slot became free within LLM_QUEUE_TIMEOUT"""
+
+
+class LLMClient:
+    """AsyncOpenAI client and concurrency limit shared by all routes"""
+
+    def __init__(self):
+        self._client = None
+        self._semaphore = None
+        self._waiting = 0
+        self._in_flight = 0
+        self._stats = {"calls": 0, "errors": 0, "rejected": 0, "total_ms": 0.0}
+
+    def client(self) -> AsyncOpenAI:
+        # Created on first use, inside the running event loop it is bound to
+        if self._client is None:
+            self._client = AsyncOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                max_retries=LLM_MAX_RETRIES,
+                http_client=DefaultAsyncHttpxClient(
+                    limits=httpx.Limits(
+                        max_connections=LLM_MAX_CONNECTIONS,
+                        max_keepalive_connections=LLM_MAX_CONNECTIONS,
+                        keepalive_expiry=LLM_KEEPALIVE_SECONDS
+                    ),
+                    timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+                )
+            )
+            self._semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        return self._client
+
+    async def _acquire(self) -> float:
+        self.client()
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), LLM_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self._stats["rejected"] += 1
+            raise LLMBusyError("Too many AI requests in progress; try again shortly") from None
+        finally:
+            self._waiting -= 1
+        self._in_flight += 1
+        return time.perf_counter()
+
+    def _release(self, start: float, failed: bool):
+        self._in_flight -= 1
+        self._stats["calls"] += 1
+        self._stats["errors"] += failed
+        self._stats["total_ms"] += (time.perf_counter() - start) * 1000
+        self._semaphore.release()
+
+    async def chat_completion(self, timeout: Optional[float] = None, **kwargs):
+        """
+        client.chat.completions.create within the concurrency limit
+
+        Args:
+            timeout: Seconds for this call (default LLM_TIMEOUT)
+            **kwargs: Arguments of chat.completions.create
+
+        Raises:
+            LLMBusyError: When no slot is free within LLM_QUEUE_TIMEOUT
+        """
+        start = await self._acquire()
+        failed = True
+        try:
+            response = await self.client().chat.completions.create(timeout=timeout or LLM_TIMEOUT, **kwargs)
+            failed = False
+            return response
+        finally:
+            self._release(start, failed)
+
+    async def stream_chat_completion(self, timeout: Optional[float] = None, **kwargs) -> AsyncIterator[str]:
+        """
+        Text of a streamed chat completion, piece by piece as it arrives
+
+        Holds its slot until the stream ends or the caller stops iterating.
+        timeout bounds the wait for each chunk, not the whole stream.
+        """
+        start = await self._acquire()
+        failed = True
+        try:
+            stream = await self.client().chat.completions.create(
+                stream=True, timeout=timeout or LLM_TIMEOUT, **kwargs
+            )
+            try:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                await stream.close()
+            failed = False
+        finally:
+            self._release(start, failed)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+            self._semaphore = None
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": LLM_MAX_CONCURRENCY,
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            **{**self._stats, "total_ms": round(self._stats["total_ms"], 1)}
+        }
+
+
+llm = LLMClient()
@@ -3,16 +3,20 @@ OpenAI Service for Natural Language to SQL Conversion
 Uses GPT models to convert user questions into SQL queries
 """
 
+import hashlib
 import os
-from openai import OpenAI
-from typing import Optional, Dict, List
+from typing import AsyncIterator, Optional, Dict, List
 from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
+from app.services.llm_client import llm
+from app.services.sql_cache import SQL_CACHE_ENABLED, sql_cache
 
 # Load environment variables
 load_dotenv()
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Per-call time limits, in seconds
+SQL_TIMEOUT = float(os.getenv("OPENAI_SQL_TIMEOUT", "20"))
+REPORT_TIMEOUT = float(os.getenv("OPENAI_REPORT_TIMEOUT", "60"))
 
 # Database schema information
 DATABASE_SCHEMA = """
@@ -137,7 +141,14 @@ SQL: SELECT b.brand_name, COUNT(DISTINCT ib.interview_id) as user_count FROM int
 Now generate SQL for the following question:
 """
 
-def generate_sql_with_openai(
+# Changes whenever the prompt or schema text does, so cached SQL from an older prompt is not reused
+PROMPT_VERSION = hashlib.blake2b((SYSTEM_PROMPT + DATABASE_SCHEMA).encode("utf-8"), digest_size=8).hexdigest()
+
+def sql_model() -> str:
+    """Model used for SQL generation"""
+    return os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+
+async def generate_sql_with_openai(
     question: str, 
     selected_tables: Optional[List[str]] = None,
     model: str = None,
@@ -157,7 +168,7 @@ def generate_sql_with_openai(
     """
     try:
         # Get configuration from environment or use defaults
-        model = model or os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+        model = model or sql_model()
         temperature = temperature or float(os.getenv("OPENAI_TEMPERATURE", "0.1"))
         
         # Build context with schema
@@ -174,7 +185,8 @@ def generate_sql_with_openai(
         ]
         
         # Call OpenAI API
-        response = client.chat.completions.create(
+        response = await llm.chat_completion(
+            timeout=SQL_TIMEOUT,
             model=model,
             messages=messages,
             temperature=temperature,
@@ -214,54 +226,60 @@ def generate_sql_with_openai(
             "error": str(e)
         }
 
-def generate_report_from_results(
-    question: str,
-    sql_query: str,
-    data: List[Dict],
-    model: str = None,
-    temperature: float = None
-) -> Dict[str, any]:
+async def generate_sql_cached(question: str, selected_tables: Optional[List[str]] = None) -> Dict[str, any]:
     """
-    Generate a comprehensive report/analysis from SQL query results using OpenAI
-    
-    Args:
-        question: Original user question
-        sql_query: SQL query that was executed
-        data: Query results (list of dictionaries)
-        model: OpenAI model to use
-        temperature: Temperature for generation
+    generate_sql_with_openai through the persistent SQL cache
     
     Returns:
-        Dict with 'report', 'insights', 'success' keys
+        Same keys as generate_sql_with_openai, plus 'cached' (True when served from the cache)
     """
-    try:
-        model = model or os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-        temperature = temperature or float(os.getenv("OPENAI_TEMPERATURE", "0.3"))
-        
-        # Prepare data summary
-        data_summary = ""
-        if data and len(data) > 0:
-            # Show first 20 rows for context
-            data_preview = data[:20]
-            data_summary = f"Query returned {len(data)} rows. Here are the results:\n\n"
-            
-            # Format data as a readable table
-            if data_preview:
-                headers = list(data_preview[0].keys())
-                data_summary += "| " + " | ".join(headers) + " |\n"
-                data_summary += "|" + "|".join(["---" for _ in headers]) + "|\n"
-                
-                for row in data_preview:
-                    values = [str(row.get(h, "")) for h in headers]
-                    data_summary += "| " + " | ".join(values) + " |\n"
-                
-                if len(data) > 20:
-                    data_summary += f"\n... and {len(data) - 20} more rows"
+    model = sql_model()
+    if SQL_CACHE_ENABLED:
+        # Usually answered from memory, but may touch or expire the entry on disk
+        sql_query = await run_in_threadpool(sql_cache.get, question, selected_tables, model, PROMPT_VERSION)
+        if sql_query is not None:
+            return {
+                "success": True,
+                "sql_query": sql_query,
+                "explanation": f"Generated using {model} (cached)",
+                "error": None,
+                "cached": True
+            }
+    
+    result = await generate_sql_with_openai(question, selected_tables, model=model)
+    if result["success"] and SQL_CACHE_ENABLED:
+        await run_in_threadpool(sql_cache.put, question, selected_tables, model, PROMPT_VERSION, result["sql_query"])
+    return {**result, "cached": False}
+
+def report_messages(question: str, sql_query: str, data: List[Dict], truncated: bool = False) -> List[Dict]:
+    """Chat messages asking for the report on a query's results (truncated: more rows exist than data)"""
+    # Prepare data summary
+    data_summary = ""
+    if data and len(data) > 0:
+        # Show first 20 rows for context
+        data_preview = data[:20]
+        if truncated:
+            data_summary = f"Query returned more than {len(data)} rows; only the first {len(data)} were fetched. Here are the results:\n\n"
         else:
-            data_summary = "Query returned no results."
+            data_summary = f"Query returned {len(data)} rows. Here are the results:\n\n"
         
-        # Create prompt for report generation
-        report_prompt = f"""You are a data analyst for interview research. Analyze the following query results and provide a comprehensive report in Thai.
+        # Format data as a readable table
+        if data_preview:
+            headers = list(data_preview[0].keys())
+            data_summary += "| " + " | ".join(headers) + " |\n"
+            data_summary += "|" + "|".join(["---" for _ in headers]) + "|\n"
+            
+            for row in data_preview:
+                values = [str(row.get(h, "")) for h in headers]
+                data_summary += "| " + " | ".join(values) + " |\n"
+            
+            if len(data) > 20:
+                data_summary += f"\n... and {len(data) - 20} more rows"
+    else:
+        data_summary = "Query returned no results."
+    
+    # Create prompt for report generation
+    report_prompt = f"""You are a data analyst for interview research. Analyze the following query results and provide a comprehensive report in Thai.
 
 User Question: {question}
 
@@ -278,12 +296,42 @@ Please provide:
 Format your response in clear Thai language with proper structure and bullet points where appropriate.
 Keep it concise but informative (max 300 words)."""
 
-        messages = [
-            {"role": "system", "content": "You are an expert data analyst specializing in interview research and consumer insights. Provide clear, actionable analysis in Thai language."},
-            {"role": "user", "content": report_prompt}
-        ]
+    messages = [
+        {"role": "system", "content": "You are an expert data analyst specializing in interview research and consumer insights. Provide clear, actionable analysis in Thai language."},
+        {"role": "user", "content": report_prompt}
+    ]
+    return messages
+
+async def generate_report_from_results(
+    question: str,
+    sql_query: str,
+    data: List[Dict],
+    model: str = None,
+    temperature: float = None,
+    truncated: bool = False
+) -> Dict[str, any]:
+    """
+    Generate a comprehensive report/analysis from SQL query results using OpenAI
+    
+    Args:
+        question: Original user question
+        sql_query: SQL query that was executed
+        data: Query results (list of dictionaries)
+        model: OpenAI model to use
+        temperature: Temperature for generation
+        truncated: Whether the query had more rows than data holds
+    
+    Returns:
+        Dict with 'report', 'insights', 'success' keys
+    """
+    try:
+        model = model or os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+        temperature = temperature or float(os.getenv("OPENAI_TEMPERATURE", "0.3"))
+        
+        messages = report_messages(question, sql_query, data, truncated)
         
-        response = client.chat.completions.create(
+        response = await llm.chat_completion(
+            timeout=REPORT_TIMEOUT,
             model=model,
             messages=messages,
             temperature=temperature,
@@ -307,6 +355,31 @@ Keep it concise but informative (max 300 words)."""
             "error": str(e)
         }
 
+async def stream_report_from_results(
+    question: str,
+    sql_query: str,
+    data: List[Dict],
+    model: str = None,
+    temperature: float = None,
+    truncated: bool = False
+) -> AsyncIterator[str]:
+    """
+    Same report as generate_report_from_results, yielded piece by piece as the model writes it
+    
+    Raises:
+        Any error of the OpenAI call (the caller decides how to end its stream)
+    """
+    model = model or os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    temperature = temperature or float(os.getenv("OPENAI_TEMPERATURE", "0.3"))
+    async for text in llm.stream_chat_completion(
+        timeout=REPORT_TIMEOUT,
+        model=model,
+        messages=report_messages(question, sql_query, data, truncated),
+        temperature=temperature,
+        max_tokens=1000
+    ):
+        yield text
+
 def is_openai_configured() -> bool:
     """Check if OpenAI API is properly configured"""
     api_key = os.getenv("OPENAI_API_KEY")
@@ -0,0 +1,295 @@
+"""
+Near-duplicate question cache for chat answers
+The same question is asked in many wordings, in Thai and in English, which the
+exact-match SQL cache does not recognize. Answered questions are indexed here as
+TF-IDF vectors of character n-grams (Thai is written without spaces between
+words, so n-grams are taken over characters rather than words), and a new
+question whose cosine similarity to an answered one reaches
+SEMANTIC_CACHE_THRESHOLD gets that answer, SQL and result included, without a
+call to the model. Similarity alone cannot tell "most positive" from "most
+negative" or "female" from "male" in an otherwise identical question, so the
+two must also mention the same KEY_TERMS concepts (negations, opposites,
+aggregates and what is asked about), differ in no other English word but
+stopwords, and have the same numbers and selected tables (see same_terms);
+within those guards the threshold decides.
+
+The index is a sparse matrix in coordinate form, kept as NumPy arrays (entry,
+n-gram, term frequency), so a lookup is a gather and a bincount over the stored
+n-grams with IDF weights from the current document frequencies. Answers are
+only valid for the data they were computed from: the whole index is dropped when
+the data version moves.
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import FrozenSet, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.services.sql_cache import normalize_question
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "1") == "1"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.5"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2000"))
+
+NGRAM_SIZES = (2, 3, 4)
+
+# Words that may be added, dropped or swapped without changing what is asked
+STOPWORDS = frozenset("""
+    a an the of in on at to for from by with and or is are was were be been being do does did
+    what what's which who whom whose how many much there here this that these those it its
+    me my i we our you your they their them s please show list give tell display find get can could
+    would will shall should all any some
+""".split())
+
+# Terms that change what a question asks however similar the rest of it is:
+# negations, opposites, aggregates and what is being asked about. Synonyms (English
+# and Thai) name the same concept; two questions only match when they mention the
+# same concepts. English terms match whole words, optionally plural; Thai terms
+# match anywhere, as Thai has no spaces between words.
+KEY_TERMS = {
+    "not": "not | no | none | never | without | except | excluding | non | ไม่",
+    "most": "most | more | highest | higher | top | max | maximum | largest | biggest | best | มาก | สูง",
+    "least": "least | less | fewer | fewest | lowest | lower | bottom | min | minimum | smallest | worst | น้อย | ต่ำ",
+    "count": "how many | number of | count | กี่ | จำนวน",
+    "average": "average | mean | avg | เฉลี่ย",
+    "total": "total | sum | รวม",
+    "distribution": "distribution | breakdown | proportion | percentage | share | กระจาย | สัดส่วน | เปอร์เซ็นต์",
+    "positive": "positive | บวก",
+    "negative": "negative | ลบ",
+    "neutral": "neutral | เป็นกลาง",
+    "male": "male | man | men | ชาย",
+    "female": "female | woman | women | หญิง",
+    "interviewee": "interviewee | interviewed | people | person | respondent | participant | persona | คน | ผู้ให้สัมภาษณ์ | ผู้ถูกสัมภาษณ์",
+    "interview": "interview | session | การสัมภาษณ์",
+    "theme": "theme | topic | ธีม | หัวข้อ | ประเด็น",
+    "brand": "brand | แบรนด์ | ยี่ห้อ",
+    "segment": "segment | กลุ่ม",
+    "transcript": "transcript | quote | คำพูด",
+    "perception": "perception | การรับรู้",
+    "purchase": "purchase | buy | bought | ซื้อ",
+    "attribute": "attribute | คุณสมบัติ",
+    "manufacturer": "manufacturer | company | ผู้ผลิต | บริษัท",
+    "sentiment": "sentiment | feeling | ความรู้สึก",
+    "satisfaction": "satisfaction | satisfied | พอใจ",
+    "price": "price | cost | ราคา",
+    "age": "age | old | อายุ",
+    "gender": "gender | sex | เพศ",
+    "occupation": "occupation | job | role | profession | career | อาชีพ",
+    "income": "income | salary | รายได้",
+    "education": "education | การศึกษา",
+    "location": "location | city | province | place | where | จังหวัด | เมือง | ที่ไหน",
+    "date": "date | year | month | when | วันที่ | เดือน",
+}
+
+
+def _key_term_pattern(terms: str) -> re.Pattern:
+    alternatives = []
+    for term in terms.split(" | "):
+        if re.search(r"[\u0e00-\u0e7f]", term):
+            alternatives.append(re.escape(term))
+        else:
+            alternatives.append(rf"\b{re.escape(term)}s?\b")
+    return re.compile("|".join(alternatives))
+
+
+_KEY_TERM_PATTERNS = {concept: _key_term_pattern(terms) for concept, terms in KEY_TERMS.items()}
+
+# English words of KEY_TERMS, whose meaning the concept comparison already checks
+_KEY_WORDS = frozenset(
+    word for terms in KEY_TERMS.values() for word in terms.split() if re.fullmatch(r"[a-z]+", word)
+)
+
+
+class _Entry(NamedTuple):
+    question: str
+    tables: frozenset
+    numbers: Tuple[int, ...]
+    concepts: FrozenSet[str]
+    words: FrozenSet[str]
+    answer: dict
+    grams: np.ndarray    # n-gram ids
+    counts: np.ndarray   # occurrences of each
+
+
+class SemanticMatch(NamedTuple):
+    answer: dict
+    question: str       # the answered question that matched
+    similarity: float
+
+
+# A space between two Thai characters is optional spacing, not a word boundary
+_THAI_SPACE = re.compile(r"(?<=[\u0e00-\u0e7f]) (?=[\u0e00-\u0e7f])")
+
+
+def char_ngrams(question: str) -> List[str]:
+    """Character n-grams of the normalized question, padded with spaces at both ends"""
+    text = f" {_THAI_SPACE.sub('', normalize_question(question))} "
+    return [text[i:i + n] for n in NGRAM_SIZES for i in range(len(text) - n + 1)]
+
+
+def question_numbers(question: str) -> Tuple[int, ...]:
+    """Numbers in the question, which must match exactly ("top 5" is not "top 10")"""
+    return tuple(int(number) for number in re.findall(r"\d+", normalize_question(question)))
+
+
+def question_concepts(question: str) -> FrozenSet[str]:
+    """KEY_TERMS concepts the question mentions, which must match exactly ("most" is not "least")"""
+    text = _THAI_SPACE.sub("", normalize_question(question))
+    return frozenset(concept for concept, pattern in _KEY_TERM_PATTERNS.items() if pattern.search(text))
+
+
+def _stem(word: str) -> str:
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+
+def question_words(question: str) -> FrozenSet[str]:
+    """Non-Thai words of the question other than stopwords, lightly stemmed"""
+    text = normalize_question(question)
+    return frozenset(_stem(word) for word in re.findall(r"[^\W\d\u0e00-\u0e7f]+", text) if word not in STOPWORDS)
+
+
+def same_terms(a: _Entry, concepts: FrozenSet[str], words: FrozenSet[str]) -> bool:
+    """
+    Whether nothing but wording tells a question from an answered one
+
+    Both must mention the same KEY_TERMS concepts, and every English word in only
+    one of them must be a stopword or a key term: a word the other lacks that is
+    neither ("march", "bangkok", a brand name) may be what the question is about.
+    Thai has no spaces between words, so it is compared by concepts only.
+    """
+    return a.concepts == concepts and (a.words ^ words) <= _KEY_WORDS
+
+
+class SemanticCache:
+    """Answers by question, looked up by TF-IDF cosine similarity of character n-grams"""
+
+    def __init__(self, threshold: float, max_entries: int):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._version = None
+        self._entries = OrderedDict()  # entry id -> _Entry, least recently used first
+        self._next_id = 0
+        self._vocabulary = {}           # n-gram -> id
+        self._df = np.zeros(0, dtype=np.int32)
+        self._matrix = None             # _build_matrix(), until entries are added or removed
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "resets": 0}
+
+    def _vectorize(self, grams: List[str], grow: bool) -> Tuple[np.ndarray, np.ndarray]:
+        """(n-gram ids, counts); with grow=False n-grams never seen before are left out"""
+        counts = {}
+        for gram in grams:
+            gram_id = self._vocabulary.get(gram)
+            if gram_id is None:
+                if not grow:
+                    continue
+                gram_id = self._vocabulary[gram] = len(self._vocabulary)
+            counts[gram_id] = counts.get(gram_id, 0) + 1
+        return (
+            np.fromiter(counts.keys(), dtype=np.int32, count=len(counts)),
+            np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        )
+
+    def _reset(self):
+        self._entries.clear()
+        self._vocabulary.clear()
+        self._df = np.zeros(0, dtype=np.int32)
+        self._matrix = None
+
+    def _check_version(self, data_version: int):
+        if self._version != data_version:
+            if self._entries:
+                self._stats["resets"] += 1
+            self._version = data_version
+            self._reset()
+
+    def _build_matrix(self):
+        """(entry ids, row of each stored n-gram, n-gram ids, TF-IDF weights, row norms, IDF)"""
+        if self._matrix is None:
+            entry_ids = np.fromiter(self._entries.keys(), dtype=np.int64, count=len(self._entries))
+            values = list(self._entries.values())
+            rows = np.repeat(np.arange(len(values)), [len(entry.grams) for entry in values])
+            grams = np.concatenate([entry.grams for entry in values])
+            idf = np.log((1 + len(values)) / (1 + self._df)) + 1
+            weights = np.concatenate([entry.counts for entry in values]) * idf[grams]
+            norms = np.sqrt(np.bincount(rows, weights * weights, minlength=len(values)))
+            self._matrix = (entry_ids, rows, grams, weights, norms, idf)
+        return self._matrix
+
+    def get(self, question: str, selected_tables: Optional[List[str]], data_version: int) -> Optional[SemanticMatch]:
+        """Answer of the most similar answered question with the same numbers, concepts and tables"""
+        tables = frozenset(selected_tables or ())
+        numbers = question_numbers(question)
+        concepts = question_concepts(question)
+        words = question_words(question)
+        with self._lock:
+            self._check_version(data_version)
+            if not self._entries:
+                self._stats["misses"] += 1
+                return None
+
+            entry_ids, rows, grams, weights, norms, idf = self._build_matrix()
+            question_grams = char_ngrams(question)
+            query_grams, query_counts = self._vectorize(question_grams, grow=False)
+            query = np.zeros(len(self._vocabulary), dtype=np.float64)
+            query[query_grams] = query_counts * idf[query_grams]
+            # Unseen n-grams have no column but still count towards the question's norm
+            unseen = len(question_grams) - int(query_counts.sum())
+            query_norm = np.sqrt(np.dot(query, query) + unseen * (np.log(1 + len(entry_ids)) + 1) ** 2)
+            if query_norm == 0:
+                self._stats["misses"] += 1
+                return None
+
+            similarity = np.bincount(rows, weights * query[grams], minlength=len(entry_ids)) / (norms * query_norm)
+            candidates = np.flatnonzero(similarity >= self.threshold)
+            for row in candidates[np.argsort(-similarity[candidates])]:
+                entry_id = int(entry_ids[row])
+                entry = self._entries[entry_id]
+                if entry.tables == tables and entry.numbers == numbers and same_terms(entry, concepts, words):
+                    # The matrix maps rows to entry ids, so reordering leaves it valid
+                    self._entries.move_to_end(entry_id)
+                    self._stats["hits"] += 1
+                    return SemanticMatch(entry.answer, entry.question, round(float(similarity[row]), 4))
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, question: str, selected_tables: Optional[List[str]], answer: dict, data_version: int):
+        with self._lock:
+            self._check_version(data_version)
+            grams, counts = self._vectorize(char_ngrams(question), grow=True)
+            if len(self._df) < len(self._vocabulary):
+                self._df = np.concatenate([self._df, np.zeros(len(self._vocabulary) - len(self._df), dtype=np.int32)])
+            self._df[grams] += 1
+            self._entries[self._next_id] = _Entry(
+                question, frozenset(selected_tables or ()), question_numbers(question),
+                question_concepts(question), question_words(question), answer, grams, counts
+            )
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                evicted = self._entries.popitem(last=False)[1]
+                self._df[evicted.grams] -= 1
+                self._stats["evictions"] += 1
+            self._matrix = None
+            self._stats["stores"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "enabled": SEMANTIC_CACHE_ENABLED,
+                "threshold": self.threshold,
+                "entries": len(self._entries),
+                "vocabulary": len(self._vocabulary),
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else None,
+                **self._stats
+            }
+
+
+semantic_cache = SemanticCache(SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_ENTRIES)
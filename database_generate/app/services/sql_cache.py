@@ -0,0 +1,208 @@
+"""
+Persistent cache of generated SQL
+Questions turned into SQL by the language model are stored in a SQLite table,
+keyed by the normalized question, the selected tables, the model and the prompt
+version, so a repeated question skips the API round trip, across restarts and
+worker processes. Entries expire after a TTL and the least recently used are
+evicted beyond a maximum count. Lookups are answered from an in-process copy of
+recently used entries first.
+
+The cache lives in its own database file: writing it into interview_data.db
+would move the data version and invalidate every cache of the interview data.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import List, Optional
+
+SQL_CACHE_ENABLED = os.getenv("SQL_CACHE_ENABLED", "1") == "1"
+SQL_CACHE_PATH = os.getenv(
+    "SQL_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "nl_sql_cache.db")
+)
+SQL_CACHE_TTL_SECONDS = float(os.getenv("SQL_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+SQL_CACHE_MAX_ENTRIES = int(os.getenv("SQL_CACHE_MAX_ENTRIES", "10000"))
+SQL_CACHE_MEMORY_ENTRIES = int(os.getenv("SQL_CACHE_MEMORY_ENTRIES", "1024"))
+
+# last_used_at is rewritten at most this often per entry, so hits stay reads;
+# hit_count catches up with the hits counted in memory at the same time
+TOUCH_INTERVAL_SECONDS = 60.0
+
+_TRAILING_PUNCTUATION = "?？!！.。 "
+
+
+def normalize_question(question: str) -> str:
+    """Question as cached: NFKC, case-folded, single spaces, no trailing punctuation"""
+    question = unicodedata.normalize("NFKC", question).casefold()
+    return re.sub(r"\s+", " ", question).strip().rstrip(_TRAILING_PUNCTUATION)
+
+
+def cache_key(question: str, selected_tables: Optional[List[str]], model: str, prompt_version: str) -> str:
+    tables = sorted(set(selected_tables)) if selected_tables else []
+    material = json.dumps([normalize_question(question), tables, model, prompt_version], ensure_ascii=False)
+    return hashlib.blake2b(material.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class SQLCache:
+    """Generated SQL by question, in a SQLite table with TTL and LRU eviction"""
+
+    def __init__(self, path: str, ttl_seconds: float, max_entries: int, memory_entries: int = 1024):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._conn = None
+        self._memory = OrderedDict()  # key -> [sql_query, created_at, last touched, hits not yet written]
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0}
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("PRAGMA busy_timeout = 5000")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS nl_sql_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    question TEXT NOT NULL,
+                    selected_tables TEXT,
+                    model TEXT NOT NULL,
+                    prompt_version TEXT NOT NULL,
+                    sql_query TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL,
+                    hit_count INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_nl_sql_cache_last_used ON nl_sql_cache (last_used_at)")
+            self._conn = conn
+        return self._conn
+
+    def _remember(self, key: str, sql_query: str, created_at: float, touched: float):
+        self._memory[key] = [sql_query, created_at, touched, 0]
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            evicted_key, evicted = self._memory.popitem(last=False)
+            self._flush_hits(evicted_key, evicted)
+
+    def _flush_hits(self, key: str, entry: list):
+        """Write the entry's hits counted since it was last written"""
+        if entry[3]:
+            self._connection().execute(
+                "UPDATE nl_sql_cache SET last_used_at = ?, hit_count = hit_count + ? WHERE cache_key = ?",
+                (entry[2], entry[3], key)
+            )
+            entry[3] = 0
+
+    def get(self, question: str, selected_tables: Optional[List[str]], model: str, prompt_version: str) -> Optional[str]:
+        """Cached SQL for the question, or None"""
+        key = cache_key(question, selected_tables, model, prompt_version)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                row = self._connection().execute(
+                    "SELECT sql_query, created_at, last_used_at FROM nl_sql_cache WHERE cache_key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    self._remember(key, row[0], row[1], row[2])
+                    entry = self._memory[key]
+
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            if now - entry[1] > self.ttl_seconds:
+                self._memory.pop(key, None)
+                self._connection().execute("DELETE FROM nl_sql_cache WHERE cache_key = ?", (key,))
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+
+            self._memory.move_to_end(key)
+            entry[3] += 1
+            if now - entry[2] > TOUCH_INTERVAL_SECONDS:
+                entry[2] = now
+                self._flush_hits(key, entry)
+            self._stats["hits"] += 1
+            return entry[0]
+
+    def put(self, question: str, selected_tables: Optional[List[str]], model: str, prompt_version: str, sql_query: str):
+        key = cache_key(question, selected_tables, model, prompt_version)
+        now = time.time()
+        tables = ",".join(sorted(set(selected_tables))) if selected_tables else None
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO nl_sql_cache
+                        (cache_key, question, selected_tables, model, prompt_version, sql_query, created_at, last_used_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (key, normalize_question(question), tables, model, prompt_version, sql_query, now, now)
+                )
+                expired = conn.execute(
+                    "DELETE FROM nl_sql_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+                ).rowcount
+                evicted = conn.execute(
+                    """
+                    DELETE FROM nl_sql_cache WHERE cache_key IN (
+                        SELECT cache_key FROM nl_sql_cache ORDER BY last_used_at
+                        LIMIT max(0, (SELECT COUNT(*) FROM nl_sql_cache) - ?)
+                    )
+                    """,
+                    (self.max_entries,)
+                ).rowcount
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                conn.execute("ROLLBACK")
+                raise
+            if expired or evicted:
+                # Entries removed here may still be in the in-process copy
+                for memory_key, entry in self._memory.items():
+                    self._flush_hits(memory_key, entry)
+                self._memory.clear()
+            self._remember(key, sql_query, now, now)
+            self._stats["stores"] += 1
+            self._stats["expired"] += expired
+            self._stats["evictions"] += evicted
+
+    def clear(self):
+        with self._lock:
+            self._connection().execute("DELETE FROM nl_sql_cache")
+            self._memory.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            # Disabled, the cache file is never opened (or created) at all
+            entries = 0
+            if SQL_CACHE_ENABLED:
+                entries = self._connection().execute("SELECT COUNT(*) FROM nl_sql_cache").fetchone()[0]
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "enabled": SQL_CACHE_ENABLED,
+                "entries": entries,
+                "in_memory": len(self._memory),
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else None,
+                **self._stats
+            }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                for key, entry in self._memory.items():
+                    self._flush_hits(key, entry)
+                self._conn.close()
+                self._conn = None
+
+
+sql_cache = SQLCache(SQL_CACHE_PATH, SQL_CACHE_TTL_SECONDS, SQL_CACHE_MAX_ENTRIES, SQL_CACHE_MEMORY_ENTRIES)
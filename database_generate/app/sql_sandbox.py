@@ -0,0 +1,179 @@
+"""
+Sandboxed execution of generated SQL
+Questions asked in the chat are answered with SQL written by a language model (or
+the rule-based fallback), so it is run on a connection of its own rather than
+through execute_query:
+
+- read-only, with an authorizer that allows SELECT, reads of the whitelisted
+  tables and the built-in functions in ALLOWED_FUNCTIONS only (no PRAGMA,
+  ATTACH, writes, other tables or load_extension);
+- a progress handler aborts the statement once it has run more than
+  SQL_SANDBOX_MAX_VM_STEPS virtual machine instructions or SQL_SANDBOX_TIME_LIMIT
+  seconds, so a runaway join cannot pin a worker;
+- rows are fetched incrementally and fetching stops at SQL_SANDBOX_MAX_ROWS,
+  instead of materializing the whole result and slicing it.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, NamedTuple
+
+from app.database import read_connection
+
+SQL_SANDBOX_MAX_ROWS = int(os.getenv("SQL_SANDBOX_MAX_ROWS", "50"))
+SQL_SANDBOX_MAX_VM_STEPS = int(os.getenv("SQL_SANDBOX_MAX_VM_STEPS", "50000000"))
+SQL_SANDBOX_TIME_LIMIT = float(os.getenv("SQL_SANDBOX_TIME_LIMIT", "5"))
+
+# The progress handler runs every this many VM instructions
+PROGRESS_INTERVAL = 10000
+
+# Longest string or blob a query may build (zeroblob, replace, group_concat ...)
+MAX_VALUE_BYTES = 10 * 1024 * 1024
+
+# Core, date, math and window functions; anything else (load_extension, readfile,
+# fts3_tokenizer, zeroblob ...) is refused
+ALLOWED_FUNCTIONS = frozenset("""
+    abs avg count group_concat string_agg max min sum total
+    coalesce ifnull iif nullif typeof likely unlikely likelihood
+    length octet_length lower upper substr substring trim ltrim rtrim replace instr
+    printf format char unicode hex quote like glob concat concat_ws
+    round ceil ceiling floor sqrt pow power exp ln log log10 log2 mod pi sign
+    date time datetime julianday unixepoch strftime timediff
+    row_number rank dense_rank percent_rank cume_dist ntile lag lead first_value last_value nth_value
+    json json_extract json_array json_object json_array_length json_type json_valid json_group_array
+    json_group_object
+""".split())
+
+
+class SQLSandboxError(Exception):
+    """Generated SQL that the sandbox refused or stopped; the message is shown to the user"""
+
+
+class SQLNotAllowed(SQLSandboxError):
+    """The statement does something other than read the whitelisted tables"""
+
+
+class SQLBudgetExceeded(SQLSandboxError):
+    """The statement ran past its VM-step or time budget"""
+
+
+class SQLInvalid(SQLSandboxError):
+    """The statement is not valid SQL (syntax error, several statements, unknown column ...)"""
+
+
+class SandboxResult(NamedTuple):
+    rows: List[dict]
+    truncated: bool      # more rows than max_rows; only the first max_rows were fetched
+    vm_steps: int        # approximate, in multiples of PROGRESS_INTERVAL
+    elapsed_ms: float
+
+
+class SQLSandbox:
+    """Runs one SELECT at a time under an authorizer, a row cap and an execution budget"""
+
+    def __init__(self, tables: Iterable[str], max_rows: int, max_vm_steps: int, time_limit: float):
+        self.tables = frozenset(tables)
+        self.max_rows = max_rows
+        self.max_vm_steps = max_vm_steps
+        self.time_limit = time_limit
+        self._lock = threading.Lock()
+        self._stats = {"queries": 0, "truncated": 0, "denied": 0, "over_budget": 0, "errors": 0}
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _restrict(self, conn: sqlite3.Connection, denied: list):
+        conn.setlimit(sqlite3.SQLITE_LIMIT_LENGTH, MAX_VALUE_BYTES)
+        conn.setlimit(sqlite3.SQLITE_LIMIT_ATTACHED, 0)
+
+        def authorize(action, arg1, arg2, database, trigger):
+            if action == sqlite3.SQLITE_SELECT:
+                return sqlite3.SQLITE_OK
+            if action == sqlite3.SQLITE_READ:
+                if arg1 in self.tables:
+                    return sqlite3.SQLITE_OK
+                denied.append(f"reading table {arg1}")
+                return sqlite3.SQLITE_DENY
+            if action == sqlite3.SQLITE_FUNCTION:
+                if arg2.lower() in ALLOWED_FUNCTIONS:
+                    return sqlite3.SQLITE_OK
+                denied.append(f"function {arg2}()")
+                return sqlite3.SQLITE_DENY
+            if action == sqlite3.SQLITE_RECURSIVE:
+                return sqlite3.SQLITE_OK
+            denied.append("statements other than SELECT")
+            return sqlite3.SQLITE_DENY
+
+        conn.set_authorizer(authorize)
+
+    def execute(self, sql: str, params: tuple = ()) -> SandboxResult:
+        """
+        Run a SELECT and fetch up to max_rows rows
+
+        Raises:
+            SQLNotAllowed: When the statement touches anything but the whitelisted tables
+            SQLBudgetExceeded: When it runs past max_vm_steps or time_limit
+            SQLInvalid: For any other SQL error
+        """
+        with read_connection() as conn:
+            return self._execute(conn, sql, params)
+
+    def _execute(self, conn: sqlite3.Connection, sql: str, params: tuple) -> SandboxResult:
+        denied = []
+        self._restrict(conn, denied)
+        start = time.perf_counter()
+        deadline = start + self.time_limit
+        steps = 0
+        exceeded = None
+
+        def progress():
+            nonlocal steps, exceeded
+            steps += PROGRESS_INTERVAL
+            if steps > self.max_vm_steps:
+                exceeded = f"more than {self.max_vm_steps:,} steps"
+            elif time.perf_counter() > deadline:
+                exceeded = f"more than {self.time_limit:g} s"
+            return exceeded is not None
+
+        conn.set_progress_handler(progress, PROGRESS_INTERVAL)
+        try:
+            cursor = conn.execute(sql, params)
+            columns = [column[0] for column in cursor.description or ()]
+            fetched = cursor.fetchmany(self.max_rows + 1)
+        except sqlite3.Error as e:
+            if denied:
+                self._count("denied")
+                raise SQLNotAllowed(
+                    f"Query not allowed: only SELECT on {', '.join(sorted(self.tables))} is permitted "
+                    f"(refused {denied[0]})"
+                ) from None
+            if exceeded:
+                self._count("over_budget")
+                raise SQLBudgetExceeded(
+                    f"Query stopped after running {exceeded}; ask a narrower question"
+                ) from None
+            self._count("errors")
+            raise SQLInvalid(f"Invalid query: {e}") from None
+
+        truncated = len(fetched) > self.max_rows
+        self._count("queries")
+        if truncated:
+            self._count("truncated")
+        return SandboxResult(
+            rows=[dict(zip(columns, row)) for row in fetched[:self.max_rows]],
+            truncated=truncated,
+            vm_steps=steps,
+            elapsed_ms=(time.perf_counter() - start) * 1000
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_rows": self.max_rows,
+                "max_vm_steps": self.max_vm_steps,
+                "time_limit": self.time_limit,
+                **self._stats
+            }
@@ -0,0 +1,230 @@
+"""
+Benchmark: hot API queries with and without secondary indexes
+Builds a copy of the database at 100x the current data volume (every interview
+and its child rows duplicated under new IDs), times the route queries without
+indexes, then creates the indexes, runs ANALYZE and times them again.
+
+Usage:
+    python benchmark_indexes.py [--scale 100] [--repeat 20]
+"""
+
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from init_database import create_tables, create_indexes, analyze_database, import_csv_to_table
+
+# Tables imported from data_ai/ (same order as init_database.initialize_database)
+CSV_TABLES = [
+    ('segments_ai.csv', 'segments'),
+    ('interviews_ai.csv', 'interviews'),
+    ('personas_ai.csv', 'personas'),
+    ('brands_ai.csv', 'brands'),
+    ('themes_ai.csv', 'themes'),
+    ('transcript_lines_ai.csv', 'transcript_lines'),
+    ('interview_brands_ai.csv', 'interview_brands'),
+    ('interview_themes_ai.csv', 'interview_themes'),
+    ('brand_perceptions_ai.csv', 'brand_perceptions'),
+    ('product_attributes_ai.csv', 'product_attributes'),
+    ('purchase_behaviors_ai.csv', 'purchase_behaviors'),
+]
+
+# Per-interview tables that get duplicated; other tables are reference data
+SCALED_TABLES = [
+    'interviews', 'personas', 'transcript_lines', 'interview_brands',
+    'interview_themes', 'brand_perceptions', 'purchase_behaviors'
+]
+
+# Hot queries from app/routes with representative parameters
+QUERIES = [
+    ("themes: table counts", """
+        SELECT t.theme_id, t.theme_name_th, t.theme_name_en, COUNT(DISTINCT it.interview_id) as mention_count
+        FROM themes t
+        LEFT JOIN interview_themes it ON t.theme_id = it.theme_id
+        GROUP BY t.theme_id
+        ORDER BY mention_count DESC, t.theme_id
+    """, ()),
+    ("themes: example quotes", """
+        WITH RECURSIVE picks(theme_id, pick_rank, id, chosen_interviews) AS (
+            SELECT theme_id, 0, NULL, ',' FROM themes
+            UNION ALL
+            SELECT p.theme_id, p.pick_rank + 1, next_quote.id, p.chosen_interviews || next_quote.interview_id || ','
+            FROM picks p
+            JOIN interview_themes next_quote ON next_quote.id = (
+                SELECT it.id
+                FROM interview_themes it
+                WHERE it.theme_id = p.theme_id
+                AND it.quote_sample IS NOT NULL AND it.quote_sample != ''
+                AND instr(p.chosen_interviews, ',' || it.interview_id || ',') = 0
+                AND EXISTS (SELECT 1 FROM personas WHERE interview_id = it.interview_id)
+                ORDER BY it.confidence DESC, it.id
+                LIMIT 1
+            )
+            WHERE p.pick_rank < ?
+        )
+        SELECT 
+            p.theme_id,
+            it.interview_id,
+            it.quote_sample,
+            pe.role
+        FROM picks p
+        JOIN interview_themes it ON it.id = p.id
+        JOIN personas pe ON it.interview_id = pe.interview_id
+        ORDER BY p.theme_id, p.pick_rank
+    """, (3,)),
+    ("themes: sentiment distribution", """
+        SELECT sentiment, COUNT(*) as count, AVG(confidence) as avg_confidence
+        FROM interview_themes
+        WHERE theme_id = ?
+        GROUP BY sentiment
+    """, (1,)),
+    ("themes: top positive", """
+        SELECT t.theme_name_th, t.theme_name_en, COUNT(*) as mention_count
+        FROM interview_themes it
+        JOIN themes t ON it.theme_id = t.theme_id
+        WHERE it.sentiment = 'Positive'
+        GROUP BY t.theme_id
+        ORDER BY mention_count DESC
+        LIMIT 3
+    """, ()),
+    ("analytics: brand mentions", """
+        SELECT b.brand_name, COUNT(DISTINCT ib.interview_id) as interview_count
+        FROM interview_brands ib
+        JOIN brands b ON ib.brand_id = b.brand_id
+        GROUP BY b.brand_id
+        ORDER BY interview_count DESC
+    """, ()),
+    ("analytics: age distribution", """
+        SELECT CASE WHEN age < 25 THEN '18-24' WHEN age < 35 THEN '25-34' WHEN age < 45 THEN '35-44'
+                    WHEN age < 55 THEN '45-54' ELSE '55+' END as age_group,
+               COUNT(*) as count
+        FROM personas
+        WHERE age IS NOT NULL
+        GROUP BY age_group
+        ORDER BY age_group
+    """, ()),
+    ("brands: statistics", """
+        SELECT COUNT(DISTINCT interview_id) as total_mentions,
+               AVG(mentioned_count) as avg_mentions_per_interview,
+               SUM(CASE WHEN currently_using = 1 THEN 1 ELSE 0 END) as currently_using_count,
+               SUM(CASE WHEN has_used_before = 1 THEN 1 ELSE 0 END) as has_used_count
+        FROM interview_brands
+        WHERE brand_id = ?
+    """, (1,)),
+    ("brands: perceptions", """
+        SELECT bp.*, i.interview_id, p.role
+        FROM brand_perceptions bp
+        JOIN interviews i ON bp.interview_id = i.interview_id
+        JOIN personas p ON i.interview_id = p.interview_id
+        WHERE bp.brand_id = ?
+        ORDER BY bp.created_at DESC, bp.id
+        LIMIT ?
+    """, (1, 101)),
+    ("interviews: transcript", """
+        SELECT * FROM transcript_lines WHERE interview_id = ? ORDER BY turn_number, transcript_id LIMIT ?
+    """, ("P1", 501)),
+    ("interviews: themes", """
+        SELECT t.*, it.sentiment, it.quote_sample, it.confidence
+        FROM themes t
+        JOIN interview_themes it ON t.theme_id = it.theme_id
+        WHERE it.interview_id = ?
+        ORDER BY it.confidence DESC
+    """, ("P1",)),
+    ("interviews: brands", """
+        SELECT b.*, ib.mentioned_count, ib.currently_using, ib.awareness_level
+        FROM brands b
+        JOIN interview_brands ib ON b.brand_id = ib.brand_id
+        WHERE ib.interview_id = ?
+    """, ("P1",)),
+]
+
+
+def scale_table(conn, table: str, copies: int):
+    """Append `copies` duplicates of every row with new interview and row IDs"""
+    table_info = conn.execute(f"PRAGMA table_info({table})").fetchall()
+    columns = [row[1] for row in table_info]
+    offset = conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {table}").fetchone()[0]
+
+    select = []
+    for _, column, column_type, _, _, is_primary_key in table_info:
+        if column == 'interview_id':
+            select.append("interview_id || '_' || n.k")
+        elif is_primary_key and column_type.upper() == 'INTEGER':
+            select.append(f"{column} + n.k * {offset}")
+        else:
+            select.append(column)
+
+    conn.execute(f"""
+        WITH RECURSIVE n(k) AS (SELECT 1 UNION ALL SELECT k + 1 FROM n WHERE k < {copies})
+        INSERT INTO {table} ({', '.join(columns)})
+        SELECT {', '.join(select)} FROM {table}, n
+        WHERE {table}.rowid <= {offset}
+    """)
+
+
+def build_database(path: str, scale: int):
+    """Create the scaled database without secondary indexes"""
+    conn = sqlite3.connect(path)
+    create_tables(conn)
+
+    for csv_filename, table in CSV_TABLES:
+        import_csv_to_table(conn, csv_filename, table)
+
+    for table in SCALED_TABLES:
+        scale_table(conn, table, scale - 1)
+    conn.commit()
+    return conn
+
+
+def time_queries(conn, repeat: int) -> dict:
+    """Median wall time in ms per query"""
+    timings = {}
+    for name, sql, params in QUERIES:
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            samples.append((time.perf_counter() - started) * 1000)
+        timings[name] = statistics.median(samples)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=100, help="Data volume multiplier")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per query")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "benchmark.db")
+        conn = build_database(path, args.scale)
+
+        counts = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in SCALED_TABLES}
+        print("\n" + "=" * 80)
+        print(f"INDEX BENCHMARK ({args.scale}x data volume)")
+        print("=" * 80)
+        for table, count in counts.items():
+            print(f"  {table}: {count:,} rows")
+
+        before = time_queries(conn, args.repeat)
+
+        create_indexes(conn)
+        analyze_database(conn)
+        after = time_queries(conn, args.repeat)
+        conn.close()
+
+    print(f"\n{'query':<34}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    print("-" * 68)
+    for name, _, _ in QUERIES:
+        speedup = before[name] / after[name] if after[name] else float("inf")
+        print(f"{name:<34}{before[name]:>12.2f}{after[name]:>12.2f}{speedup:>9.1f}x")
+    print("-" * 68)
+    total_before, total_after = sum(before.values()), sum(after.values())
+    print(f"{'total':<34}{total_before:>12.2f}{total_after:>12.2f}{total_before / total_after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
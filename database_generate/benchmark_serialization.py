@@ -0,0 +1,100 @@
+"""
+Benchmark: list response serialization, response_model vs rows_response
+Serves one large transcript (real transcript lines repeated to the requested
+size) through two otherwise identical routes and times the full request:
+    response_model  - FastAPI validates every row into TranscriptLine, dumps and encodes it
+    rows_response   - row shape checked once, rows encoded directly with orjson
+
+Usage:
+    python benchmark_serialization.py [--lines 20000] [--repeat 20]
+"""
+
+import argparse
+import os
+import sqlite3
+import statistics
+import time
+from typing import List
+
+os.environ.setdefault("OPENAI_API_KEY", "your_openai_api_key_here")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.database import DB_PATH
+from app.models import TranscriptLine
+from app.serialization import orjson, rows_response
+
+
+def load_transcript(lines: int) -> List[dict]:
+    """Transcript rows from the database, repeated until there are `lines` of them"""
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    source = [dict(row) for row in conn.execute("SELECT * FROM transcript_lines ORDER BY interview_id, turn_number")]
+    conn.close()
+    if not source:
+        raise SystemExit("transcript_lines is empty; run init_database.py first")
+
+    rows = []
+    for i in range(lines):
+        row = dict(source[i % len(source)])
+        row["transcript_id"] = i + 1
+        row["turn_number"] = i + 1
+        rows.append(row)
+    return rows
+
+
+def build_app(rows: List[dict]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/response-model", response_model=List[TranscriptLine])
+    def with_response_model():
+        return [dict(row) for row in rows]
+
+    @app.get("/rows-response", response_model=List[TranscriptLine])
+    def with_rows_response():
+        return rows_response([dict(row) for row in rows], TranscriptLine)
+
+    return app
+
+
+def time_route(client: TestClient, path: str, repeat: int):
+    """Median request time in ms and response size"""
+    response = client.get(path)  # warm up (and verify the row shape once)
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(path)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=20000, help="Transcript lines in the response")
+    parser.add_argument("--repeat", type=int, default=20, help="Requests per route")
+    args = parser.parse_args()
+
+    rows = load_transcript(args.lines)
+    client = TestClient(build_app(rows))
+
+    print("\n" + "=" * 80)
+    print(f"SERIALIZATION BENCHMARK ({args.lines:,} transcript lines, encoder: {'orjson' if orjson else 'json'})")
+    print("=" * 80)
+
+    baseline_ms, baseline = time_route(client, "/response-model", args.repeat)
+    fast_ms, fast = time_route(client, "/rows-response", args.repeat)
+
+    if baseline.json() != fast.json():
+        raise SystemExit("Responses differ")
+
+    print(f"{'route':<20}{'median ms':>12}{'bytes':>14}")
+    print("-" * 46)
+    print(f"{'response_model':<20}{baseline_ms:>12.2f}{len(baseline.content):>14,}")
+    print(f"{'rows_response':<20}{fast_ms:>12.2f}{len(fast.content):>14,}")
+    print("-" * 46)
+    print(f"Speedup: {baseline_ms / fast_ms:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
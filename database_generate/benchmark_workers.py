@@ -0,0 +1,132 @@
+"""
+Benchmark: API throughput with 1 vs N uvicorn workers
+Starts the API in the read-only serving profile and load-tests the GET routes
+
+Usage:
+    python benchmark_workers.py [--workers 4] [--clients 16] [--duration 10]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Existing GET routes exercised by the dashboard
+ROUTES = [
+    "/segments",
+    "/interviews",
+    "/interviews/P1",
+    "/personas",
+    "/brands",
+    "/brands/1",
+    "/themes",
+    "/themes/1",
+    "/themes/table/all",
+    "/themes/insights/sentiment",
+    "/transcripts/P1",
+    "/analytics/summary",
+]
+
+
+def wait_until_ready(base_url: str, timeout: float = 30):
+    """Poll /health until the server answers"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/health", timeout=1) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not start within {timeout}s")
+
+
+def client_loop(args):
+    """Request routes round-robin until the deadline; return latencies in ms"""
+    base_url, offset, deadline = args
+    latencies = []
+    errors = 0
+    i = offset
+    while time.time() < deadline:
+        route = ROUTES[i % len(ROUTES)]
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(f"{base_url}{route}", timeout=10) as response:
+                response.read()
+            latencies.append((time.perf_counter() - started) * 1000)
+        except OSError:
+            errors += 1
+        i += 1
+    return latencies, errors
+
+
+def run_benchmark(workers: int, clients: int, duration: float, port: int) -> dict:
+    """Start uvicorn with the given worker count and measure throughput"""
+    env = dict(os.environ, DB_READ_ONLY="1")
+    env.setdefault("OPENAI_API_KEY", "your_openai_api_key_here")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app",
+         "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=BASE_DIR,
+        env=env
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_ready(base_url)
+
+        # Warm up every worker's connections and caches
+        client_loop((base_url, 0, time.time() + 1))
+
+        deadline = time.time() + duration
+        with ProcessPoolExecutor(max_workers=clients) as executor:
+            results = list(executor.map(client_loop, [(base_url, i, deadline) for i in range(clients)]))
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    latencies = sorted(ms for result, _ in results for ms in result)
+    errors = sum(e for _, e in results)
+    return {
+        "workers": workers,
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_second": round(len(latencies) / duration, 1),
+        "p50_ms": round(statistics.median(latencies), 2) if latencies else None,
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 2) if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Worker count for the N-worker run")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent client processes")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per run")
+    parser.add_argument("--port", type=int, default=8899)
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print(f"WORKER BENCHMARK ({args.clients} clients, {args.duration:.0f}s per run)")
+    print("=" * 80)
+
+    results = []
+    for workers in (1, args.workers):
+        result = run_benchmark(workers, args.clients, args.duration, args.port)
+        results.append(result)
+        print(json.dumps(result))
+
+    single, multi = results
+    if single["requests_per_second"]:
+        speedup = multi["requests_per_second"] / single["requests_per_second"]
+        print(f"\nSpeedup with {multi['workers']} workers: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,12 +6,68 @@ Imports CSV data from data_ai folder into SQLite database
 import sqlite3
 import csv
 import os
+import stat
+import tempfile
 from datetime import datetime
+from itertools import islice
 
 # Database file path
 DB_PATH = os.path.join(os.path.dirname(__file__), 'interview_data.db')
 CSV_DIR = os.path.join(os.path.dirname(__file__), 'data_ai')
 
+# Rows per executemany call during CSV import
+IMPORT_BATCH_SIZE = 5000
+
+# Age buckets used by the dashboard (format with the column expression)
+AGE_GROUP_SQL = """CASE
+            WHEN {age} < 25 THEN '18-24'
+            WHEN {age} < 35 THEN '25-34'
+            WHEN {age} < 45 THEN '35-44'
+            WHEN {age} < 55 THEN '45-54'
+            ELSE '55+'
+        END"""
+
+# How long the swap waits for readers of the current database to let its WAL be checkpointed
+SWAP_BUSY_TIMEOUT_MS = 30000
+
+# Secondary indexes, one per hot filter/join/aggregation pattern in app/routes.
+# Several are covering indexes so the GROUP BY queries never touch table rows.
+INDEXES = [
+    # interview_themes
+    # /themes/{id} insights and /themes/table/all examples: WHERE theme_id ORDER BY confidence
+    "CREATE INDEX IF NOT EXISTS idx_interview_themes_theme_confidence ON interview_themes (theme_id, confidence DESC)",
+    # /themes/table/all mention counts: COUNT(DISTINCT interview_id) GROUP BY theme_id (covering)
+    "CREATE INDEX IF NOT EXISTS idx_interview_themes_theme_interview ON interview_themes (theme_id, interview_id)",
+    # /themes/{id} sentiment distribution: WHERE theme_id GROUP BY sentiment, AVG(confidence) (covering)
+    "CREATE INDEX IF NOT EXISTS idx_interview_themes_theme_sentiment ON interview_themes (theme_id, sentiment, confidence)",
+    # Top positive / negative themes: WHERE sentiment ... GROUP BY theme_id (covering)
+    "CREATE INDEX IF NOT EXISTS idx_interview_themes_sentiment_theme ON interview_themes (sentiment, theme_id)",
+    # /interviews/{id} themes: WHERE interview_id ORDER BY confidence
+    "CREATE INDEX IF NOT EXISTS idx_interview_themes_interview ON interview_themes (interview_id, confidence DESC)",
+
+    # interview_brands
+    # Brand statistics and mention counts: WHERE/GROUP BY brand_id (covering)
+    "CREATE INDEX IF NOT EXISTS idx_interview_brands_brand ON interview_brands "
+    "(brand_id, interview_id, currently_using, has_used_before, mentioned_count, satisfaction_score)",
+    # /interviews/{id} brands
+    "CREATE INDEX IF NOT EXISTS idx_interview_brands_interview ON interview_brands (interview_id)",
+
+    # brand_perceptions: /brands/{id} WHERE brand_id ORDER BY created_at DESC
+    "CREATE INDEX IF NOT EXISTS idx_brand_perceptions_brand_created ON brand_perceptions (brand_id, created_at DESC)",
+
+    # transcript_lines: WHERE interview_id ORDER BY turn_number
+    "CREATE INDEX IF NOT EXISTS idx_transcript_lines_interview_turn ON transcript_lines (interview_id, turn_number)",
+
+    # interviews: /interviews?segment_id=
+    "CREATE INDEX IF NOT EXISTS idx_interviews_segment ON interviews (segment_id)",
+
+    # personas: age distribution and gender counts (covering)
+    "CREATE INDEX IF NOT EXISTS idx_personas_age_gender ON personas (age, gender)",
+
+    # purchase_behaviors: per-interview lookups
+    "CREATE INDEX IF NOT EXISTS idx_purchase_behaviors_interview ON purchase_behaviors (interview_id)",
+]
+
 def create_tables(conn):
     """Create all database tables"""
     cursor = conn.cursor()
@@ -199,11 +255,301 @@ def create_tables(conn):
     )
     ''')
     
+    # Materialized dashboard aggregates, filled by create_summary_tables and kept
+    # current by triggers, so summary routes read a few rows instead of scanning.
+    # Mentions per theme and sentiment (NULL sentiment is stored as '')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS theme_sentiment_stats (
+        theme_id INTEGER NOT NULL,
+        sentiment TEXT NOT NULL,
+        mention_count INTEGER NOT NULL,
+        quoted_count INTEGER NOT NULL,
+        PRIMARY KEY (theme_id, sentiment)
+    )
+    ''')
+    
+    # Per-brand interview counts, current users and satisfaction totals
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS brand_stats (
+        brand_id INTEGER PRIMARY KEY,
+        mention_count INTEGER NOT NULL,
+        interview_count INTEGER NOT NULL,
+        current_users INTEGER NOT NULL,
+        satisfaction_sum REAL NOT NULL,
+        satisfaction_count INTEGER NOT NULL
+    )
+    ''')
+    
+    # Persona counts per age group and per gender (dimension = 'age_group' or 'gender')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS persona_demographics (
+        dimension TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        persona_count INTEGER NOT NULL,
+        age_sum INTEGER NOT NULL,
+        age_count INTEGER NOT NULL,
+        PRIMARY KEY (dimension, bucket)
+    )
+    ''')
+    
+    # Full-text index over transcript text. The trigram tokenizer matches any
+    # substring of 3+ characters, which works for Thai (no spaces between words).
+    # External content table: the index stores no copy of the text itself.
+    cursor.execute('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS transcript_lines_fts USING fts5(
+        text,
+        content='transcript_lines',
+        content_rowid='transcript_id',
+        tokenize='trigram'
+    )
+    ''')
+    
     conn.commit()
     print("✓ Tables created successfully")
 
+def create_indexes(conn):
+    """Create secondary and covering indexes"""
+    cursor = conn.cursor()
+    
+    for statement in INDEXES:
+        cursor.execute(statement)
+    
+    conn.commit()
+    print(f"✓ Created {len(INDEXES)} indexes")
+
+def create_search_index(conn):
+    """Build the transcript full-text index and keep it in sync with later writes"""
+    cursor = conn.cursor()
+    
+    # Index everything imported so far in one pass
+    cursor.execute("INSERT INTO transcript_lines_fts(transcript_lines_fts) VALUES('rebuild')")
+    
+    # Triggers propagate subsequent inserts, updates and deletes
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS transcript_lines_fts_insert AFTER INSERT ON transcript_lines BEGIN
+        INSERT INTO transcript_lines_fts(rowid, text) VALUES (new.transcript_id, new.text);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS transcript_lines_fts_delete AFTER DELETE ON transcript_lines BEGIN
+        INSERT INTO transcript_lines_fts(transcript_lines_fts, rowid, text) VALUES ('delete', old.transcript_id, old.text);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS transcript_lines_fts_update AFTER UPDATE OF text ON transcript_lines BEGIN
+        INSERT INTO transcript_lines_fts(transcript_lines_fts, rowid, text) VALUES ('delete', old.transcript_id, old.text);
+        INSERT INTO transcript_lines_fts(rowid, text) VALUES (new.transcript_id, new.text);
+    END
+    ''')
+    
+    conn.commit()
+    print("✓ Built transcript full-text index")
+
+def _theme_stats_add(row):
+    return f"""
+        INSERT INTO theme_sentiment_stats (theme_id, sentiment, mention_count, quoted_count)
+        SELECT {row}.theme_id, IFNULL({row}.sentiment, ''), 1, ({row}.quote_sample IS NOT NULL AND {row}.quote_sample != '')
+        WHERE {row}.theme_id IS NOT NULL
+        ON CONFLICT (theme_id, sentiment) DO UPDATE SET
+            mention_count = mention_count + 1,
+            quoted_count = quoted_count + excluded.quoted_count;"""
+
+def _theme_stats_remove(row):
+    return f"""
+        UPDATE theme_sentiment_stats SET
+            mention_count = mention_count - 1,
+            quoted_count = quoted_count - ({row}.quote_sample IS NOT NULL AND {row}.quote_sample != '')
+        WHERE theme_id = {row}.theme_id AND sentiment = IFNULL({row}.sentiment, '');
+        DELETE FROM theme_sentiment_stats
+        WHERE theme_id = {row}.theme_id AND sentiment = IFNULL({row}.sentiment, '') AND mention_count <= 0;"""
+
+def _is_first_brand_mention(row):
+    """1 if no other interview_brands row links the same brand and interview"""
+    return f"""({row}.interview_id IS NOT NULL AND NOT EXISTS (
+            SELECT 1 FROM interview_brands
+            WHERE brand_id = {row}.brand_id AND interview_id = {row}.interview_id AND id != {row}.id))"""
+
+def _brand_stats_add(row):
+    return f"""
+        INSERT INTO brand_stats (brand_id, mention_count, interview_count, current_users, satisfaction_sum, satisfaction_count)
+        SELECT {row}.brand_id, 1, {_is_first_brand_mention(row)},
+               IFNULL({row}.currently_using = 1, 0), IFNULL({row}.satisfaction_score, 0), {row}.satisfaction_score IS NOT NULL
+        WHERE {row}.brand_id IS NOT NULL
+        ON CONFLICT (brand_id) DO UPDATE SET
+            mention_count = mention_count + 1,
+            interview_count = interview_count + excluded.interview_count,
+            current_users = current_users + excluded.current_users,
+            satisfaction_sum = satisfaction_sum + excluded.satisfaction_sum,
+            satisfaction_count = satisfaction_count + excluded.satisfaction_count;"""
+
+def _brand_stats_remove(row):
+    return f"""
+        UPDATE brand_stats SET
+            mention_count = mention_count - 1,
+            interview_count = interview_count - {_is_first_brand_mention(row)},
+            current_users = current_users - IFNULL({row}.currently_using = 1, 0),
+            satisfaction_sum = satisfaction_sum - IFNULL({row}.satisfaction_score, 0),
+            satisfaction_count = satisfaction_count - ({row}.satisfaction_score IS NOT NULL)
+        WHERE brand_id = {row}.brand_id;
+        DELETE FROM brand_stats WHERE brand_id = {row}.brand_id AND mention_count <= 0;"""
+
+def _demographics_add(row):
+    return f"""
+        INSERT INTO persona_demographics (dimension, bucket, persona_count, age_sum, age_count)
+        SELECT 'gender', IFNULL({row}.gender, ''), 1, IFNULL({row}.age, 0), {row}.age IS NOT NULL
+        WHERE true
+        ON CONFLICT (dimension, bucket) DO UPDATE SET
+            persona_count = persona_count + 1,
+            age_sum = age_sum + excluded.age_sum,
+            age_count = age_count + excluded.age_count;
+        INSERT INTO persona_demographics (dimension, bucket, persona_count, age_sum, age_count)
+        SELECT 'age_group', {AGE_GROUP_SQL.format(age=row + '.age')}, 1, {row}.age, 1
+        WHERE {row}.age IS NOT NULL
+        ON CONFLICT (dimension, bucket) DO UPDATE SET
+            persona_count = persona_count + 1,
+            age_sum = age_sum + excluded.age_sum,
+            age_count = age_count + 1;"""
+
+def _demographics_remove(row):
+    return f"""
+        UPDATE persona_demographics SET
+            persona_count = persona_count - 1,
+            age_sum = age_sum - IFNULL({row}.age, 0),
+            age_count = age_count - ({row}.age IS NOT NULL)
+        WHERE dimension = 'gender' AND bucket = IFNULL({row}.gender, '');
+        UPDATE persona_demographics SET
+            persona_count = persona_count - 1,
+            age_sum = age_sum - {row}.age,
+            age_count = age_count - 1
+        WHERE {row}.age IS NOT NULL AND dimension = 'age_group' AND bucket = {AGE_GROUP_SQL.format(age=row + '.age')};
+        DELETE FROM persona_demographics WHERE persona_count <= 0;"""
+
+def create_sync_triggers(cursor, name, table, columns, add, remove):
+    """
+    Keep a summary table in step with a source table
+    
+    add and remove build the statements that apply one source row ('new' or
+    'old') to the summary; an UPDATE of any of the given columns removes the
+    old row and adds the new one.
+    """
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS {name}_insert AFTER INSERT ON {table} BEGIN{add('new')}
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS {name}_delete AFTER DELETE ON {table} BEGIN{remove('old')}
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS {name}_update AFTER UPDATE OF {', '.join(columns)} ON {table} BEGIN{remove('old')}{add('new')}
+    END
+    ''')
+
+def create_summary_tables(conn):
+    """Materialize the dashboard aggregates and keep them in sync with later writes"""
+    cursor = conn.cursor()
+    
+    # Aggregate everything imported so far in one pass
+    cursor.execute("DELETE FROM theme_sentiment_stats")
+    cursor.execute('''
+    INSERT INTO theme_sentiment_stats (theme_id, sentiment, mention_count, quoted_count)
+    SELECT theme_id, IFNULL(sentiment, ''), COUNT(*), SUM(quote_sample IS NOT NULL AND quote_sample != '')
+    FROM interview_themes
+    WHERE theme_id IS NOT NULL
+    GROUP BY theme_id, IFNULL(sentiment, '')
+    ''')
+    
+    cursor.execute("DELETE FROM brand_stats")
+    cursor.execute('''
+    INSERT INTO brand_stats (brand_id, mention_count, interview_count, current_users, satisfaction_sum, satisfaction_count)
+    SELECT brand_id, COUNT(*), COUNT(DISTINCT interview_id), SUM(IFNULL(currently_using = 1, 0)),
+           IFNULL(SUM(satisfaction_score), 0), COUNT(satisfaction_score)
+    FROM interview_brands
+    WHERE brand_id IS NOT NULL
+    GROUP BY brand_id
+    ''')
+    
+    cursor.execute("DELETE FROM persona_demographics")
+    cursor.execute('''
+    INSERT INTO persona_demographics (dimension, bucket, persona_count, age_sum, age_count)
+    SELECT 'gender', IFNULL(gender, ''), COUNT(*), IFNULL(SUM(age), 0), COUNT(age)
+    FROM personas
+    GROUP BY IFNULL(gender, '')
+    ''')
+    cursor.execute(f'''
+    INSERT INTO persona_demographics (dimension, bucket, persona_count, age_sum, age_count)
+    SELECT 'age_group', {AGE_GROUP_SQL.format(age='age')}, COUNT(*), SUM(age), COUNT(age)
+    FROM personas
+    WHERE age IS NOT NULL
+    GROUP BY 2
+    ''')
+    
+    # Triggers apply subsequent inserts, updates and deletes
+    create_sync_triggers(cursor, 'theme_sentiment_stats', 'interview_themes',
+                         ['theme_id', 'sentiment', 'quote_sample'], _theme_stats_add, _theme_stats_remove)
+    create_sync_triggers(cursor, 'brand_stats', 'interview_brands',
+                         ['brand_id', 'interview_id', 'currently_using', 'satisfaction_score'],
+                         _brand_stats_add, _brand_stats_remove)
+    create_sync_triggers(cursor, 'persona_demographics', 'personas',
+                         ['age', 'gender'], _demographics_add, _demographics_remove)
+    
+    conn.commit()
+    print("✓ Built summary tables")
+
+def analyze_database(conn):
+    """Collect table and index statistics for the query planner"""
+    conn.execute("ANALYZE")
+    conn.commit()
+    print("✓ Analyzed tables and indexes")
+
+def _to_integer(value):
+    if value in ('True', 'true', 'TRUE', 'yes', 'Yes'):
+        return 1
+    if value in ('False', 'false', 'FALSE', 'no', 'No'):
+        return 0
+    try:
+        return int(value)
+    except ValueError:
+        number = float(value)
+        if not number.is_integer():
+            # "3.7" is not an integer; coerce_row keeps it as it was rather than truncate it
+            raise ValueError(f"not an integer: {value}")
+        return int(number)
+
+# Converters by declared column type; anything else is stored as text
+TYPE_CONVERTERS = {
+    'INTEGER': _to_integer,
+    'REAL': float,
+}
+
+def get_column_converters(conn, table_name, columns):
+    """Map each CSV column to a converter for its declared schema type"""
+    declared = {row[1]: row[2].upper() for row in conn.execute(f'PRAGMA table_info({table_name})')}
+    return [TYPE_CONVERTERS.get(declared.get(column, '')) for column in columns]
+
+def coerce_row(row, converters):
+    """Convert one CSV row to schema types (empty strings become NULL)"""
+    values = []
+    for value, convert in zip(row, converters):
+        if value == '':
+            values.append(None)
+        elif convert is None:
+            values.append(value)
+        else:
+            try:
+                values.append(convert(value))
+            except ValueError:
+                values.append(value)  # keep unparseable values as text
+    return values
+
 def import_csv_to_table(conn, csv_filename, table_name):
-    """Import CSV file into database table"""
+    """
+    Stream a CSV file into a database table
+    
+    Rows are coerced to the column types declared in the schema and inserted in
+    batches with executemany. Nothing is committed here, so a whole build runs
+    in the caller's transaction.
+    """
     csv_path = os.path.join(CSV_DIR, csv_filename)
     
     if not os.path.exists(csv_path):
@@ -212,46 +558,111 @@ def import_csv_to_table(conn, csv_filename, table_name):
     
     cursor = conn.cursor()
     
-    with open(csv_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
+    with open(csv_path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        columns = next(reader, None)
         
-        if not rows:
+        if not columns:
             print(f"⚠ Warning: {csv_filename} is empty")
             return
         
-        # Get column names from CSV
-        columns = list(rows[0].keys())
+        converters = get_column_converters(conn, table_name, columns)
         placeholders = ','.join(['?' for _ in columns])
         column_names = ','.join(columns)
+        insert_sql = f'INSERT OR REPLACE INTO {table_name} ({column_names}) VALUES ({placeholders})'
         
-        # Insert data
-        for row in rows:
-            values = [row[col] if row[col] != '' else None for col in columns]
-            cursor.execute(f'INSERT OR REPLACE INTO {table_name} ({column_names}) VALUES ({placeholders})', values)
+        # Insert data in fixed-size batches so memory use doesn't grow with the file
+        total = 0
+        while True:
+            batch = [coerce_row(row, converters) for row in islice(reader, IMPORT_BATCH_SIZE)]
+            if not batch:
+                break
+            cursor.executemany(insert_sql, batch)
+            total += len(batch)
         
-        conn.commit()
-        print(f"✓ Imported {len(rows)} rows into {table_name}")
+        print(f"✓ Imported {total} rows into {table_name}")
+
+def configure_bulk_load(conn):
+    """Relax durability for the build; the file is discarded if the build fails"""
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA cache_size = -262144")
+
+def configure_serving(conn):
+    """Restore safe settings once the build is complete"""
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA journal_mode = WAL")
+
+def remove_database_files(path):
+    """Remove a database file together with its journal, WAL and shared-memory files"""
+    for suffix in ('', '-journal', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+def swap_database(build_path, db_path=DB_PATH):
+    """
+    Atomically replace the database at db_path with the one at build_path
+    
+    Connections already open on the old file keep reading it until they are
+    closed; the API notices the new file and reopens its connections.
+    
+    The old file's WAL is checkpointed and truncated first, and its write lock is
+    held across the rename: SQLite would otherwise apply a leftover db_path-wal
+    to the new file.
+    
+    The new file gets the old file's permissions (0644 if there is none):
+    mkstemp creates the build readable by its owner only, which would lock out
+    an API running as another user.
+    """
+    mode = stat.S_IMODE(os.stat(db_path).st_mode) if os.path.exists(db_path) else 0o644
+    os.chmod(build_path, mode)
+    
+    if not os.path.exists(db_path):
+        os.replace(build_path, db_path)
+        return
+    
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute(f"PRAGMA busy_timeout = {SWAP_BUSY_TIMEOUT_MS}")
+        busy, _, _ = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        if busy:
+            raise RuntimeError("Could not checkpoint the current database; readers are holding it. Nothing was replaced.")
+        
+        # Block writers so nothing reaches the WAL between the check and the rename
+        conn.execute("BEGIN IMMEDIATE")
+        wal_path = db_path + '-wal'
+        if os.path.exists(wal_path) and os.path.getsize(wal_path) > 0:
+            raise RuntimeError("The current database's WAL is not empty. Nothing was replaced.")
+        
+        os.replace(build_path, db_path)
+        conn.execute("ROLLBACK")
+    finally:
+        conn.close()
 
 def initialize_database():
-    """Main function to initialize database"""
+    """
+    Main function to initialize database
+    
+    The database is built in a temporary file next to DB_PATH and swapped in
+    only when complete, so a running API keeps serving the previous data
+    during the import and never sees a partial database.
+    """
     print("Starting database initialization...")
     print(f"Database path: {DB_PATH}")
     print(f"CSV directory: {CSV_DIR}")
     
-    # Remove existing database
-    if os.path.exists(DB_PATH):
-        os.remove(DB_PATH)
-        print("✓ Removed existing database")
-    
-    # Create new database
-    conn = sqlite3.connect(DB_PATH)
+    fd, build_path = tempfile.mkstemp(prefix='.interview_data.', suffix='.building', dir=os.path.dirname(DB_PATH))
+    os.close(fd)
+    conn = sqlite3.connect(build_path)
     
     try:
-        # Create tables
+        configure_bulk_load(conn)
+        
+        # Create tables (indexes are built after the load, which is much faster)
         create_tables(conn)
         
-        # Import CSV files in order (respecting foreign key constraints)
+        # Import CSV files in order (respecting foreign key constraints), in one transaction
         print("\nImporting CSV data...")
         import_csv_to_table(conn, 'segments_ai.csv', 'segments')
         import_csv_to_table(conn, 'interviews_ai.csv', 'interviews')
@@ -264,15 +675,35 @@ def initialize_database():
         import_csv_to_table(conn, 'brand_perceptions_ai.csv', 'brand_perceptions')
         import_csv_to_table(conn, 'product_attributes_ai.csv', 'product_attributes')
         import_csv_to_table(conn, 'purchase_behaviors_ai.csv', 'purchase_behaviors')
+        conn.commit()
+        
+        # Build indexes over the loaded data
+        create_indexes(conn)
+        
+        # Index transcript text for search
+        create_search_index(conn)
+        
+        # Materialize dashboard aggregates
+        create_summary_tables(conn)
+        
+        # Refresh planner statistics now that the data is loaded
+        analyze_database(conn)
+        
+        configure_serving(conn)
+        
+        # Closing checkpoints the build's WAL into the file, leaving a single file to move
+        conn.close()
+        swap_database(build_path)
         
         print("\n✓ Database initialized successfully!")
         print(f"Database location: {DB_PATH}")
         
     except Exception as e:
         print(f"✗ Error: {e}")
-        raise
-    finally:
+        # The current database is untouched; only the partial build is discarded
         conn.close()
+        remove_database_files(build_path)
+        raise
 
 if __name__ == '__main__':
     initialize_database()
@@ -0,0 +1,82 @@
+"""
+Test that the near-duplicate question cache reuses answers for rewordings only
+Run with pytest, or directly: python test_semantic_cache.py
+"""
+from app.services.semantic_cache import SEMANTIC_CACHE_THRESHOLD, SemanticCache
+
+# Other answered questions, so that n-gram weights are those of a populated cache
+ANSWERED = [
+    "มีกี่คนที่สัมภาษณ์?",
+    "แสดงการกระจายตัวของอายุ",
+    "มีอาชีพอะไรบ้าง?",
+    "Theme ไหนที่ได้รับความนิยมมากที่สุด?",
+    "แสดงการกระจายตัวของ sentiment",
+    "List the segments",
+]
+
+# Close in n-gram similarity (0.7 to 0.95) but asking different things
+DIFFERENT_QUESTIONS = [
+    ("Which themes have the most positive sentiment among interviewees?",
+     "Which themes have the most negative sentiment among interviewees?"),
+    ("How many interviewees are female and live in Bangkok",
+     "How many interviewees are male and live in Bangkok"),
+    ("List the themes mentioned by interviewees in the city",
+     "List the brands mentioned by interviewees in the city"),
+    ("Which brand is mentioned most?", "Which brand is mentioned least?"),
+    ("Which brand is mentioned most?", "Which brand is not mentioned?"),
+    ("How many interviews were done?", "How many interviews were done in March?"),
+    ("How many interviewees live in Bangkok?", "How many interviewees live in Chiang Mai?"),
+    ("Theme ที่มี sentiment เป็น positive มากที่สุด",
+     "Theme ที่มี sentiment เป็น negative มากที่สุด"),
+    ("แบรนด์ไหนที่ผู้ใช้พูดถึงมากที่สุด?", "แบรนด์ไหนที่ผู้ใช้พูดถึงน้อยที่สุด?"),
+    ("แสดงการกระจายตัวของเพศ", "แสดงการกระจายตัวของอายุ"),
+    ("top 5 brands by mentions", "top 10 brands by mentions"),
+]
+
+# Worded differently (similarity 0.5 to 0.85) but asking the same thing
+SAME_QUESTIONS = [
+    ("How many people were interviewed?", "number of people interviewed"),
+    ("How many people were interviewed?", "how many interviewees are there"),
+    ("What is the average age of interviewees?", "mean age of interviewees"),
+    ("Which brand is mentioned most?", "which brands get mentioned the most"),
+    ("Show the gender distribution", "distribution of gender"),
+    ("อายุเฉลี่ยของผู้ให้สัมภาษณ์คือเท่าไร?", "อายุเฉลี่ยของผู้ถูกสัมภาษณ์"),
+    ("อายุเฉลี่ยของผู้ให้สัมภาษณ์คือเท่าไร?", "ผู้ให้สัมภาษณ์อายุเฉลี่ยเท่าไหร่"),
+    ("แบรนด์ไหนที่ผู้ใช้พูดถึงมากที่สุด?", "แบรนด์ที่ถูกพูดถึงมากที่สุด"),
+    ("แสดงการกระจายตัวของเพศ", "การกระจายของเพศ"),
+]
+
+
+def lookup(cached: str, asked: str, threshold: float = SEMANTIC_CACHE_THRESHOLD):
+    cache = SemanticCache(threshold, 100)
+    for question in ANSWERED:
+        cache.put(question, None, {"question": question}, 1)
+    cache.put(cached, None, {"question": cached}, 1)
+    return cache.get(asked, None, 1)
+
+
+def test_different_questions_miss():
+    # Even with no similarity threshold at all, none of these may be reused
+    for cached, asked in DIFFERENT_QUESTIONS:
+        match = lookup(cached, asked, threshold=0.0)
+        assert match is None or match.question != cached, (cached, asked)
+
+
+def test_rewordings_hit():
+    for cached, asked in SAME_QUESTIONS:
+        match = lookup(cached, asked)
+        assert match is not None and match.question == cached, (cached, asked)
+
+
+def test_selected_tables_must_match():
+    cache = SemanticCache(0.0, 100)
+    cache.put("How many brands are there?", ["brands"], {}, 1)
+    assert cache.get("How many brands are there?", None, 1) is None
+    assert cache.get("How many brands are there?", ["brands"], 1) is not None
+
+
+if __name__ == "__main__":
+    test_different_questions_miss()
+    test_rewordings_hit()
+    test_selected_tables_must_match()
+    print("semantic cache tests passed")